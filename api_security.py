@@ -4,10 +4,11 @@ Limite les appels, surveille la consommation et prévient les abus
 """
 
 import json
+import threading
 import time
 from datetime import datetime, date
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 class APISecurityManager:
     """Gestionnaire de sécurité pour l'API Gemini"""
@@ -23,6 +24,8 @@ class APISecurityManager:
         self.daily_limit = daily_limit
         self.hourly_limit = hourly_limit
         self.usage_file = Path("usage_tracking.json")
+        # Vérification et enregistrement d'un appel d'un seul tenant (appels simultanés)
+        self._lock = threading.RLock()
         self.load_usage_data()
     
     def load_usage_data(self):
@@ -84,9 +87,45 @@ class APISecurityManager:
         Args:
             estimated_cost: Coût estimé en euros
         """
-        today = self.get_today_key()
-        current_hour = self.get_current_hour_key()
+        with self._lock:
+            self._add_usage(self.get_today_key(), self.get_current_hour_key(), 1, estimated_cost)
+    
+    def reserve_api_call(self, estimated_cost: float = 0.01) -> tuple[Optional[tuple], str]:
+        """
+        Vérifier les limites et enregistrer l'appel d'un seul tenant
         
+        Entre can_make_request et record_api_call, des appels simultanés verraient tous
+        le même compteur et dépasseraient ensemble les limites : l'appel est donc
+        décompté dès la réservation, avant d'être envoyé.
+        
+        Args:
+            estimated_cost: Coût estimé en euros
+            
+        Returns:
+            (reservation, reason) : reservation à passer à release_api_call si l'appel
+            échoue, None si les limites sont atteintes
+        """
+        with self._lock:
+            can_proceed, message = self.can_make_request()
+            if not can_proceed:
+                return None, message
+            reservation = (self.get_today_key(), self.get_current_hour_key(), estimated_cost)
+            self._add_usage(*reservation[:2], 1, estimated_cost)
+            return reservation, message
+    
+    def release_api_call(self, reservation: tuple):
+        """
+        Rendre une réservation dont l'appel a échoué
+        
+        Args:
+            reservation: Valeur renvoyée par reserve_api_call
+        """
+        today, current_hour, estimated_cost = reservation
+        with self._lock:
+            self._add_usage(today, current_hour, -1, -estimated_cost)
+    
+    def _add_usage(self, today: str, current_hour: str, calls: int, estimated_cost: float):
+        """Ajouter des appels et un coût aux compteurs du jour et de l'heure, puis sauvegarder"""
         # Initialiser les structures si nécessaire
         if "daily" not in self.usage_data:
             self.usage_data["daily"] = {}
@@ -96,8 +135,8 @@ class APISecurityManager:
             self.usage_data["costs"] = {}
         
         # Incrémenter les compteurs
-        self.usage_data["daily"][today] = self.usage_data["daily"].get(today, 0) + 1
-        self.usage_data["hourly"][current_hour] = self.usage_data["hourly"].get(current_hour, 0) + 1
+        self.usage_data["daily"][today] = max(0, self.usage_data["daily"].get(today, 0) + calls)
+        self.usage_data["hourly"][current_hour] = max(0, self.usage_data["hourly"].get(current_hour, 0) + calls)
         
         # Ajouter le coût
         self.usage_data["costs"][today] = self.usage_data["costs"].get(today, 0.0) + estimated_cost
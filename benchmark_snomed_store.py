@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Comparaison mémoire / latence des modes de stockage du validateur SNOMED CT
+
+    dict   : set de SCTID str + dict SCTID -> terme + dict terme -> SCTID
+    packed : SCTID int64 triés (recherche dichotomique) + termes dans un blob UTF-8
+    mmap   : mêmes tableaux que "packed", lus directement dans l'index mappé
+
+Chaque mode est mesuré dans un processus séparé pour que les allocations
+d'un mode ne faussent pas la mesure du suivant.
+
+Usage :
+    python benchmark_snomed_store.py [chemin_snapshot] [--samples 20000]
+"""
+
+import argparse
+import multiprocessing
+import random
+import time
+from typing import Dict
+
+from snomed_index import load_snomed_index
+from snomed_validator import SNOMEDValidator, STORES
+
+
+def _memory_snapshot() -> Dict[str, int]:
+    """
+    RSS et mémoire privée modifiée du processus en Ko (Linux, /proc/self/smaps_rollup)
+
+    Les pages propres d'un fichier mappé (mode mmap) sont comptées dans le RSS
+    mais restent partageables entre processus : seule Private_Dirty est propre
+    à chaque worker.
+    """
+    memory = {"rss_kb": 0, "private_kb": 0}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                field, value = line.split(":", 1)
+                if field == "Rss":
+                    memory["rss_kb"] = int(value.split()[0])
+                elif field == "Private_Dirty":
+                    memory["private_kb"] = int(value.split()[0])
+    except OSError:
+        pass  # Pas de /proc : seules les latences seront significatives
+    return memory
+
+
+def _measure_store(snapshot_path: str, store: str, samples: int) -> Dict:
+    """Charger le validateur dans le mode demandé et mesurer mémoire et latences"""
+    # Préparer les échantillons avant toute mesure (index déjà compilé par le parent)
+    index = load_snomed_index(snapshot_path, use_mmap=False)
+    rng = random.Random(42)
+    codes = [str(index.concept_ids[rng.randrange(len(index))]) for _ in range(samples)]
+    codes += [str(900000000 + rng.randrange(10**8)) for _ in range(samples // 4)]  # Codes inexistants
+    terms = [index.keys.get(rng.randrange(len(index.keys))) for _ in range(samples)]
+    del index
+
+    before = _memory_snapshot()
+    start = time.perf_counter()
+    validator = SNOMEDValidator(snapshot_path, store=store)
+    validator.load_snomed_data()
+    load_time = time.perf_counter() - start
+
+    latencies = {}
+    for name, method, values in (
+        ("validate_code", validator.validate_code, codes),
+        ("get_french_term", validator.get_french_term, codes),
+        ("find_exact_term_code", validator.find_exact_term_code, terms),
+    ):
+        start = time.perf_counter()
+        for value in values:
+            method(value)
+        latencies[name] = (time.perf_counter() - start) / len(values) * 1e6
+
+    after = _memory_snapshot()
+    return {
+        "store": store,
+        "load_ms": load_time * 1000,
+        "rss_kb": after["rss_kb"] - before["rss_kb"],
+        "private_kb": after["private_kb"] - before["private_kb"],
+        "latency_us": latencies,
+    }
+
+
+def main():
+    """Afficher le comparatif des modes de stockage"""
+    parser = argparse.ArgumentParser(description="Benchmark des modes de stockage SNOMED CT")
+    parser.add_argument("snapshot_path", nargs="?", default="data/snomed_fr",
+                        help="Dossier contenant les fichiers RF2 Snapshot")
+    parser.add_argument("--samples", type=int, default=20000,
+                        help="Nombre de recherches par méthode")
+    args = parser.parse_args()
+
+    # Compiler l'index une fois (hors mesure)
+    if load_snomed_index(args.snapshot_path) is None:
+        return 1
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for store in STORES:
+        with context.Pool(1) as pool:
+            results.append(pool.apply(_measure_store, (args.snapshot_path, store, args.samples)))
+
+    print("\n📊" + "=" * 78)
+    print("         COMPARATIF DES MODES DE STOCKAGE DU VALIDATEUR SNOMED CT")
+    print("=" * 80)
+    print(f"{'Mode':<8} {'Chargement':>11} {'RSS':>10} {'Privée':>10}"
+          f" {'validate':>9} {'terme':>9} {'exact':>9}")
+    for r in results:
+        lat = r["latency_us"]
+        print(f"{r['store']:<8} {r['load_ms']:>9.1f}ms {r['rss_kb'] / 1024:>8.1f}Mo"
+              f" {r['private_kb'] / 1024:>8.1f}Mo"
+              f" {lat['validate_code']:>7.2f}µs {lat['get_french_term']:>7.2f}µs"
+              f" {lat['find_exact_term_code']:>7.2f}µs")
+    print("\nℹ️  Privée = mémoire modifiée propre au processus (Private_Dirty) ; les pages du")
+    print("   mode mmap sont partagées entre tous les processus qui ouvrent le même index.")
+    print("   Latences en µs par appel (validate_code, get_french_term, find_exact_term_code).")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
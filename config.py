@@ -20,6 +20,46 @@ class Config:
     HOURLY_API_LIMIT = 40     # Max 40 appels par heure
     COST_ALERT_THRESHOLD = 5.0  # Alerte si coût > 5€/jour
     MONTHLY_COST_LIMIT = 100.0  # Limite mensuelle en euros
+
+    # === CACHE DES RÉPONSES GEMINI ===
+    # Une réponse déjà obtenue pour le même modèle, la même configuration et le même
+    # prompt est relue sur disque, sans appel ni décompte des limites (voir gemini_cache.py)
+    GEMINI_CACHE_PATH = os.getenv("GEMINI_CACHE_PATH", "gemini_cache.sqlite3")  # Vide : cache désactivé
+    GEMINI_CACHE_MAX_MB = float(os.getenv("GEMINI_CACHE_MAX_MB", "100"))  # Au-delà : éviction LRU
+    GEMINI_CACHE_TTL_HOURS = float(os.getenv("GEMINI_CACHE_TTL_HOURS", "0"))  # 0 : pas d'expiration
+
+    # === APPELS ASYNCHRONES ===
+    # Nombre maximal d'appels Gemini en cours dans le processus (voir gemini_async.py)
+    GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+
+    # === CONSENSUS DES MODES À EXTRACTIONS MULTIPLES ===
+    # Les modes fusion lancent CONSENSUS_MIN_SAMPLES extractions, puis une de plus tant que
+    # l'accord (indice de Jaccard) entre les codes validés de la dernière extraction et ceux
+    # des précédentes reste sous CONSENSUS_AGREEMENT, sans dépasser CONSENSUS_MAX_SAMPLES
+    CONSENSUS_MIN_SAMPLES = 2
+    CONSENSUS_MAX_SAMPLES = 3
+    CONSENSUS_AGREEMENT = 0.9
+
+    # === EXTRACTION PAR LOTS ===
+    # Notes regroupées dans un même prompt par extract_batch (consigne commune envoyée une fois)
+    BATCH_MAX_NOTES = 5
+    BATCH_MAX_PROMPT_TOKENS = 4000  # Taille estimée du prompt (≈ 4 caractères par token)
+
+    # === VALIDATION SNOMED ===
+    # Similarité minimale (trigrammes, 0-1) pour accepter un code trouvé par recherche approximative
+    FUZZY_MATCH_MIN_SIMILARITY = 0.5
+    # Correspondance quasi exacte (distance d'édition) acceptée sans validation sémantique :
+    # au plus 1 faute par tranche de NEAR_EXACT_CHARS_PER_EDIT caractères, plafonnée à 2
+    NEAR_EXACT_MAX_DISTANCE = 2
+    NEAR_EXACT_CHARS_PER_EDIT = 5
+    # Suggestions classées (BM25 sur les mots) pour les termes restés sans code :
+    # part minimale (0-1) du poids des mots du terme retrouvée dans la description
+    BM25_MIN_COVERAGE = 0.5
+    BM25_SUGGESTIONS = 5
+    # Index allégé : hiérarchies de premier niveau conservées, séparées par des virgules
+    # (ex: "Clinical finding,Procedure,Body structure" ; voir snomed_scope.py).
+    # Vide : index complet. Les codes des autres hiérarchies sont signalés hors périmètre.
+    SNOMED_HIERARCHIES = [h.strip() for h in os.getenv("SNOMED_HIERARCHIES", "").split(",") if h.strip()] or None
     
     # Paramètres de génération
     GENERATION_CONFIG = {
@@ -0,0 +1,77 @@
+"""
+Boucle d'événements partagée par les appels asynchrones à Gemini
+
+Le client asynchrone du SDK reste lié à la boucle sur laquelle il a servi la
+première fois : tous les appels passent donc par une boucle unique, tournant
+dans un thread dédié, et un sémaphore global y borne le nombre d'appels en
+cours. Les coroutines appelantes peuvent vivre sur n'importe quelle boucle
+(asyncio.run de Streamlit, application asynchrone) ou dans du code synchrone.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Optional
+
+try:
+    from config import Config
+    MAX_CONCURRENCY = Config.GEMINI_MAX_CONCURRENCY
+except ImportError:
+    # Fallback si config.py n'existe pas encore
+    MAX_CONCURRENCY = 8
+
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_LOOP_LOCK = threading.Lock()
+_SEMAPHORE: Optional[asyncio.Semaphore] = None
+
+
+def gemini_loop() -> asyncio.AbstractEventLoop:
+    """Boucle des appels Gemini (démarrée au premier appel dans un thread démon)"""
+    global _LOOP
+    with _LOOP_LOCK:
+        if _LOOP is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, daemon=True, name="gemini-loop").start()
+            _LOOP = loop
+        return _LOOP
+
+
+async def _bounded(coroutine: Awaitable) -> Any:
+    """Exécuter la coroutine sur la boucle Gemini en respectant MAX_CONCURRENCY"""
+    global _SEMAPHORE
+    if _SEMAPHORE is None:
+        _SEMAPHORE = asyncio.Semaphore(MAX_CONCURRENCY)
+    async with _SEMAPHORE:
+        return await coroutine
+
+
+async def gemini_call(coroutine: Awaitable) -> Any:
+    """
+    Attendre un appel asynchrone au SDK Gemini depuis n'importe quelle boucle
+
+    L'appel attend une place du sémaphore global puis s'exécute sur la boucle
+    Gemini ; l'annulation de l'appelant annule l'appel en cours.
+
+    Args:
+        coroutine: Appel du SDK (ex: model.generate_content_async(prompt)), non démarré
+    """
+    loop = gemini_loop()
+    if asyncio.get_running_loop() is loop:
+        return await _bounded(coroutine)
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(_bounded(coroutine), loop))
+
+
+def run_sync(coroutine: Awaitable) -> Any:
+    """
+    Exécuter une coroutine sur la boucle Gemini et attendre son résultat
+
+    Sert aux méthodes synchrones de l'extracteur ; à ne pas appeler depuis une
+    coroutine tournant sur la boucle Gemini (elle s'attendrait elle-même).
+    """
+    loop = gemini_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        raise RuntimeError("run_sync() appelé depuis la boucle Gemini : utiliser await")
+    return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
@@ -0,0 +1,138 @@
+"""
+Cache persistant des réponses Gemini
+Évite de repayer (et de décompter des limites horaires) un appel déjà fait
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class GeminiResponseCache:
+    """Cache des réponses Gemini sur disque (SQLite), adressé par le contenu de l'appel"""
+
+    def __init__(self, path: Optional[str], max_bytes: int, ttl_seconds: Optional[float] = None):
+        """
+        Initialiser le cache
+
+        Args:
+            path: Fichier SQLite du cache (None ou vide : cache désactivé)
+            max_bytes: Taille maximale des réponses conservées ; au-delà, les réponses
+                       les moins récemment utilisées sont supprimées
+            ttl_seconds: Durée de validité d'une réponse (None : pas d'expiration)
+        """
+        self.path = Path(path) if path else None
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._ready = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None and self.max_bytes > 0
+
+    @staticmethod
+    def make_key(model_name: str, prompt: str, generation_config: Optional[Dict[str, Any]] = None,
+                 sample: int = 0) -> str:
+        """
+        Clé d'un appel : empreinte du modèle, de la configuration de génération et du prompt
+
+        Args:
+            sample: Rang du tirage pour un même prompt (les modes à extractions multiples
+                    interrogent Gemini plusieurs fois et doivent garder des réponses distinctes)
+        """
+        payload = json.dumps([model_name, generation_config or {}, prompt, sample],
+                             sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(str(self.path), timeout=30)
+        if not self._ready:
+            with self._lock, connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "key TEXT PRIMARY KEY, model TEXT, response TEXT, size INTEGER, "
+                    "created_at REAL, last_used REAL)"
+                )
+                connection.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+                self._ready = True
+        return connection
+
+    def get(self, key: str) -> Optional[str]:
+        """Réponse en cache pour cette clé, ou None (absente ou expirée)"""
+        if not self.enabled:
+            return None
+        try:
+            with closing(self._connect()) as connection, connection:
+                row = connection.execute("SELECT response, created_at FROM responses WHERE key = ?",
+                                         (key,)).fetchone()
+                if row is None:
+                    return None
+                now = time.time()
+                if self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                    connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    return None
+                connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                return row[0]
+        except sqlite3.Error as e:
+            print(f"⚠️  Cache Gemini illisible ({e})")
+            return None
+
+    def put(self, key: str, model_name: str, response: str):
+        """Enregistrer une réponse puis libérer la place des moins récemment utilisées"""
+        if not self.enabled:
+            return
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        try:
+            with closing(self._connect()) as connection, connection:
+                now = time.time()
+                connection.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                                   (key, model_name, response, size, now, now))
+                total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+                if total <= self.max_bytes:
+                    return
+                evicted = []
+                for old_key, old_size in connection.execute(
+                        "SELECT key, size FROM responses ORDER BY last_used").fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    evicted.append((old_key,))
+                    total -= old_size
+                connection.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        except sqlite3.Error as e:
+            print(f"⚠️  Réponse non mise en cache ({e})")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Nombre de réponses et taille occupée"""
+        if not self.enabled or not self.path.exists():
+            return {"entries": 0, "bytes": 0, "max_bytes": self.max_bytes}
+        with closing(self._connect()) as connection:
+            entries, total = connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": entries, "bytes": total, "max_bytes": self.max_bytes}
+
+    def clear(self):
+        """Vider le cache"""
+        if self.enabled and self.path.exists():
+            with closing(self._connect()) as connection, connection:
+                connection.execute("DELETE FROM responses")
+
+
+# Instance globale pour l'utilisation - utilise la config si disponible
+try:
+    from config import Config
+    response_cache = GeminiResponseCache(
+        Config.GEMINI_CACHE_PATH,
+        max_bytes=int(Config.GEMINI_CACHE_MAX_MB * 1024 * 1024),
+        ttl_seconds=Config.GEMINI_CACHE_TTL_HOURS * 3600 or None
+    )
+except ImportError:
+    # Fallback si config.py n'existe pas encore
+    response_cache = GeminiResponseCache("gemini_cache.sqlite3", max_bytes=100 * 1024 * 1024)
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Dict, List, Optional
 from dataclasses_json import dataclass_json
 
 @dataclass_json
@@ -68,6 +68,9 @@ class SNOMEDExtraction:
     clinical_findings: List[ClinicalFinding]
     procedures: List[Procedure]
     body_structures: List[BodyStructure]
+    snomed_release: Optional[str] = None  # Version de la release SNOMED CT utilisée pour la validation
+    gemini_cache: Optional[Dict[str, int]] = None  # Appels Gemini relus dans le cache / envoyés {"hits", "misses"}
+    call_times: Optional[List[float]] = None  # Durée de chaque appel Gemini (s), modes à appels multiples
     
     def to_summary(self) -> str:
         """Créer un résumé textuel de l'extraction"""
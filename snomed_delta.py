@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Application d'une release Delta RF2 à l'index SNOMED CT compilé
+
+Une nouvelle édition française est publiée avec un paquet Delta qui ne contient
+que les lignes modifiées depuis la précédente. Plutôt que de relire tout le
+Snapshot, les tables sont reconstituées depuis l'index compilé (sans parsing
+RF2), seuls les concepts touchés par la Delta sont recalculés, puis un nouvel
+index est écrit de manière atomique (révision incrémentée, Deltas appliquées
+listées dans les métadonnées). Les sections de recherche (trigrammes,
+suppressions, BM25) sont recopiées de l'ancien index quand la Delta ne change
+pas l'ensemble des clés de recherche.
+
+Usage :
+    python snomed_delta.py chemin_snapshot_ou_zip chemin_delta_ou_zip
+"""
+
+import argparse
+import csv
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from snomed_hierarchy import FSN_TYPE_ID, IS_A_TYPE_ID, semantic_tag
+from snomed_history import ASSOCIATION_KINDS, resolve_redirects
+from snomed_index import (FOLDED_SECTION_PREFIXES, HIERARCHY_SECTION_PREFIXES, PREFERRED_ACCEPTABILITY_ID,
+                          SEARCH_SECTION_PREFIXES, TERM_FLAG_FSN, TERM_FLAG_PREFERRED, SNOMEDIndex, find_rf2_files,
+                          index_path_for, is_index_stale, normalize_term_key, tables_from_index, write_snomed_index)
+from snomed_rf2 import RF2File, find_rf2_file
+
+# Fichiers RF2 d'un paquet Delta (tous facultatifs, au moins un requis)
+RF2_DELTA_PATTERNS = {
+    "concepts": "sct2_Concept_Delta_*.txt",
+    "descriptions": "sct2_Description_Delta-fr_*.txt",
+    "relationships": "sct2_Relationship_Delta_*.txt",
+    "language": "der2_cRefset_LanguageDelta-fr_*.txt",
+    "associations": "der2_cRefset_Association*Delta*.txt",
+}
+
+
+def find_delta_files(delta_path: Path) -> Optional[Dict[str, RF2File]]:
+    """
+    Localiser les fichiers Delta dans un dossier ou une archive ZIP de release
+
+    Returns:
+        Dictionnaire {type: fichier RF2} ou None si aucun fichier Delta n'est trouvé
+    """
+    files = {}
+    for kind, pattern in RF2_DELTA_PATTERNS.items():
+        found = find_rf2_file(delta_path, pattern)
+        if found is not None:
+            files[kind] = found
+    if not files:
+        print(f"❌ Aucun fichier Delta RF2 trouvé dans {delta_path}")
+        return None
+    return files
+
+
+def _latest_rows(file: RF2File) -> Dict[str, Dict[str, str]]:
+    """Dernier état (effectiveTime le plus récent) de chaque composant d'un fichier Delta"""
+    rows: Dict[str, Dict[str, str]] = {}
+    with file.open_text() as f:
+        reader = csv.DictReader(f, delimiter='\t', quoting=csv.QUOTE_NONE)
+        for row in reader:
+            current = rows.get(row['id'])
+            if current is None or row['effectiveTime'] >= current['effectiveTime']:
+                rows[row['id']] = row
+    return rows
+
+
+def apply_delta_to_tables(tables: Dict, files: Dict[str, RF2File]) -> Dict[str, int]:
+    """
+    Appliquer les lignes d'un paquet Delta aux tables du validateur (en place)
+
+    Seuls les concepts touchés (activés, inactivés, dont une description ou la
+    description préférée a changé) voient leurs clés, terme principal et tag
+    sémantique recalculés ; la table des descriptions n'est parcourue qu'une
+    fois pour les retrouver.
+
+    Returns:
+        Statistiques {type de changement: nombre}
+    """
+    stats = {"concepts_activated": 0, "concepts_inactivated": 0, "descriptions_added": 0,
+             "descriptions_changed": 0, "descriptions_removed": 0, "preferred_changed": 0,
+             "is_a_added": 0, "is_a_removed": 0, "redirects_added": 0, "redirects_removed": 0}
+    concepts: Set[str] = set(tables["concepts"])
+    french_terms: Dict[str, str] = tables["french_terms"]
+    term_to_code: Dict[str, Dict[str, int]] = tables["term_to_code"]
+    semantic_tags: Dict[str, str] = tables["semantic_tags"]
+    is_a: Dict[str, List[str]] = tables["is_a"]
+    descriptions: Dict = tables["descriptions"]
+    preferred: Dict[str, str] = tables.setdefault("preferred_descriptions", {})
+    redirects: Dict = tables.setdefault("redirects", {})
+
+    # 1. Concepts activés / inactivés
+    inactivated: Set[str] = set()
+    if "concepts" in files:
+        for sctid, row in _latest_rows(files["concepts"]).items():
+            if row['active'] == '1' and sctid not in concepts:
+                concepts.add(sctid)
+                stats["concepts_activated"] += 1
+            elif row['active'] != '1' and sctid in concepts:
+                concepts.discard(sctid)
+                inactivated.add(sctid)
+                stats["concepts_inactivated"] += 1
+
+    # 2. Descriptions nouvelles, modifiées ou inactivées
+    affected: Set[str] = set(inactivated)
+    stale_keys: Dict[str, Set[str]] = {}  # Concept -> clés dont il doit être retiré
+    new_terms: Dict[str, List[str]] = {}  # Concept -> termes (casse d'origine) apportés par la Delta
+    delta_terms: Dict[str, str] = {}  # Description -> terme (casse d'origine) apporté par la Delta
+    if "descriptions" in files:
+        for description_id, row in _latest_rows(files["descriptions"]).items():
+            old = descriptions.pop(description_id, None)
+            if old is not None:
+                affected.add(old[0])
+                stale_keys.setdefault(old[0], set()).add(old[1])
+            concept_id = row['conceptId']
+            if row['active'] == '1' and row['languageCode'] == 'fr' and concept_id in concepts:
+                key = normalize_term_key(row['term'])
+                descriptions[description_id] = (concept_id, key, TERM_FLAG_FSN if row['typeId'] == FSN_TYPE_ID else 0)
+                affected.add(concept_id)
+                new_terms.setdefault(concept_id, []).append(row['term'])
+                delta_terms[description_id] = row['term']
+                stats["descriptions_changed" if old is not None else "descriptions_added"] += 1
+            elif old is not None:
+                stats["descriptions_removed"] += 1
+
+    # 2 bis. Descriptions préférées (refset de langue) ; FSN écarté comme à la compilation
+    if "language" in files:
+        for row in _latest_rows(files["language"]).values():
+            description_id = row['referencedComponentId']
+            entry = descriptions.get(description_id)
+            if entry is None or entry[2] & TERM_FLAG_FSN:
+                continue
+            concept_id = entry[0]
+            if row['active'] == '1' and row['acceptabilityId'] == PREFERRED_ACCEPTABILITY_ID:
+                if preferred.get(concept_id) != description_id:
+                    preferred[concept_id] = description_id
+                    affected.add(concept_id)
+                    stats["preferred_changed"] += 1
+            elif preferred.get(concept_id) == description_id:
+                del preferred[concept_id]
+                affected.add(concept_id)
+                stats["preferred_changed"] += 1
+
+    # 3. Descriptions actuelles des concepts touchés (un seul parcours de la table)
+    current: Dict[str, List] = {concept_id: [] for concept_id in affected}
+    if affected:
+        for description_id, (concept_id, key, flags) in list(descriptions.items()):
+            if concept_id not in current:
+                continue
+            stale_keys.setdefault(concept_id, set()).add(key)
+            if concept_id in inactivated:
+                del descriptions[description_id]
+                stats["descriptions_removed"] += 1
+            else:
+                current[concept_id].append((key, flags))
+
+    # 4. Clés, terme principal et tag sémantique recalculés pour les concepts touchés
+    for concept_id in affected:
+        old_term = french_terms.get(concept_id)
+        if old_term is not None:
+            stale_keys.setdefault(concept_id, set()).add(normalize_term_key(old_term))
+        for key in stale_keys.get(concept_id, ()):
+            codes = term_to_code.get(key)
+            if codes is not None:
+                codes.pop(concept_id, None)
+                if not codes:
+                    del term_to_code[key]
+
+        entries = current[concept_id] if concept_id in concepts else []
+        for key, flags in entries:
+            codes = term_to_code.setdefault(key, {})
+            codes[concept_id] = codes.get(concept_id, 0) | flags
+
+        keys = [key for key, _ in entries]
+        preferred_id = preferred.get(concept_id)
+        if preferred_id is not None and (concept_id not in concepts or preferred_id not in descriptions):
+            del preferred[concept_id]
+            preferred_id = None
+        if preferred_id is not None:
+            # Terme de la Delta, sinon terme actuel s'il a la même clé, sinon la clé avec une majuscule
+            key = descriptions[preferred_id][1]
+            if preferred_id in delta_terms:
+                french_terms[concept_id] = delta_terms[preferred_id]
+            elif old_term is None or normalize_term_key(old_term) != key:
+                french_terms[concept_id] = key[:1].upper() + key[1:]
+        elif old_term is None or normalize_term_key(old_term) not in keys:
+            candidates = [term for term in new_terms.get(concept_id, []) if normalize_term_key(term) in keys]
+            term = candidates[0] if candidates else (keys[0] if keys else None)
+            if term is None:
+                french_terms.pop(concept_id, None)
+            else:
+                french_terms[concept_id] = term
+        if concept_id in french_terms:
+            term_to_code[normalize_term_key(french_terms[concept_id])][concept_id] |= TERM_FLAG_PREFERRED
+
+        tags = [semantic_tag(key) for key, flags in entries if flags & TERM_FLAG_FSN]
+        tag = next((tag for tag in tags if tag), None)
+        if tag:
+            semantic_tags[concept_id] = tag
+        else:
+            semantic_tags.pop(concept_id, None)
+
+    # 5. Relations IS-A
+    if inactivated:
+        for concept_id in inactivated:
+            stats["is_a_removed"] += len(is_a.pop(concept_id, []))
+        for child in list(is_a):
+            parents = [parent for parent in is_a[child] if parent not in inactivated]
+            stats["is_a_removed"] += len(is_a[child]) - len(parents)
+            if parents:
+                is_a[child] = parents
+            else:
+                del is_a[child]
+    if "relationships" in files:
+        for row in _latest_rows(files["relationships"]).values():
+            if row['typeId'] != IS_A_TYPE_ID:
+                continue
+            child, parent = row['sourceId'], row['destinationId']
+            parents = is_a.get(child, [])
+            if row['active'] == '1' and child in concepts and parent in concepts:
+                if parent not in parents:
+                    is_a.setdefault(child, []).append(parent)
+                    stats["is_a_added"] += 1
+            elif parent in parents:
+                parents.remove(parent)
+                stats["is_a_removed"] += 1
+                if not parents:
+                    del is_a[child]
+
+    # 6. Redirections des concepts inactifs : les associations de la Delta remplacent
+    #    celles du concept source ; concepts réactivés et cibles inactivées mis à jour
+    associations: Dict[str, Dict[int, List[str]]] = {}
+    if "associations" in files:
+        for row in _latest_rows(files["associations"]).values():
+            kind = ASSOCIATION_KINDS.get(row['refsetId'])
+            if kind is None:
+                continue
+            source, target = row['referencedComponentId'], row['targetComponentId']
+            if row['active'] == '1':
+                targets = associations.setdefault(source, {}).setdefault(kind, [])
+                if target not in targets:
+                    targets.append(target)
+            elif source in redirects and redirects[source][0] == target:
+                del redirects[source]
+                stats["redirects_removed"] += 1
+    for source in [source for source in redirects if source in concepts]:
+        del redirects[source]
+        stats["redirects_removed"] += 1
+    resolved = resolve_redirects(associations, concepts, redirects)
+    for source in associations:
+        if source in resolved:
+            if redirects.get(source) != resolved[source]:
+                redirects[source] = resolved[source]
+                stats["redirects_added"] += 1
+        elif source in redirects:
+            del redirects[source]  # Cibles ambiguës ou inactives
+            stats["redirects_removed"] += 1
+    if inactivated:
+        for source, (target, kind) in list(redirects.items()):
+            if target in concepts:
+                continue
+            follow = redirects.get(target)
+            if follow is not None and follow[0] in concepts:
+                redirects[source] = (follow[0], max(kind, follow[1]))
+            else:
+                del redirects[source]
+                stats["redirects_removed"] += 1
+
+    tables["concepts"] = sorted(concepts)
+    return stats
+
+
+def reusable_sections(index: SNOMEDIndex, stats: Dict[str, int], same_keys: bool,
+                      same_tags: bool) -> Dict[str, Dict]:
+    """
+    Groupes de sections de l'index que la Delta laisse inchangés, à reprendre tels quels
+
+    Les rangs des concepts (concept_ids triés) ne bougent que si un concept est
+    activé ou inactivé : les clés repliées et la hiérarchie en dépendent.
+
+    Args:
+        index: Index avant application de la Delta
+        stats: Statistiques renvoyées par apply_delta_to_tables
+        same_keys: Même ensemble de clés de recherche avant et après la Delta
+        same_tags: Mêmes tags sémantiques (catégories) avant et après la Delta
+
+    Returns:
+        {groupe: sections} pour les groupes "recherche", "clés repliées" et "hiérarchie"
+    """
+    same_concepts = not stats["concepts_activated"] and not stats["concepts_inactivated"]
+    same_descriptions = not any(stats[name] for name in
+                                ("descriptions_added", "descriptions_changed", "descriptions_removed"))
+    same_is_a = not stats["is_a_added"] and not stats["is_a_removed"]
+
+    groups = {}
+    # Mêmes clés : sections de recherche identiques, inutile de les recalculer
+    if same_keys:
+        groups["recherche"] = SEARCH_SECTION_PREFIXES
+    # Mêmes clés et mêmes concepts pour chaque clé (aucune description changée)
+    if same_keys and same_concepts and same_descriptions:
+        groups["clés repliées"] = FOLDED_SECTION_PREFIXES
+    if same_concepts and same_is_a and same_tags:
+        groups["hiérarchie"] = HIERARCHY_SECTION_PREFIXES
+    return {group: index.copy_sections(prefixes) for group, prefixes in groups.items()}
+
+
+def apply_rf2_delta(snapshot_path, delta_path, index_path: Optional[Path] = None) -> bool:
+    """
+    Appliquer un paquet Delta RF2 à l'index compilé d'un Snapshot
+
+    L'index doit être à jour par rapport au Snapshot. Le nouvel index remplace
+    l'ancien de manière atomique : les processus qui ont mappé l'ancien le
+    conservent, les suivants ouvrent la nouvelle révision. Un paquet déjà
+    appliqué (même nom de fichiers) est ignoré.
+
+    Args:
+        snapshot_path: Dossier Snapshot ou archive ZIP dont l'index a été compilé
+        delta_path: Dossier ou archive ZIP contenant les fichiers sct2_*_Delta*
+        index_path: Chemin de l'index (par défaut celui du Snapshot)
+
+    Returns:
+        True si l'index est à jour (Delta appliquée ou déjà appliquée)
+    """
+    snapshot_path = Path(snapshot_path)
+    index_path = Path(index_path) if index_path else index_path_for(snapshot_path)
+
+    files = find_rf2_files(snapshot_path)
+    delta_files = find_delta_files(Path(delta_path))
+    if files is None or delta_files is None:
+        return False
+
+    stale, reason = is_index_stale(index_path, files)
+    if stale:
+        print(f"❌ Index SNOMED CT à recompiler avant d'appliquer une Delta ({reason})")
+        return False
+
+    start_time = time.time()
+    try:
+        index = SNOMEDIndex.load(index_path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Index illisible ({e})")
+        return False
+
+    delta_names = sorted(file.name for file in delta_files.values())
+    deltas = list(index.meta.get("deltas", []))
+    if any(delta["files"] == delta_names for delta in deltas):
+        print(f"✅ Delta déjà appliquée à l'index (révision {index.meta.get('revision', 0)})")
+        return True
+
+    print(f"🔄 Application de la Delta {', '.join(delta_names)}...")
+    tables = tables_from_index(index)
+    old_keys = set(tables["term_to_code"])
+    old_tags = dict(tables["semantic_tags"])
+    stats = apply_delta_to_tables(tables, delta_files)
+    reused = reusable_sections(index, stats, old_keys == set(tables["term_to_code"]),
+                               old_tags == tables["semantic_tags"])
+    reuse_sections = {name: section for sections in reused.values() for name, section in sections.items()}
+    deltas.append({"files": delta_names, "applied_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "changes": stats,
+                   "reused_sections": list(reused)})
+
+    try:
+        write_snomed_index(index_path, tables, index.meta["fingerprint"], deltas,
+                           reuse_sections=reuse_sections)
+    except OSError as e:
+        print(f"❌ Impossible d'écrire l'index compilé ({e})")
+        return False
+
+    summary = ", ".join(f"{name} {count}" for name, count in stats.items() if count)
+    reused = f", sections reprises : {', '.join(reused)}" if reused else ""
+    print(f"💾 Révision {len(deltas)} de l'index écrite en ⏱️ {time.time() - start_time:.2f}s "
+          f"({summary or 'aucun changement'}{reused})")
+    return True
+
+
+def main():
+    """Appliquer une Delta RF2 en ligne de commande"""
+    parser = argparse.ArgumentParser(description="Appliquer une release Delta RF2 à l'index SNOMED CT")
+    parser.add_argument("snapshot_path", help="Dossier Snapshot ou archive ZIP dont l'index a été compilé")
+    parser.add_argument("delta_path", help="Dossier ou archive ZIP contenant les fichiers Delta")
+    args = parser.parse_args()
+
+    return 0 if apply_rf2_delta(args.snapshot_path, args.delta_path) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -1,38 +1,27 @@
 import google.generativeai as genai
 import json
 import re
-from typing import Dict, Any
+import textwrap
+from typing import Dict, Any, Callable, List, Optional, Set, Tuple
 from config import Config
 from models import MedicalNote, SNOMEDExtraction, ClinicalFinding, Procedure, BodyStructure
 from api_security import security_manager
 import asyncio
 import time
+from snomed_release import get_snomed_release
 from snomed_validator import SNOMEDValidator
+from gemini_cache import response_cache
+from gemini_async import gemini_call, run_sync
 
-class SNOMEDExtractor:
-    """Extracteur d'informations SNOMED CT à partir de notes médicales"""
-    
-    def __init__(self):
-        """Initialiser l'extracteur avec le modèle Gemini"""
-        Config.validate()
-        genai.configure(api_key=Config.GOOGLE_API_KEY)
-        # Modèle configurable
-        self.model_name = Config.GEMINI_MODEL
-        self.model = genai.GenerativeModel(self.model_name)
-    
-    def set_model(self, model_name: str):
-        """Changer le modèle utilisé"""
-        self.model_name = model_name
-        self.model = genai.GenerativeModel(self.model_name)
-        print(f"🔄 Modèle changé vers : {model_name}")
-    
-    def create_extraction_prompt(self, medical_note: str) -> str:
-        """Créer un prompt éducatif optimisé pour extraction complète"""
-        prompt = f"""Dans un contexte éducatif de classification médicale, analyse ce cas d'étude :
+# Catégories annoncées par Gemini -> catégories SNOMED CT du validateur (voir get_category)
+GEMINI_CATEGORIES = {
+    'clinical_finding': "Clinical finding",
+    'procedure': "Procedure",
+    'body_structure': "Body structure",
+}
 
-{medical_note}
-
-Extrais UNIQUEMENT les concepts médicaux appartenant aux 3 hiérarchies SNOMED CT ciblées :
+# Parties du prompt d'extraction communes aux prompts d'une note et de plusieurs notes
+EXTRACTION_TARGETS = """Extrais UNIQUEMENT les concepts médicaux appartenant aux 3 hiérarchies SNOMED CT ciblées :
 
 1. **CLINICAL FINDING** (Constatations cliniques) :
    - Symptômes observés (ex: éruption cutanée, prurit)
@@ -51,24 +40,19 @@ Extrais UNIQUEMENT les concepts médicaux appartenant aux 3 hiérarchies SNOMED
    - Organes, régions corporelles
    - Structures anatomiques
 
-**EXCLURE** : antécédents, contexte familial, informations administratives, expositions
+**EXCLURE** : antécédents, contexte familial, informations administratives, expositions"""
 
-Format JSON requis :
-{{
-  "concepts_medicaux": [
-    {{
-      "concept": "concept médical normalisé",
-      "categorie": "clinical_finding/procedure/body_structure",
-      "code_classification": "code SNOMED CT numérique unique pour ce concept",
-      "negation": "positive/negative",
-      "famille": "patient/family", 
-      "suspicion": "confirmed/suspected",
-      "antecedent": "current/history"
-    }}
-  ]
-}}
+CONCEPT_FORMAT = """{
+  "concept": "concept médical normalisé",
+  "categorie": "clinical_finding/procedure/body_structure",
+  "code_classification": "code SNOMED CT numérique unique pour ce concept",
+  "negation": "positive/negative",
+  "famille": "patient/family", 
+  "suspicion": "confirmed/suspected",
+  "antecedent": "current/history"
+}"""
 
-IMPORTANT : Assigne un code SNOMED CT différent et approprié pour chaque concept médical.
+EXTRACTION_RULES = """IMPORTANT : Assigne un code SNOMED CT différent et approprié pour chaque concept médical.
 Exemples de codes : 
 - Varicelle: 38907003
 - Éruption cutanée: 271807003  
@@ -79,124 +63,335 @@ RÈGLES pour les modifieurs :
 - négation : "positive" si présent, "negative" si absent/nié
 - famille : "patient" pour le patient, "family" pour antécédent familial
 - suspicion : "confirmed" si certain, "suspected" si suspecté
-- antecedent : "current" si actuel, "history" si antécédent médical
+- antecedent : "current" si actuel, "history" si antécédent médical"""
+
+def _clean_concept(concept: Dict[str, Any]) -> Dict[str, str]:
+    """Champs textuels d'un concept renvoyé par Gemini (code numérique converti, null ignoré)"""
+    cleaned = {}
+    for field, value in concept.items():
+        if field == "code_classification" and isinstance(value, int) and not isinstance(value, bool):
+            value = str(value)
+        if isinstance(value, str):
+            cleaned[field] = value
+    return cleaned
+
+def _estimate_tokens(text: str) -> int:
+    """Estimation grossière du nombre de tokens d'un texte français (≈ 4 caractères par token)"""
+    return len(text) // 4 + 1
+
+class SNOMEDExtractor:
+    """Extracteur d'informations SNOMED CT à partir de notes médicales"""
+    
+    def __init__(self):
+        """Initialiser l'extracteur avec le modèle Gemini"""
+        Config.validate()
+        genai.configure(api_key=Config.GOOGLE_API_KEY)
+        # Modèle configurable
+        self.model_name = Config.GEMINI_MODEL
+        # Configuration de génération du modèle (vide : valeurs par défaut de Gemini),
+        # incluse dans la clé du cache des réponses
+        self.generation_config: Dict[str, Any] = {}
+        self.model = genai.GenerativeModel(self.model_name, generation_config=self.generation_config or None)
+    
+    def set_model(self, model_name: str):
+        """Changer le modèle utilisé"""
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(self.model_name, generation_config=self.generation_config or None)
+        print(f"🔄 Modèle changé vers : {model_name}")
+    
+    def create_extraction_prompt(self, medical_note: str) -> str:
+        """Créer un prompt éducatif optimisé pour extraction complète"""
+        prompt = f"""Dans un contexte éducatif de classification médicale, analyse ce cas d'étude :
+
+{medical_note}
+
+{EXTRACTION_TARGETS}
+
+Format JSON requis :
+{{
+  "concepts_medicaux": [
+{textwrap.indent(CONCEPT_FORMAT, "    ")}
+  ]
+}}
+
+{EXTRACTION_RULES}
 
 Retourne uniquement le JSON avec les concepts des 3 hiérarchies ciblées."""
         return prompt
     
-    def extract_snomed_info(self, medical_note: MedicalNote) -> SNOMEDExtraction:
-        """Extraction optimisée ONE-SHOT avec codes SNOMED CT et modifieurs contextuels"""
+    def create_batch_extraction_prompt(self, notes: Dict[str, str]) -> str:
+        """
+        Créer un prompt d'extraction regroupant plusieurs notes
+        
+        Args:
+            notes: {identifiant du cas: contenu de la note}
+        """
+        cases = "\n\n".join(f"=== CAS {note_id} ===\n{content}" for note_id, content in notes.items())
+        ids = ", ".join(notes)
+        prompt = f"""Dans un contexte éducatif de classification médicale, analyse ces {len(notes)} cas d'étude, chacun précédé de son identifiant :
+
+{cases}
+
+Pour CHAQUE cas, séparément des autres :
+{EXTRACTION_TARGETS}
+
+Format JSON requis (une entrée par identifiant de cas) :
+{{
+  "cas": {{
+    "<identifiant>": {{
+      "concepts_medicaux": [
+{textwrap.indent(CONCEPT_FORMAT, "        ")}
+      ]
+    }}
+  }}
+}}
+
+{EXTRACTION_RULES}
+
+Retourne uniquement le JSON, avec une entrée pour chacun des cas : {ids}."""
+        return prompt
+    
+    def extract_snomed_info(self, medical_note: MedicalNote, sample: int = 0) -> SNOMEDExtraction:
+        """Extraction optimisée ONE-SHOT (version synchrone de extract_snomed_info_async)"""
+        return run_sync(self.extract_snomed_info_async(medical_note, sample))
+    
+    def _active_validator(self) -> SNOMEDValidator:
+        """
+        Validateur de la release active, à récupérer une fois par requête
+        
+        Il est conservé jusqu'à la fin de la requête : une release remplacée à
+        chaud pendant la requête ne sert qu'aux requêtes suivantes.
+        """
+        release = get_snomed_release(hierarchies=Config.SNOMED_HIERARCHIES)
+        release.refresh()
+        return release.validator
+    
+    async def extract_notes_async(self, medical_notes: List[MedicalNote]) -> List[SNOMEDExtraction]:
+        """
+        Extraction ONE-SHOT de plusieurs notes en parallèle
+        
+        Les appels sont bornés par le sémaphore global (Config.GEMINI_MAX_CONCURRENCY).
+        
+        Returns:
+            Les extractions, dans l'ordre des notes
+        """
+        snomed_release = (await asyncio.to_thread(self._active_validator)).release_version
+        return list(await asyncio.gather(*(self._extract_note_async(note, 0, snomed_release)
+                                           for note in medical_notes)))
+    
+    def extract_batch(self, medical_notes: List[MedicalNote]) -> List[SNOMEDExtraction]:
+        """Extraction de plusieurs notes par prompts groupés (version synchrone de extract_batch_async)"""
+        return run_sync(self.extract_batch_async(medical_notes))
+    
+    async def extract_batch_async(self, medical_notes: List[MedicalNote]) -> List[SNOMEDExtraction]:
+        """
+        Extraction de plusieurs notes en regroupant les notes courtes dans un même prompt
+        
+        Les notes sont réparties, dans l'ordre, en lots d'au plus Config.BATCH_MAX_NOTES
+        dont le prompt reste sous Config.BATCH_MAX_PROMPT_TOKENS : la consigne n'est
+        envoyée qu'une fois par lot et chaque lot ne coûte qu'un appel. Une note dont
+        le résultat manque ou est illisible dans la réponse du lot est extraite seule.
+        
+        Returns:
+            Les extractions, dans l'ordre des notes
+        """
+        snomed_release = (await asyncio.to_thread(self._active_validator)).release_version
+        batches = self._pack_notes(medical_notes)
+        print(f"📦 {len(medical_notes)} notes réparties en {len(batches)} appel(s)")
+        extractions = await asyncio.gather(*(self._extract_packed_notes(batch, snomed_release)
+                                             for batch in batches))
+        return [extraction for batch in extractions for extraction in batch]
+    
+    def _pack_notes(self, medical_notes: List[MedicalNote]) -> List[List[MedicalNote]]:
+        """Répartir les notes, dans l'ordre, en lots respectant le budget de tokens"""
+        overhead = _estimate_tokens(self.create_batch_extraction_prompt({}))
+        batches, batch, batch_tokens = [], [], overhead
+        for note in medical_notes:
+            # Identifiant et séparateur du cas compris
+            note_tokens = _estimate_tokens(note.content) + 10
+            if batch and (len(batch) >= Config.BATCH_MAX_NOTES
+                          or batch_tokens + note_tokens > Config.BATCH_MAX_PROMPT_TOKENS):
+                batches.append(batch)
+                batch, batch_tokens = [], overhead
+            batch.append(note)
+            batch_tokens += note_tokens
+        if batch:
+            batches.append(batch)
+        return batches
+    
+    async def _extract_packed_notes(self, medical_notes: List[MedicalNote],
+                                    snomed_release: Optional[str] = None) -> List[SNOMEDExtraction]:
+        """Extraction d'un lot de notes en un appel, notes illisibles extraites seules"""
+        if len(medical_notes) == 1:
+            return [await self._extract_note_async(medical_notes[0], 0, snomed_release)]
+        
+        note_ids = [f"N{i}" for i in range(1, len(medical_notes) + 1)]
+        prompt = self.create_batch_extraction_prompt(
+            {note_id: note.content for note_id, note in zip(note_ids, medical_notes)})
+        cache_stats = {"hits": 0, "misses": 0}
+        cases = {}
         try:
-            # 🛡️ SÉCURITÉ : Vérifier les limites avant l'appel API
-            can_proceed, message = security_manager.can_make_request()
-            if not can_proceed:
-                print(f"🚫 EXTRACTION BLOQUÉE : {message}")
-                print("⏰ Réessayez plus tard ou contactez l'administrateur")
-                return self._create_empty_extraction(medical_note)
-            
-            print(f"🔒 Sécurité : {message}")
+            response_text = await self._generate_text_async(prompt, estimated_cost=0.015, cache_stats=cache_stats)
+            cases = self._parse_batch_response(response_text)
+        except Exception as e:
+            print(f"❌ Erreur extraction groupée : {e}")
+        
+        extractions = {}
+        for note_id, note in zip(note_ids, medical_notes):
+            concepts = cases.get(note_id)
+            if concepts is None:
+                print(f"🔁 Cas {note_id} absent de la réponse groupée : extraction seule")
+                continue
+            try:
+                extractions[note_id] = self._build_extraction(note, concepts, dict(cache_stats), snomed_release)
+            except Exception as e:
+                print(f"🔁 Cas {note_id} illisible dans la réponse groupée ({e}) : extraction seule")
+        
+        # Notes à extraire seules, en parallèle
+        fallback_ids = [note_id for note_id in note_ids if note_id not in extractions]
+        fallbacks = await asyncio.gather(*(self._extract_note_async(medical_notes[note_ids.index(note_id)], 0,
+                                                                    snomed_release)
+                                           for note_id in fallback_ids))
+        extractions.update(zip(fallback_ids, fallbacks))
+        return [extractions[note_id] for note_id in note_ids]
+    
+    def _parse_batch_response(self, response_text: str) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Parser la réponse JSON d'un prompt groupé
+        
+        Returns:
+            {identifiant du cas: concepts_medicaux}, sans les cas absents ou mal formés ;
+            les concepts sans terme sont écartés, les autres champs non textuels ignorés
+        """
+        json_match = re.search(r'\{.*\}', response_text or "", re.DOTALL)
+        if not json_match:
+            print("❌ Aucun JSON trouvé dans la réponse groupée")
+            return {}
+        try:
+            cases = json.loads(json_match.group()).get("cas", {})
+        except (json.JSONDecodeError, AttributeError) as e:
+            print(f"❌ Erreur parsing JSON groupé : {e}")
+            return {}
+        if not isinstance(cases, dict):
+            return {}
+        return {
+            note_id: [_clean_concept(concept) for concept in case["concepts_medicaux"]
+                      if isinstance(concept, dict) and isinstance(concept.get("concept"), str)]
+            for note_id, case in cases.items()
+            if isinstance(case, dict) and isinstance(case.get("concepts_medicaux"), list)
+        }
+    
+    async def extract_snomed_info_async(self, medical_note: MedicalNote, sample: int = 0) -> SNOMEDExtraction:
+        """
+        Extraction optimisée ONE-SHOT avec codes SNOMED CT et modifieurs contextuels
+
+        Args:
+            sample: Rang de l'extraction pour une même note (modes à extractions multiples),
+                    chaque rang ayant sa propre réponse en cache
+        """
+        snomed_release = (await asyncio.to_thread(self._active_validator)).release_version
+        return await self._extract_note_async(medical_note, sample, snomed_release)
+    
+    async def _extract_note_async(self, medical_note: MedicalNote, sample: int,
+                                  snomed_release: Optional[str]) -> SNOMEDExtraction:
+        """Extraction ONE-SHOT d'une note, la release de la requête étant déjà fixée"""
+        cache_stats = {"hits": 0, "misses": 0}
+        try:
+            # 🛡️ SÉCURITÉ : limites vérifiées avant chaque appel non servi par le cache
             print("🔍 Extraction ONE-SHOT avec modifieurs contextuels...")
             
             prompt = self.create_extraction_prompt(medical_note.content)
             
-            response = self.model.generate_content(prompt)
-            
-            # 🛡️ SÉCURITÉ : Enregistrer l'appel API réussi
-            security_manager.record_api_call(estimated_cost=0.015)  # Coût estimé pour Gemini Flash
+            # Coût estimé pour Gemini Flash
+            response_text = await self._generate_text_async(prompt, sample=sample, estimated_cost=0.015,
+                                                            cache_stats=cache_stats)
             security_manager.print_usage_warning()
             
-            if hasattr(response, 'candidates') and response.candidates:
-                candidate = response.candidates[0]
-                
-                if hasattr(candidate, 'finish_reason') and candidate.finish_reason == 2:
-                    print("❌ Extraction bloquée par filtres de sécurité")
-                    return self._create_empty_extraction(medical_note)
-                
-                if hasattr(response, 'text') and response.text:
-                    response_text = response.text
-                elif hasattr(candidate.content, 'parts') and candidate.content.parts:
-                    response_text = "".join([part.text for part in candidate.content.parts if hasattr(part, 'text')])
-                else:
-                    print("❌ Pas de texte dans la réponse")
-                    return self._create_empty_extraction(medical_note)
-            else:
-                print("❌ Pas de candidat dans la réponse")
-                return self._create_empty_extraction(medical_note)
+            if not response_text:
+                return self._create_empty_extraction(medical_note, cache_stats, snomed_release)
             
             print("✅ Réponse reçue, parsing...")
             
             # Parser la réponse simple
             parsed_data = self.parse_gemini_response(response_text)
-            
-            # Convertir le format en objets SNOMED CT
-            clinical_findings = []
-            procedures = []
-            body_structures = []
-            
-            # Traiter les termes médicaux avec codes et modifieurs fournis par Gemini
-            for terme_data in parsed_data.get("concepts_medicaux", []):
-                terme = terme_data.get("concept", "")
-                categorie = terme_data.get("categorie", "").lower()
-                code_snomed = terme_data.get("code_classification", "UNKNOWN")
-                
-                # Extraire les modifieurs contextuels
-                negation = terme_data.get("negation", "positive")
-                family = terme_data.get("famille", "patient")  # Note: "famille" en français dans le JSON
-                suspicion = terme_data.get("suspicion", "confirmed")
-                antecedent = terme_data.get("antecedent", "current")
-                
-                if "symptome" in categorie or "diagnostic" in categorie or "finding" in categorie or "clinical_finding" in categorie:
-                    clinical_findings.append(ClinicalFinding(
-                        term=terme,
-                        description=f"Constatation clinique : {terme}",
-                        context=f"Extrait de la note médicale",
-                        snomed_code=code_snomed,
-                        snomed_term_fr=terme,
-                        negation=negation,
-                        family=family,
-                        suspicion=suspicion,
-                        antecedent=antecedent
-                    ))
-                elif "traitement" in categorie or "procedure" in categorie or "intervention" in categorie:
-                    procedures.append(Procedure(
-                        term=terme,
-                        description=f"Intervention/Procédure : {terme}",
-                        context=f"Extrait de la note médicale",
-                        snomed_code=code_snomed,
-                        snomed_term_fr=terme,
-                        negation=negation,
-                        family=family,
-                        suspicion=suspicion,
-                        antecedent=antecedent
-                    ))
-                elif "anatomie" in categorie or "structure" in categorie or "corps" in categorie or "body_structure" in categorie:
-                    body_structures.append(BodyStructure(
-                        term=terme,
-                        description=f"Structure corporelle : {terme}",
-                        context=f"Extrait de la note médicale",
-                        snomed_code=code_snomed,
-                        snomed_term_fr=terme,
-                        negation=negation,
-                        family=family,
-                        suspicion=suspicion,
-                        antecedent=antecedent
-                    ))
-                else:
-                    # Ignorer les termes qui ne correspondent à aucune des 3 hiérarchies ciblées
-                    print(f"⚠️  Terme ignoré (hors hiérarchies ciblées) : {terme} ({categorie})")
-                    continue
-            
-            print(f"✅ Extraction réussie : {len(clinical_findings)} constatations, {len(procedures)} procédures, {len(body_structures)} structures")
-            return SNOMEDExtraction(
-                original_note=medical_note,
-                clinical_findings=clinical_findings,
-                procedures=procedures,
-                body_structures=body_structures
-            )
+            return self._build_extraction(medical_note, parsed_data.get("concepts_medicaux", []), cache_stats,
+                                          snomed_release)
             
         except Exception as e:
             print(f"❌ Erreur extraction : {e}")
-            return self._create_empty_extraction(medical_note)
+            return self._create_empty_extraction(medical_note, cache_stats, snomed_release)
+    
+    def _build_extraction(self, medical_note: MedicalNote, concepts: List[Dict[str, Any]],
+                          cache_stats: Optional[Dict[str, int]] = None,
+                          snomed_release: Optional[str] = None) -> SNOMEDExtraction:
+        """Convertir les concepts renvoyés par Gemini ("concepts_medicaux") en extraction SNOMED CT"""
+        # Convertir le format en objets SNOMED CT
+        clinical_findings = []
+        procedures = []
+        body_structures = []
+        
+        # Traiter les termes médicaux avec codes et modifieurs fournis par Gemini
+        for terme_data in concepts:
+            terme = terme_data.get("concept", "")
+            categorie = terme_data.get("categorie", "").lower()
+            code_snomed = terme_data.get("code_classification", "UNKNOWN")
+            
+            # Extraire les modifieurs contextuels
+            negation = terme_data.get("negation", "positive")
+            family = terme_data.get("famille", "patient")  # Note: "famille" en français dans le JSON
+            suspicion = terme_data.get("suspicion", "confirmed")
+            antecedent = terme_data.get("antecedent", "current")
+            
+            if "symptome" in categorie or "diagnostic" in categorie or "finding" in categorie or "clinical_finding" in categorie:
+                clinical_findings.append(ClinicalFinding(
+                    term=terme,
+                    description=f"Constatation clinique : {terme}",
+                    context=f"Extrait de la note médicale",
+                    snomed_code=code_snomed,
+                    snomed_term_fr=terme,
+                    negation=negation,
+                    family=family,
+                    suspicion=suspicion,
+                    antecedent=antecedent
+                ))
+            elif "traitement" in categorie or "procedure" in categorie or "intervention" in categorie:
+                procedures.append(Procedure(
+                    term=terme,
+                    description=f"Intervention/Procédure : {terme}",
+                    context=f"Extrait de la note médicale",
+                    snomed_code=code_snomed,
+                    snomed_term_fr=terme,
+                    negation=negation,
+                    family=family,
+                    suspicion=suspicion,
+                    antecedent=antecedent
+                ))
+            elif "anatomie" in categorie or "structure" in categorie or "corps" in categorie or "body_structure" in categorie:
+                body_structures.append(BodyStructure(
+                    term=terme,
+                    description=f"Structure corporelle : {terme}",
+                    context=f"Extrait de la note médicale",
+                    snomed_code=code_snomed,
+                    snomed_term_fr=terme,
+                    negation=negation,
+                    family=family,
+                    suspicion=suspicion,
+                    antecedent=antecedent
+                ))
+            else:
+                # Ignorer les termes qui ne correspondent à aucune des 3 hiérarchies ciblées
+                print(f"⚠️  Terme ignoré (hors hiérarchies ciblées) : {terme} ({categorie})")
+                continue
+        
+        print(f"✅ Extraction réussie : {len(clinical_findings)} constatations, {len(procedures)} procédures, {len(body_structures)} structures")
+        return SNOMEDExtraction(
+            original_note=medical_note,
+            clinical_findings=clinical_findings,
+            procedures=procedures,
+            body_structures=body_structures,
+            snomed_release=snomed_release,
+            gemini_cache=cache_stats
+        )
     
     def parse_gemini_response(self, response_text: str) -> Dict[str, Any]:
         """Parser la réponse JSON de Gemini"""
@@ -231,66 +426,223 @@ Retourne uniquement le JSON avec les concepts des 3 hiérarchies ciblées."""
         print("❌ Pas de texte dans la réponse")
         return ""
     
-    def _create_empty_extraction(self, medical_note: MedicalNote) -> SNOMEDExtraction:
+    def _cache_key(self, prompt: str, sample: int = 0) -> str:
+        """Clé du cache des réponses pour ce prompt (modèle et configuration de génération compris)"""
+        return response_cache.make_key(self.model_name, prompt, self.generation_config, sample)
+    
+    def _generate_text(self, prompt: str, sample: int = 0, estimated_cost: Optional[float] = None,
+                       cache_stats: Optional[Dict[str, int]] = None) -> str:
+        """Version synchrone de _generate_text_async"""
+        return run_sync(self._generate_text_async(prompt, sample, estimated_cost, cache_stats))
+    
+    async def _generate_text_async(self, prompt: str, sample: int = 0, estimated_cost: Optional[float] = None,
+                                   cache_stats: Optional[Dict[str, int]] = None) -> str:
+        """
+        Texte de la réponse Gemini à un prompt, relu dans le cache si l'appel a déjà été fait
+        
+        Un appel servi par le cache n'est ni soumis aux limites de security_manager ni
+        décompté ; sinon, l'appel est réservé avant d'être envoyé et refusé ("" renvoyé)
+        une fois les limites atteintes. Un appel en échec rend sa réservation.
+        
+        Args:
+            prompt: Prompt envoyé à Gemini
+            sample: Rang du tirage pour un même prompt (voir GeminiResponseCache.make_key)
+            estimated_cost: Coût estimé réservé auprès de security_manager (None : non décompté)
+            cache_stats: Compteurs {"hits", "misses"} de la requête, incrémentés
+            
+        Returns:
+            Le texte de la réponse ("" si bloquée ou vide)
+        """
+        # Accès SQLite hors de la boucle Gemini (un verrou de la base ne bloque pas les autres appels)
+        key = self._cache_key(prompt, sample)
+        cached = await asyncio.to_thread(response_cache.get, key)
+        if cached is not None:
+            if cache_stats is not None:
+                cache_stats["hits"] += 1
+            print("💾 Réponse Gemini relue dans le cache")
+            return cached
+        if cache_stats is not None:
+            cache_stats["misses"] += 1
+        
+        # 🛡️ SÉCURITÉ : Réserver l'appel avant de l'envoyer (vérification et décompte d'un
+        # seul tenant, pour que des appels simultanés ne dépassent pas ensemble les limites)
+        if estimated_cost is not None:
+            reservation, message = security_manager.reserve_api_call(estimated_cost=estimated_cost)
+            can_proceed = reservation is not None
+        else:
+            reservation = None
+            can_proceed, message = security_manager.can_make_request()
+        if not can_proceed:
+            print(f"🚫 APPEL GEMINI BLOQUÉ : {message}")
+            print("⏰ Réessayez plus tard ou contactez l'administrateur")
+            return ""
+        print(f"🔒 Sécurité : {message}")
+        
+        try:
+            response = await gemini_call(self.model.generate_content_async(prompt))
+        except Exception:
+            # Appel en échec : la réservation est rendue (un appel annulé reste décompté)
+            if reservation is not None:
+                security_manager.release_api_call(reservation)
+            raise
+        
+        response_text = self._extract_response_text(response)
+        if response_text:
+            await asyncio.to_thread(response_cache.put, key, self.model_name, response_text)
+        return response_text
+    
+    async def _sample_until_consensus(self, run_sample: Callable[[int], Any],
+                                      validated_codes: Callable[[Any], Set[str]]) -> Tuple[List[Any], Dict[str, Any]]:
+        """
+        Extractions d'une même note jusqu'à consensus
+        
+        Config.CONSENSUS_MIN_SAMPLES extractions sont lancées ensemble. À l'arrivée de
+        chacune, ses codes validés sont comparés à ceux des extractions déjà reçues
+        (indice de Jaccard avec leur union) : dès que l'accord atteint
+        Config.CONSENSUS_AGREEMENT, les extractions en cours sont annulées. Des
+        extractions sans aucun code validé (échec d'appel ou de parsing) ne comptent
+        jamais comme un accord. Sinon, une
+        fois toutes les extractions lancées reçues, une nouvelle est lancée, jusqu'à
+        Config.CONSENSUS_MAX_SAMPLES.
+        
+        Args:
+            run_sample: Fonction (rang de l'extraction) -> coroutine de l'extraction
+            validated_codes: Fonction (résultat d'une extraction) -> codes validés, exécutée
+                             dans un thread (la validation ne bloque pas la boucle Gemini)
+            
+        Returns:
+            (résultats reçus dans l'ordre des rangs,
+             {"samples", "max_samples", "calls_saved", "agreement"})
+        """
+        max_samples = max(Config.CONSENSUS_MAX_SAMPLES, 1)
+        tasks = {}
+        
+        def launch():
+            rank = len(tasks)
+            tasks[asyncio.ensure_future(run_sample(rank))] = rank
+        
+        for _ in range(min(max(Config.CONSENSUS_MIN_SAMPLES, 1), max_samples)):
+            launch()
+        pending = set(tasks)
+        received = {}
+        seen_codes: Set[str] = set()
+        agreement = None
+        shared = False
+        
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=tasks.get):
+                    result = task.result()
+                    codes = await asyncio.to_thread(validated_codes, result)
+                    if received:
+                        union = seen_codes | codes
+                        shared = bool(seen_codes & codes)
+                        agreement = len(seen_codes & codes) / len(union) if union else None
+                        if agreement is not None:
+                            print(f"🤝 Accord extraction {tasks[task] + 1} / précédentes : {agreement:.2f}")
+                    received[tasks[task]] = result
+                    seen_codes |= codes
+                if shared and agreement >= Config.CONSENSUS_AGREEMENT:
+                    break
+                if not pending and len(tasks) < max_samples:
+                    launch()
+                    pending = {task for task, rank in tasks.items() if rank not in received}
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        
+        calls_saved = max_samples - len(received)
+        if calls_saved:
+            print(f"💡 Consensus atteint après {len(received)} extraction(s) : {calls_saved} appel(s) économisé(s)")
+        consensus = {
+            "samples": len(received),
+            "max_samples": max_samples,
+            "calls_saved": calls_saved,
+            "agreement": agreement,
+        }
+        return [received[rank] for rank in sorted(received)], consensus
+    
+    def _create_empty_extraction(self, medical_note: MedicalNote,
+                                 cache_stats: Optional[Dict[str, int]] = None,
+                                 snomed_release: Optional[str] = None) -> SNOMEDExtraction:
         """Créer une extraction vide en cas d'erreur"""
         return SNOMEDExtraction(
             original_note=medical_note,
             clinical_findings=[],
             procedures=[],
-            body_structures=[]
+            body_structures=[],
+            snomed_release=snomed_release,
+            gemini_cache=cache_stats
         ) 
     
-    def extract_triple_parallel(self, medical_note: MedicalNote) -> SNOMEDExtraction:
-        """Extraction avec 3 appels parallèles pour améliorer la robustesse"""
+    def extract_triple_parallel(self, medical_note: MedicalNote, n_calls: int = 3) -> SNOMEDExtraction:
+        """Extraction avec 3 appels parallèles (version synchrone de extract_triple_parallel_async)"""
+        return run_sync(self.extract_triple_parallel_async(medical_note, n_calls))
+    
+    async def extract_triple_parallel_async(self, medical_note: MedicalNote, n_calls: int = 3) -> SNOMEDExtraction:
+        """
+        Extraction avec 3 appels parallèles pour améliorer la robustesse
+        
+        Les appels sont lancés ensemble ; chaque réponse est analysée et fusionnée
+        dès son arrivée, la durée totale est donc proche de celle de l'appel le plus lent.
+        
+        Args:
+            n_calls: Nombre d'appels à Gemini avec le même prompt
+        """
+        snomed_release = None
         try:
-            # 🛡️ SÉCURITÉ : Vérifier les limites avant les appels API
-            can_proceed, message = security_manager.can_make_request()
-            if not can_proceed:
-                print(f"🚫 EXTRACTION BLOQUÉE : {message}")
-                return self._create_empty_extraction(medical_note)
-            
-            print(f"🔒 Sécurité : {message}")
+            # 🛡️ SÉCURITÉ : limites vérifiées avant chaque appel non servi par le cache
             print("🔍 Extraction TRIPLE PARALLÈLE commencée...")
+            snomed_release = (await asyncio.to_thread(self._active_validator)).release_version
             
             prompt = self.create_extraction_prompt(medical_note.content)
             
-            # Faire 3 appels parallèles avec le même prompt
-            print("📋 Lancement de 3 appels parallèles à Gemini...")
-            
-            responses = []
-            for i in range(3):
-                print(f"🔄 Appel {i+1}/3...")
-                response = self.model.generate_content(prompt)
-                security_manager.record_api_call(estimated_cost=0.02)
-                responses.append(response)
+            # Faire n_calls appels parallèles avec le même prompt
+            print(f"📋 Lancement de {n_calls} appels parallèles à Gemini...")
+            parallel_start = time.time()
             
-            print("✅ 3 appels terminés, analyse des réponses...")
+            cache_stats = {"hits": 0, "misses": 0}
+            call_times = [0.0] * n_calls
             
-            # Collecter tous les termes de tous les appels
-            all_terms = []
-            
-            for i, response in enumerate(responses):
-                print(f"📊 Analyse réponse {i+1}/3...")
-                response_text = self._extract_response_text(response)
-                if response_text:
-                    parsed_data = self.parse_gemini_response(response_text)
-                    terms = parsed_data.get("concepts_medicaux", [])
-                    print(f"   → {len(terms)} termes extraits")
-                    all_terms.extend(terms)
-                else:
-                    print(f"   → Échec de l'extraction")
-            
-            print(f"🔄 Total combiné : {len(all_terms)} termes")
-            
-            # Dédupliquer par terme (garder le premier trouvé)
+            async def timed_call(i):
+                call_start = time.time()
+                try:
+                    response_text = await self._generate_text_async(prompt, sample=i, estimated_cost=0.02,
+                                                                    cache_stats=cache_stats)
+                except Exception as e:
+                    # Un appel en échec ne coûte que sa propre réponse
+                    print(f"❌ Appel {i+1}/{n_calls} en échec : {e}")
+                    response_text = ""
+                call_times[i] = time.time() - call_start
+                return i, response_text
+            
+            # Analyser et fusionner chaque réponse dès son arrivée
+            # (dédupliquer par terme en gardant le premier trouvé)
+            total_terms = 0
             seen_terms = set()
             unique_terms = []
-            for term_data in all_terms:
-                terme = term_data.get("concept", "").lower().strip()
-                if terme and terme not in seen_terms:
-                    seen_terms.add(terme)
-                    unique_terms.append(term_data)
             
+            for next_response in asyncio.as_completed([timed_call(i) for i in range(n_calls)]):
+                i, response_text = await next_response
+                print(f"📊 Analyse réponse {i+1}/{n_calls} (reçue en ⏱️ {call_times[i]:.2f}s)...")
+                if not response_text:
+                    print(f"   → Échec de l'extraction")
+                    continue
+                terms = self.parse_gemini_response(response_text).get("concepts_medicaux", [])
+                print(f"   → {len(terms)} termes extraits")
+                total_terms += len(terms)
+                for term_data in terms:
+                    terme = term_data.get("concept", "").lower().strip()
+                    if terme and terme not in seen_terms:
+                        seen_terms.add(terme)
+                        unique_terms.append(term_data)
+            
+            parallel_time = time.time() - parallel_start
+            print(f"✅ {n_calls} appels terminés en ⏱️ {parallel_time:.2f}s (vs {sum(call_times):.2f}s séquentiel)")
+            print(f"🔄 Total combiné : {total_terms} termes")
             print(f"✅ Après déduplication : {len(unique_terms)} termes uniques")
             
             # Convertir en objets SNOMED CT
@@ -353,55 +705,64 @@ Retourne uniquement le JSON avec les concepts des 3 hiérarchies ciblées."""
                 original_note=medical_note,
                 clinical_findings=clinical_findings,
                 procedures=procedures,
-                body_structures=body_structures
+                body_structures=body_structures,
+                snomed_release=snomed_release,
+                gemini_cache=cache_stats,
+                call_times=call_times
             )
             
         except Exception as e:
             print(f"❌ Erreur extraction triple parallèle : {e}")
-            return self._create_empty_extraction(medical_note)
+            return self._create_empty_extraction(medical_note, snomed_release=snomed_release)
     
     def extract_triple_with_validation_fusion(self, medical_note: MedicalNote) -> SNOMEDExtraction:
         """
         MÉTHODE ULTIME : 3 extractions + validation + fusion de TOUS les résultats validés
         Collecte et combine tous les termes validés des 3 extractions pour maximiser le résultat
+        (extractions arrêtées dès consensus, voir _sample_until_consensus)
         """
+        snomed_release = None
         try:
-            # 🛡️ SÉCURITÉ : Vérifier les limites avant les appels API
-            can_proceed, message = security_manager.can_make_request()
-            if not can_proceed:
-                print(f"🚫 EXTRACTION BLOQUÉE : {message}")
-                return self._create_empty_extraction(medical_note)
-            
-            print(f"🔒 Sécurité : {message}")
+            # 🛡️ SÉCURITÉ : limites vérifiées avant chaque appel non servi par le cache
             print("🎯 EXTRACTION TRIPLE + VALIDATION + FUSION commencée...")
             
-            # Charger le validateur une seule fois pour toutes les validations
-            validator = SNOMEDValidator()
+            # Validateur de la release active, conservé pour toute la requête
+            validator = self._active_validator()
+            snomed_release = validator.release_version
             print("✅ Validateur SNOMED CT chargé")
             
-            # Lancer 3 extractions séquentielles avec validation immédiate
+            def extraction_items(extraction):
+                return extraction.clinical_findings + extraction.procedures + extraction.body_structures
+            
+            def validated_codes(extraction):
+                codes = [item.snomed_code for item in extraction_items(extraction)]
+                return {code for code, valid in zip(codes, validator.validate_codes(codes)) if valid}
+            
+            # Lancer les extractions jusqu'à consensus (3 au plus) ; chaque appel est
+            # décompté par extract_snomed_info (sauf réponse relue dans le cache)
+            extractions, consensus = run_sync(self._sample_until_consensus(
+                lambda i: self._extract_note_async(medical_note, i, snomed_release), validated_codes))
+            
+            # Validation des termes de chaque extraction
+            cache_stats = {"hits": 0, "misses": 0}
             all_valid_items = []
             extraction_stats = []
             
-            for i in range(3):
-                print(f"\n🔄 === EXTRACTION {i+1}/3 ===")
-                
-                # Extraction avec Gemini
-                extraction = self.extract_snomed_info(medical_note)
-                security_manager.record_api_call(estimated_cost=0.02)
+            for i, extraction in enumerate(extractions):
+                print(f"\n🔄 === EXTRACTION {i+1}/{len(extractions)} ===")
+                for counter, count in (extraction.gemini_cache or {}).items():
+                    cache_stats[counter] += count
                 
                 # Collecter tous les items extraits
-                all_items = (extraction.clinical_findings + 
-                           extraction.procedures + 
-                           extraction.body_structures)
+                all_items = extraction_items(extraction)
                 
                 print(f"📊 Extraction {i+1} : {len(all_items)} termes extraits")
                 
                 # Validation immédiate des termes de cette extraction
-                valid_items_this_round = []
-                for item in all_items:
-                    if validator.validate_code(item.snomed_code):
-                        valid_items_this_round.append(item)
+                valid_items_this_round = [
+                    item for item, valid in zip(all_items, validator.validate_codes([item.snomed_code for item in all_items]))
+                    if valid
+                ]
                 
                 print(f"✅ Validation {i+1} : {len(valid_items_this_round)}/{len(all_items)} termes validés")
                 
@@ -467,6 +828,7 @@ Retourne uniquement le JSON avec les concepts des 3 hiérarchies ciblées."""
             print(f"   📊 Avant fusion : max {max(stats['valid'] for stats in extraction_stats)} entités validées")
             print(f"   ✨ Après fusion : {len(unique_valid_items)} entités uniques")
             print(f"   📈 GAIN : +{gain} entités supplémentaires !")
+            print(f"   💡 Extractions : {consensus['samples']}/{consensus['max_samples']} ({consensus['calls_saved']} appel(s) économisé(s))")
             
             security_manager.print_usage_warning()
             
@@ -474,21 +836,23 @@ Retourne uniquement le JSON avec les concepts des 3 hiérarchies ciblées."""
                 original_note=medical_note,
                 clinical_findings=final_clinical_findings,
                 procedures=final_procedures,
-                body_structures=final_body_structures
+                body_structures=final_body_structures,
+                snomed_release=snomed_release,
+                gemini_cache=cache_stats
             )
             
         except Exception as e:
             print(f"❌ Erreur extraction triple + fusion : {e}")
             import traceback
             traceback.print_exc()
-            return self._create_empty_extraction(medical_note)
+            return self._create_empty_extraction(medical_note, snomed_release=snomed_release)
     
     async def extract_triple_with_validation_fusion_v2(self, text, use_context_modifiers=True):
         """
         MÉTHODE ULTIME V2 : Triple extraction parallèle + validation SNOMED + validation sémantique finale
         
         Processus optimisé :
-        1. 3 extractions Gemini Pro EN PARALLÈLE (chronométrées)
+        1. Extractions Gemini Pro EN PARALLÈLE (chronométrées), 3 au plus, arrêtées dès consensus
         2. Validation SNOMED de chaque extraction (chronométrée)  
         3. Fusion + déduplication par code SNOMED (chronométrée)
         4. Validation sémantique hybride SUR LE TABLEAU FINAL SEULEMENT (chronométrée)
@@ -499,49 +863,51 @@ Retourne uniquement le JSON avec les concepts des 3 hiérarchies ciblées."""
         print("🎯 EXTRACTION ULTIME V2 : Triple extraction parallèle + validation SNOMED + validation sémantique finale")
         start_time = time.time()
         
-        # Vérifications préliminaires
-        if not self._security_check():
+        # Vérifications préliminaires (une note déjà extraite reste servie par le cache)
+        if not await self._security_check(self.create_extraction_prompt(text)):
             return {"error": "Limites de sécurité dépassées"}
         
-        # Initialiser le validator SNOMED
-        if not hasattr(self, 'validator') or self.validator is None:
-            print("✅ Validateur SNOMED CT chargé")
-            self.validator = SNOMEDValidator()
+        # Validateur de la release active, propre à la requête : une release remplacée
+        # à chaud en cours de requête ne sert qu'aux requêtes suivantes
+        validator = await asyncio.to_thread(self._active_validator)
+        print("✅ Validateur SNOMED CT chargé")
         
         # === PHASE 1 : TRIPLE EXTRACTION PARALLÈLE ===
         parallel_start = time.time()
-        print("🚀 Début des 3 extractions en parallèle...")
+        print("🚀 Début des extractions en parallèle (arrêt dès consensus)...")
         
-        async def extract_single(extraction_num):
+        async def extract_single(sample):
             """Extraction individuelle avec chronométrage"""
             extraction_start = time.time()
-            print(f"🔄 === EXTRACTION {extraction_num}/3 ===")
+            print(f"🔄 === EXTRACTION {sample + 1}/{Config.CONSENSUS_MAX_SAMPLES} ===")
             
-            # CORRECTION : Utiliser asyncio.to_thread pour vraie parallélisation
-            entities = await asyncio.to_thread(
-                self.extract_medical_entities, 
-                text, 
-                use_context_modifiers
-            )
+            entities = await self.extract_medical_entities_async(text, use_context_modifiers, sample)
             
             extraction_time = time.time() - extraction_start
-            print(f"✅ Extraction {extraction_num} terminée en ⏱️ {extraction_time:.2f}s")
+            print(f"✅ Extraction {sample + 1} terminée en ⏱️ {extraction_time:.2f}s")
             return entities, extraction_time
         
-        # Exécution des 3 extractions en parallèle  
-        results = await asyncio.gather(
-            extract_single(1),
-            extract_single(2), 
-            extract_single(3)
-        )
+        def validated_codes(result):
+            entities = (result[0] or {}).get('entities', {})
+            codes = [entity.get('snomed_code', 'UNKNOWN')
+                     for group in ('findings', 'procedures', 'body_structures') for entity in entities.get(group, [])]
+            active_codes = [code for code in validator.resolve_active_codes(codes) if code]
+            return {code for code, valid in zip(active_codes, validator.validate_codes(active_codes)) if valid}
+        
+        # Exécution des extractions en parallèle, jusqu'à consensus
+        results, consensus = await self._sample_until_consensus(extract_single, validated_codes)
         
         parallel_time = time.time() - parallel_start
         individual_times = [result[1] for result in results]
-        print(f"🎯 3 extractions parallèles terminées en ⏱️ {parallel_time:.2f}s (vs {sum(individual_times):.2f}s séquentiel = Gain: {sum(individual_times) - parallel_time:.2f}s)")
+        cache_stats = {"hits": 0, "misses": 0}
+        for entities_result, _ in results:
+            for counter, count in ((entities_result or {}).get('gemini_cache') or {}).items():
+                cache_stats[counter] += count
+        print(f"🎯 {len(results)} extractions parallèles terminées en ⏱️ {parallel_time:.2f}s (vs {sum(individual_times):.2f}s séquentiel = Gain: {sum(individual_times) - parallel_time:.2f}s)")
         
         # === PHASE 2 : VALIDATION SNOMED AVEC CHRONOMÉTRAGE ===
         validation_phase_start = time.time()
-        print(f"\n🔍 === VALIDATION SNOMED (3 extractions) ===")
+        print(f"\n🔍 === VALIDATION SNOMED ({len(results)} extractions) ===")
         
         all_validated_terms = []
         extraction_stats = []
@@ -595,54 +961,101 @@ Retourne uniquement le JSON avec les concepts des 3 hiérarchies ciblées."""
             validation_start = time.time()
             validated = []
             valid_count = 0
+            unresolved = []  # Termes sans code après les 3 priorités : suggestions BM25 en lot
             
-            for term_data in all_terms:
+            def add_validated(term_data, snomed_code, snomed_term, near_exact=False):
+                validated.append({
+                    'term': term_data['term'],
+                    'snomed_code': snomed_code,
+                    'snomed_term': snomed_term,
+                    'valid': True,
+                    'near_exact': near_exact,
+                    # Préserver les modifieurs contextuels
+                    'negation': term_data.get('negation', 'positive'),
+                    'family': term_data.get('family', 'patient'),
+                    'suspicion': term_data.get('suspicion', 'confirmed'),
+                    'antecedent': term_data.get('antecedent', 'current'),
+                    'category': term_data.get('category', 'clinical_finding')
+                })
+            
+            # Recherches exactes et codes Gemini de toute l'extraction en un seul lot
+            # Description partagée par plusieurs concepts : celui de la catégorie annoncée par Gemini
+            exact_codes = validator.find_exact_term_codes(
+                [term_data['term'] for term_data in all_terms],
+                [GEMINI_CATEGORIES.get(term_data.get('category')) for term_data in all_terms]
+            )
+            # Code Gemini inactivé : remplaçant actif (associations historiques) au lieu d'un rejet
+            gemini_codes = [term_data.get('snomed_code', 'UNKNOWN') for term_data in all_terms]
+            active_codes = validator.resolve_active_codes(gemini_codes)
+            gemini_terms = validator.get_french_terms([code or '' for code in active_codes])
+            
+            for term_data, exact_code, gemini_code, active_code, gemini_term in zip(
+                    all_terms, exact_codes, gemini_codes, active_codes, gemini_terms):
                 term = term_data['term']
                 
                 # 🎯 NOUVELLE LOGIQUE PRIORITAIRE
                 snomed_code = None
                 snomed_term = None
                 
+                near_exact = False
+                
                 # 🥇 PRIORITÉ 1 : Recherche EXACTE du terme dans la base SNOMED
-                exact_code = self.validator.find_exact_term_code(term)
+                near_match = None if exact_code else self._find_near_exact_match(term, validator)
                 if exact_code:
                     snomed_code = exact_code
                     snomed_term = term 
                     print(f"   🎯 Terme EXACT trouvé : {term} → {exact_code} (UTILISE LE TERME EXACT : '{snomed_term}')")
+                elif near_match:
+                    # 🥇 PRIORITÉ 1 bis : Terme officiel à 1-2 fautes de frappe près (pas de validation sémantique)
+                    snomed_code = near_match['code']
+                    snomed_term = near_match['term']
+                    near_exact = True
+                    print(f"   🎯 Terme QUASI EXACT trouvé : {term} → {snomed_code} ('{near_match['matched_term']}', distance {near_match['distance']})")
                 else:
                     # 🥈 PRIORITÉ 2 : Vérifier si le code de Gemini existe dans notre base
-                    gemini_code = term_data.get('snomed_code', 'UNKNOWN')
-                    if gemini_code != 'UNKNOWN' and self.validator.validate_code(gemini_code):
-                        snomed_code = gemini_code
-                        snomed_term = self.validator.get_french_term(gemini_code)
-                        print(f"   ✅ Code Gemini validé : {term} → {gemini_code} ('{snomed_term}')")
+                    if gemini_code != 'UNKNOWN' and active_code:
+                        snomed_code = active_code
+                        snomed_term = gemini_term
+                        if active_code != gemini_code:
+                            print(f"   🔀 Code Gemini inactif redirigé : {term} → {gemini_code} → {active_code} ('{snomed_term}')")
+                        else:
+                            print(f"   ✅ Code Gemini validé : {term} → {gemini_code} ('{snomed_term}')")
                     else:
-                        # 🥉 PRIORITÉ 3 : Fallback - chercher nous-mêmes
-                        snomed_code = self.validator.find_closest_code(term)
-                        if snomed_code:
-                            snomed_term = self.validator.get_french_term(snomed_code)
-                            print(f"   🔍 Code trouvé par recherche : {term} → {snomed_code}")
+                        # 🥉 PRIORITÉ 3 : Fallback - recherche approximative (trigrammes) dans la base
+                        matches = validator.find_similar_terms(
+                            term, limit=1, min_similarity=Config.FUZZY_MATCH_MIN_SIMILARITY
+                        )
+                        if matches:
+                            snomed_code = matches[0]['code']
+                            snomed_term = matches[0]['term']
+                            print(f"   🔍 Code trouvé par recherche approximative : {term} → {snomed_code} ('{snomed_term}', similarité {matches[0]['score']:.2f})")
                         else:
-                            print(f"   ❌ Aucun code valide trouvé pour : {term} (Gemini: {gemini_code})")
+                            unresolved.append(term_data)
                             continue
                 
                 if snomed_code and snomed_term:
-                    validated.append({
-                        'term': term,
-                        'snomed_code': snomed_code,
-                        'snomed_term': snomed_term,
-                        'valid': True,
-                        # Préserver les modifieurs contextuels
-                        'negation': term_data.get('negation', 'positive'),
-                        'family': term_data.get('family', 'patient'),
-                        'suspicion': term_data.get('suspicion', 'confirmed'),
-                        'antecedent': term_data.get('antecedent', 'current'),
-                        'category': term_data.get('category', 'clinical_finding')
-                    })
+                    add_validated(term_data, snomed_code, snomed_term, near_exact)
                     valid_count += 1
                 else:
                     print(f"   ❌ Aucun code valide trouvé pour : {term} (Gemini: {gemini_code})")
             
+            # 🏅 PRIORITÉ 4 : Suggestions classées (BM25 sur les mots), un seul lot pour l'extraction
+            if unresolved:
+                suggestions = validator.find_ranked_terms_batch(
+                    [term_data['term'] for term_data in unresolved], limit=Config.BM25_SUGGESTIONS
+                )
+                for term_data in unresolved:
+                    term = term_data['term']
+                    candidates = [c for c in suggestions.get(term, [])
+                                  if c['coverage'] >= Config.BM25_MIN_COVERAGE and c['term']]
+                    if candidates:
+                        best = candidates[0]
+                        add_validated(term_data, best['code'], best['term'])
+                        valid_count += 1
+                        print(f"   🏅 Suggestion BM25 : {term} → {best['code']} ('{best['term']}', score {best['score']:.2f}, couverture {best['coverage']:.2f})")
+                    else:
+                        print(f"   ❌ Aucun code valide trouvé pour : {term} (Gemini: {term_data.get('snomed_code', 'UNKNOWN')})")
+            
             validation_time = time.time() - validation_start
             print(f"✅ Validation SNOMED {extraction_num} : {valid_count}/{len(all_terms)} termes validés (⏱️ {validation_time:.2f}s)")
             
@@ -676,10 +1089,12 @@ Retourne uniquement le JSON avec les concepts des 3 hiérarchies ciblées."""
         
         # Préparation des paires pour validation sémantique
         semantic_pairs = []
+        blocked_terms = []
         for term_data in unique_terms.values():
             original_term = term_data['term']
             snomed_term = term_data['snomed_term']
-            if original_term.lower() != snomed_term.lower():
+            # Les correspondances quasi exactes (fautes de frappe) n'ont pas besoin du LLM
+            if original_term.lower() != snomed_term.lower() and not term_data.get('near_exact'):
                 semantic_pairs.append((original_term, snomed_term))
         
         if not semantic_pairs:
@@ -690,7 +1105,7 @@ Retourne uniquement le JSON avec les concepts des 3 hiérarchies ciblées."""
                     'term': term_data['term'],
                     'snomed_code': term_data['snomed_code'],
                     'snomed_term': term_data['snomed_term'],
-                    'category': self._categorize_by_snomed_code(term_data['snomed_code']),
+                    'category': self._categorize_by_snomed_code(term_data['snomed_code'], validator),
                     'negation': term_data.get('negation', 'positive'),
                     'family': term_data.get('family', 'patient'),
                     'suspicion': term_data.get('suspicion', 'confirmed'),
@@ -701,7 +1116,7 @@ Retourne uniquement le JSON avec les concepts des 3 hiérarchies ciblées."""
             print(f"🔍 Validation sémantique hybride : {len(semantic_pairs)} paires à analyser")
             
             # Validation sémantique hybride
-            semantic_results = await self._validate_semantic_coherence_batch(semantic_pairs)
+            semantic_results = await self._validate_semantic_coherence_batch(semantic_pairs, cache_stats)
             
             # Application des résultats de validation sémantique
             if semantic_pairs:
@@ -731,20 +1146,27 @@ Retourne uniquement le JSON avec les concepts des 3 hiérarchies ciblées."""
                             # VÉRIFICATION FINALE : Si le terme original est une correspondance exacte pour ce code,
                             # s'assurer que le snomed_term EST le terme original.
                             # Ceci est redondant si le flux de données est parfait, mais sert de garde-fou.
-                            if self.validator.find_exact_term_code(original_term) == term_data['snomed_code']:
+                            if self._is_exact_description(original_term, term_data['snomed_code'], validator):
                                 current_snomed_term = original_term
                                 print(f"   🛡️ GARDE-FOU (Phase 5) : Pour {original_term} ({term_data['snomed_code']}), snomed_term forcé à '{current_snomed_term}'")
                             entity = {
                                 'term': term_data['term'],
                                 'snomed_code': term_data['snomed_code'],
                                 'snomed_term': current_snomed_term,
-                                'category': self._categorize_by_snomed_code(term_data['snomed_code']),
+                                'category': self._categorize_by_snomed_code(term_data['snomed_code'], validator),
                                 'negation': term_data.get('negation', 'positive'),
                                 'family': term_data.get('family', 'patient'),
                                 'suspicion': term_data.get('suspicion', 'confirmed'),
                                 'antecedent': term_data.get('antecedent', 'current')
                             }
                             final_validated.append(entity)
+                        elif semantic_result.get('blocked'):
+                            print(f"   🚫 Non validé (appel bloqué) : {original_term} → {snomed_term}")
+                            blocked_terms.append({
+                                'term': original_term,
+                                'snomed_term': snomed_term,
+                                'reason': semantic_result['reason']
+                            })
                         else:
                             print(f"   ❌ Rejeté : {original_term} → {snomed_term} ({semantic_result['reason']})")
                             rejected_terms.append({
@@ -758,14 +1180,14 @@ Retourne uniquement le JSON avec les concepts des 3 hiérarchies ciblées."""
                         # VÉRIFICATION FINALE : Si le terme original est une correspondance exacte pour ce code,
                         # s'assurer que le snomed_term EST le terme original.
                         # Ceci est redondant si le flux de données est parfait, mais sert de garde-fou.
-                        if self.validator.find_exact_term_code(original_term) == term_data['snomed_code']:
+                        if self._is_exact_description(original_term, term_data['snomed_code'], validator):
                             current_snomed_term = original_term
                             print(f"   🛡️ GARDE-FOU (Phase 5) : Pour {original_term} ({term_data['snomed_code']}), snomed_term forcé à '{current_snomed_term}'")
                         entity = {
                             'term': term_data['term'],
                             'snomed_code': term_data['snomed_code'],
                             'snomed_term': current_snomed_term,
-                            'category': self._categorize_by_snomed_code(term_data['snomed_code']),
+                            'category': self._categorize_by_snomed_code(term_data['snomed_code'], validator),
                             'negation': term_data.get('negation', 'positive'),
                             'family': term_data.get('family', 'patient'),
                             'suspicion': term_data.get('suspicion', 'confirmed'),
@@ -817,6 +1239,10 @@ Retourne uniquement le JSON avec les concepts des 3 hiérarchies ciblées."""
                 print(f"🗑️ Rejetés pour incohérence sémantique : {len(rejected_terms)}")
                 for rejected in rejected_terms:
                     print(f"   • {rejected['term']} : {rejected['reason']}")
+            if blocked_terms:
+                print(f"🚫 Non validés (validation LLM bloquée) : {len(blocked_terms)}")
+                for blocked in blocked_terms:
+                    print(f"   • {blocked['term']} → {blocked['snomed_term']}")
         
         total_validation_time = time.time() - validation_phase_start
         print(f"✅ Phase validation complète terminée en ⏱️ {total_validation_time:.2f}s")
@@ -829,12 +1255,12 @@ Retourne uniquement le JSON avec les concepts des 3 hiérarchies ciblées."""
         
         for term_data in final_validated:
             # Détection automatique de catégorie basée sur le code SNOMED
-            category = self._categorize_by_snomed_code(term_data['snomed_code'])
+            category = self._categorize_by_snomed_code(term_data['snomed_code'], validator)
             
             current_snomed_term = term_data['snomed_term']
             # VÉRIFICATION FINALE : Si le terme original est une correspondance exacte pour ce code,
             # s'assurer que le snomed_term EST le terme original.
-            if self.validator.find_exact_term_code(term_data['term']) == term_data['snomed_code']:
+            if self._is_exact_description(term_data['term'], term_data['snomed_code'], validator):
                 current_snomed_term = term_data['term']
                 print(f"   🛡️ GARDE-FOU (Phase 5) : Pour {term_data['term']} ({term_data['snomed_code']}), snomed_term forcé à '{current_snomed_term}'")
 
@@ -849,17 +1275,20 @@ Retourne uniquement le JSON avec les concepts des 3 hiérarchies ciblées."""
                 'antecedent': term_data.get('antecedent', 'current')
             }
             
-            if 'finding' in category.lower() or 'disorder' in category.lower():
+            if 'finding' in category.lower() or 'disorder' in category.lower() or 'situation' in category.lower():
                 final_findings.append(entity)
             elif 'procedure' in category.lower():
                 final_procedures.append(entity)
-            else:
+            elif category == "Body structure":
                 final_body_structures.append(entity)
+            else:
+                # Ignorer les termes qui ne correspondent à aucune des 3 hiérarchies ciblées
+                print(f"⚠️  Terme ignoré (hors hiérarchies ciblées) : {term_data['term']} ({category})")
         
         # Calcul des statistiques de performance
         max_individual = max([stats[1] for stats in extraction_stats]) if extraction_stats else 0
         fusion_gain = len(unique_terms) - max_individual
-        semantic_filtered = len(unique_terms) - len(final_validated)
+        semantic_filtered = len(unique_terms) - len(final_validated) - len(blocked_terms)
         total_time = time.time() - start_time
         
         # Résultat final avec temps détaillés
@@ -869,6 +1298,7 @@ Retourne uniquement le JSON avec les concepts des 3 hiérarchies ciblées."""
                 'procedures': final_procedures,
                 'body_structures': final_body_structures
             },
+            'snomed_release': validator.release_version,
             'statistics': {
                 'extractions': extraction_stats,
                 'before_fusion': max_individual,
@@ -876,6 +1306,10 @@ Retourne uniquement le JSON avec les concepts des 3 hiérarchies ciblées."""
                 'after_semantic': len(final_validated),
                 'fusion_gain': fusion_gain,
                 'semantic_filtered': semantic_filtered,
+                'semantic_blocked': blocked_terms,
+                'gemini_cache': cache_stats,
+                'consensus': consensus,
+                'calls_saved': consensus['calls_saved'],
                 'times': {
                     'parallel_extractions': parallel_time,
                     'individual_times': individual_times,
@@ -907,6 +1341,8 @@ Retourne uniquement le JSON avec les concepts des 3 hiérarchies ciblées."""
         print(f"   🧠 Après validation sémantique : {len(final_validated)} entités cohérentes")
         print(f"   📈 GAIN fusion : +{fusion_gain} entités supplémentaires")
         print(f"   🛡️ FILTRAGE sémantique : -{semantic_filtered} incohérences éliminées")
+        if blocked_terms:
+            print(f"   🚫 Validation bloquée : {len(blocked_terms)} entités non jugées")
         
         print(f"\n⏱️ CHRONOMÉTRAGE DÉTAILLÉ :")
         print(f"   🚀 Extractions parallèles : {parallel_time:.2f}s")
@@ -918,7 +1354,7 @@ Retourne uniquement le JSON avec les concepts des 3 hiérarchies ciblées."""
         
         return result
     
-    async def _validate_semantic_coherence_batch(self, term_pairs: list) -> dict:
+    async def _validate_semantic_coherence_batch(self, term_pairs: list, cache_stats: Optional[Dict[str, int]] = None) -> dict:
         """
         Validation sémantique hybride groupée des correspondances SNOMED CT
         Combine filtrage mathématique rapide + LLM Gemini Flash pour les cas ambigus
@@ -945,7 +1381,7 @@ Retourne uniquement le JSON avec les concepts des 3 hiérarchies ciblées."""
             # Score global pondéré
             return (levenshtein * 0.3 + word_overlap * 0.4 + contains * 0.3)
         
-        def llm_validate_batch(llm_pairs: list) -> dict:
+        async def llm_validate_batch(llm_pairs: list) -> dict:
             """Validation LLM groupée pour les cas ambigus"""
             if not llm_pairs:
                 return {}
@@ -974,10 +1410,17 @@ Règles :
 
             try:
                 start_time = time.time()
-                response = self.model.generate_content(prompt)
+                response_text = (await self._generate_text_async(prompt, estimated_cost=0.01,
+                                                                 cache_stats=cache_stats)).strip()
                 llm_duration = time.time() - start_time
                 
-                response_text = response.text.strip()
+                # Appel bloqué par les limites API (ou réponse vide) : les paires ne sont
+                # pas jugées, elles sont signalées comme bloquées et non comme rejetées
+                if not response_text:
+                    print(f"🚫 Validation LLM bloquée : {len(llm_pairs)} paires non jugées")
+                    return {i: {"valid": False, "blocked": True, "confidence": 0.0,
+                                "reason": "Validation LLM bloquée (limites API ou réponse vide)",
+                                "duration": llm_duration / len(llm_pairs)} for i in range(len(llm_pairs))}
                 
                 # Parser la réponse JSON groupée
                 import json
@@ -1088,7 +1531,7 @@ Règles :
             print(f"🤖 Validation LLM groupée : {len(llm_cases)} paires ambiguës")
             
             start_llm = time.time()
-            llm_batch_results = llm_validate_batch(llm_cases)
+            llm_batch_results = await llm_validate_batch(llm_cases)
             total_llm_time = time.time() - start_llm
             
             print(f"✅ LLM groupé terminé en {total_llm_time:.2f}s")
@@ -1102,8 +1545,10 @@ Règles :
                     result['valid'] = llm_result.get('valid', False)
                     result['confidence'] = llm_result.get('confidence', 0.0)
                     result['reason'] = llm_result.get('reason', 'Analyse LLM')
+                    if llm_result.get('blocked'):
+                        result['blocked'] = True
                     
-                    status = "✅" if result['valid'] else "❌"
+                    status = "🚫" if result.get('blocked') else "✅" if result['valid'] else "❌"
                     gemini_term, official_term = llm_cases[batch_idx]
                     print(f"   {status} LLM: '{gemini_term}' → '{official_term}' (confiance: {result['confidence']:.2f})")
                     print(f"      └─ {result['reason']}")
@@ -1122,57 +1567,82 @@ Règles :
         print(f"   🔢 Math : {math_count}/{len(term_pairs)} ({math_count/len(term_pairs)*100:.1f}%)")
         print(f"   🤖 LLM : {llm_count}/{len(term_pairs)} ({llm_count/len(term_pairs)*100:.1f}%)")
         
-        return final_results 
+        return final_results
+
+    def _is_exact_description(self, term, snomed_code, validator):
+        """
+        Vérifie que le terme est exactement une description du code SNOMED
+        
+        Args:
+            term (str): Terme extrait par Gemini
+            snomed_code (str): Code SNOMED CT retenu
+            validator (SNOMEDValidator): Validateur de la release de la requête
+
+        Returns:
+            bool: True si une description du concept est le terme (casse ignorée, puis repliée)
+        """
+        codes = [candidate['code'] for candidate in validator.find_exact_term_candidates(term)]
+        return snomed_code in (codes or validator.find_folded_term_codes(term))
 
-    def _categorize_by_snomed_code(self, snomed_code):
+    def _find_near_exact_match(self, term, validator):
+        """
+        Cherche un terme officiel à quelques fautes de frappe près du terme extrait
+
+        La distance tolérée dépend de la longueur du terme (1 faute par tranche de
+        Config.NEAR_EXACT_CHARS_PER_EDIT caractères) : "rein" et "sein" ne doivent
+        pas être confondus.
+
+        Args:
+            term (str): Terme extrait par Gemini
+            validator (SNOMEDValidator): Validateur de la release de la requête
+
+        Returns:
+            dict: Meilleure correspondance {code, term, matched_term, distance} ou None
+        """
+        max_distance = min(Config.NEAR_EXACT_MAX_DISTANCE, len(term.strip()) // Config.NEAR_EXACT_CHARS_PER_EDIT)
+        if max_distance == 0:
+            return None
+        matches = validator.find_near_exact_terms(term, max_distance=max_distance, limit=1)
+        return matches[0] if matches else None
+
+    def _categorize_by_snomed_code(self, snomed_code, validator):
         """
         Catégorise automatiquement une entité basée sur son code SNOMED
         
+        La catégorie est précalculée pour chaque concept dans l'index compilé
+        (hiérarchie de premier niveau ou tag sémantique du FSN).
+        
         Args:
             snomed_code (str): Code SNOMED CT
+            validator (SNOMEDValidator): Validateur de la release de la requête
             
         Returns:
             str: Catégorie déterminée
         """
-        # Règles de catégorisation basées sur les hiérarchies SNOMED
-        # Ces codes correspondent aux grandes hiérarchies SNOMED CT
+        category = validator.get_category(snomed_code) if validator else None
         
-        # Findings/Disorders (domaine clinique)
-        if snomed_code.startswith(('271', '40', '38', '41', '27', '36', '23', '25', '42')):
-            return "Clinical finding"
-        
-        # Procedures (interventions)  
-        elif snomed_code.startswith(('71', '77', '23', '18', '38', '89', '17', '18')):
-            return "Procedure"
-            
-        # Body structures (anatomie)
-        elif snomed_code.startswith(('51', '81', '15', '79', '24', '36', '12', '91')):
-            return "Body structure"
-            
-        # Observable entity (observations)
-        elif snomed_code.startswith(('36', '24', '25')):
-            return "Observable entity"
-            
-        # Substances (médicaments, substances)
-        elif snomed_code.startswith(('44', '37', '39', '41')):
-            return "Substance"
-            
-        # Par défaut, catégoriser comme finding
-        else:
-            return "Clinical finding"
+        # Par défaut (code inconnu), catégoriser comme finding
+        return category or "Clinical finding"
     
-    def _security_check(self):
-        """Vérification de sécurité des limites API"""
+    async def _security_check(self, prompt: Optional[str] = None):
+        """Vérification de sécurité des limites API (inutile si la réponse au prompt est en cache)"""
+        # Accès SQLite hors de la boucle partagée, comme dans _generate_text_async
+        if prompt is not None and await asyncio.to_thread(response_cache.get, self._cache_key(prompt)) is not None:
+            return True
         can_proceed, message = security_manager.can_make_request()
         if not can_proceed:
             print(f"🚫 EXTRACTION BLOQUÉE : {message}")
             return False
         return True
     
-    def extract_medical_entities(self, text, use_context_modifiers=True):
+    def extract_medical_entities(self, text, use_context_modifiers=True, sample=0):
+        """Version synchrone de extract_medical_entities_async"""
+        return run_sync(self.extract_medical_entities_async(text, use_context_modifiers, sample))
+    
+    async def extract_medical_entities_async(self, text, use_context_modifiers=True, sample=0):
         """
         Extraction d'entités médicales à partir de texte brut
-        Compatible avec la méthode V2 asynchrone
+        Compatible avec la méthode V2 asynchrone (sample : rang de l'extraction)
         """
         try:
             # Créer un objet MedicalNote temporaire
@@ -1186,7 +1656,7 @@ Règles :
             )
             
             # Utiliser la méthode d'extraction existante
-            extraction = self.extract_snomed_info(medical_note)
+            extraction = await self.extract_snomed_info_async(medical_note, sample=sample)
             
             # Convertir au format attendu par la méthode V2
             findings = []
@@ -1234,7 +1704,8 @@ Règles :
                     'findings': findings,
                     'procedures': procedures,
                     'body_structures': body_structures
-                }
+                },
+                'gemini_cache': extraction.gemini_cache
             }
             
         except Exception as e:
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Hiérarchie IS-A de SNOMED CT et sa fermeture transitive
+
+Les relations "Is a" (116680003) du fichier sct2_Relationship_Snapshot sont
+compilées avec les autres tables (voir snomed_index.py) : pour chaque concept,
+ses parents directs et la liste triée de tous ses ancêtres. Un test
+d'ascendance se résume à une recherche dichotomique dans cette liste.
+
+La catégorie de chaque concept (hiérarchie de premier niveau, à défaut le tag
+sémantique de son FSN) est précalculée dans un tableau d'un octet par concept.
+"""
+
+import bisect
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Type de relation "Is a"
+IS_A_TYPE_ID = "116680003"
+
+# Racine de SNOMED CT (ancêtre de tous les concepts)
+ROOT_CONCEPT_ID = "138875005"
+
+# Type de description "Fully specified name" (FSN), suffixé par son tag sémantique
+FSN_TYPE_ID = "900000000000003001"
+
+# Catégories des concepts (rang dans le tableau concept_categories, 0 = inconnue)
+CATEGORY_NAMES = (
+    None,
+    "Clinical finding",
+    "Procedure",
+    "Body structure",
+    "Observable entity",
+    "Substance",
+    "Pharmaceutical / biologic product",
+    "Situation with explicit context",
+    "Event",
+    "Qualifier value",
+    "Specimen",
+    "Organism",
+    "Physical object",
+)
+_CATEGORY = {name: i for i, name in enumerate(CATEGORY_NAMES) if name}
+
+# Hiérarchies de premier niveau (enfants directs de la racine) -> catégorie
+TOP_LEVEL_CATEGORIES = {
+    "404684003": _CATEGORY["Clinical finding"],
+    "71388002": _CATEGORY["Procedure"],
+    "123037004": _CATEGORY["Body structure"],
+    "363787002": _CATEGORY["Observable entity"],
+    "105590001": _CATEGORY["Substance"],
+    "373873005": _CATEGORY["Pharmaceutical / biologic product"],
+    "243796009": _CATEGORY["Situation with explicit context"],
+    "272379006": _CATEGORY["Event"],
+    "362981000": _CATEGORY["Qualifier value"],
+    "123038009": _CATEGORY["Specimen"],
+    "410607006": _CATEGORY["Organism"],
+    "260787004": _CATEGORY["Physical object"],
+}
+
+# Tags sémantiques des FSN (anglais et édition française) -> catégorie,
+# utilisés quand la hiérarchie IS-A est indisponible
+SEMANTIC_TAG_CATEGORIES = {
+    "finding": _CATEGORY["Clinical finding"],
+    "disorder": _CATEGORY["Clinical finding"],
+    "constatation": _CATEGORY["Clinical finding"],
+    "trouble": _CATEGORY["Clinical finding"],
+    "procedure": _CATEGORY["Procedure"],
+    "regime/therapy": _CATEGORY["Procedure"],
+    "intervention": _CATEGORY["Procedure"],
+    "régime/thérapie": _CATEGORY["Procedure"],
+    "body structure": _CATEGORY["Body structure"],
+    "morphologic abnormality": _CATEGORY["Body structure"],
+    "cell": _CATEGORY["Body structure"],
+    "cell structure": _CATEGORY["Body structure"],
+    "structure corporelle": _CATEGORY["Body structure"],
+    "anomalie morphologique": _CATEGORY["Body structure"],
+    "cellule": _CATEGORY["Body structure"],
+    "observable entity": _CATEGORY["Observable entity"],
+    "entité observable": _CATEGORY["Observable entity"],
+    "substance": _CATEGORY["Substance"],
+    "product": _CATEGORY["Pharmaceutical / biologic product"],
+    "medicinal product": _CATEGORY["Pharmaceutical / biologic product"],
+    "produit": _CATEGORY["Pharmaceutical / biologic product"],
+    "situation": _CATEGORY["Situation with explicit context"],
+    "event": _CATEGORY["Event"],
+    "événement": _CATEGORY["Event"],
+    "qualifier value": _CATEGORY["Qualifier value"],
+    "valeur de qualificatif": _CATEGORY["Qualifier value"],
+    "specimen": _CATEGORY["Specimen"],
+    "échantillon": _CATEGORY["Specimen"],
+    "organism": _CATEGORY["Organism"],
+    "organisme": _CATEGORY["Organism"],
+    "physical object": _CATEGORY["Physical object"],
+    "objet physique": _CATEGORY["Physical object"],
+}
+
+
+def semantic_tag(fsn: str) -> Optional[str]:
+    """Tag sémantique d'un FSN : "Varicelle (trouble)" -> "trouble" """
+    fsn = fsn.rstrip()
+    if not fsn.endswith(")"):
+        return None
+    start = fsn.rfind("(")
+    return fsn[start + 1:-1].strip().lower() if start >= 0 else None
+
+
+def _pack_lists(lists: Sequence[Sequence[int]]) -> Tuple[array, array]:
+    """Encoder une liste de listes d'entiers en (tableau d'offsets n+1, valeurs)"""
+    offsets = array('I', [0])
+    values = array('I')
+    for items in lists:
+        values.extend(items)
+        offsets.append(len(values))
+    return offsets, values
+
+
+def compute_ancestors(parents: Sequence[Sequence[int]]) -> List[array]:
+    """
+    Fermeture transitive de la relation IS-A
+
+    Les concepts sont traités dans l'ordre topologique (parents avant enfants) :
+    les ancêtres d'un concept sont ses parents et l'union de leurs ancêtres,
+    déjà calculés. Les concepts pris dans un cycle (release corrompue) ne
+    reçoivent que leurs parents directs.
+
+    Args:
+        parents: Rangs des parents directs de chaque concept (par rang de concept)
+
+    Returns:
+        Rangs triés des ancêtres de chaque concept (le concept lui-même exclu)
+    """
+    count = len(parents)
+    children: List[List[int]] = [[] for _ in range(count)]
+    pending = array('I', bytes(4 * count))
+    for child, items in enumerate(parents):
+        pending[child] = len(items)
+        for parent in items:
+            children[parent].append(child)
+
+    ancestors: List[array] = [array('I') for _ in range(count)]
+    done = [False] * count
+    queue = [concept for concept in range(count) if not pending[concept]]
+    while queue:
+        concept = queue.pop()
+        done[concept] = True
+        items = parents[concept]
+        if items:
+            merged = set(items)
+            for parent in items:
+                merged.update(ancestors[parent])
+            ancestors[concept] = array('I', sorted(merged))
+        for child in children[concept]:
+            pending[child] -= 1
+            if not pending[child]:
+                queue.append(child)
+
+    for concept in range(count):
+        if not done[concept]:
+            ancestors[concept] = array('I', sorted(set(parents[concept])))
+    return ancestors
+
+
+def compute_categories(ancestors: Sequence[Sequence[int]], top_level: Dict[int, int],
+                       tag_categories: Optional[Sequence[int]] = None) -> array:
+    """
+    Catégorie de chaque concept (rang dans CATEGORY_NAMES)
+
+    La hiérarchie de premier niveau à laquelle appartient le concept l'emporte ;
+    à défaut (pas de relations IS-A), la catégorie déduite du tag sémantique.
+
+    Args:
+        ancestors: Rangs des ancêtres de chaque concept (voir compute_ancestors)
+        top_level: {rang d'un concept de premier niveau: catégorie}
+        tag_categories: Catégorie du tag sémantique de chaque concept (0 = inconnue)
+
+    Returns:
+        Tableau 'B' d'une catégorie par rang de concept
+    """
+    categories = array('B', tag_categories) if tag_categories else array('B', bytes(len(ancestors)))
+    top = set(top_level)
+    for concept, items in enumerate(ancestors):
+        if concept in top_level:
+            categories[concept] = top_level[concept]
+            continue
+        hits = top.intersection(items)
+        if hits:
+            categories[concept] = top_level[min(hits)]
+    return categories
+
+
+def pack_hierarchy_sections(parents: Sequence[Sequence[int]], top_level: Optional[Dict[int, int]] = None,
+                            tag_categories: Optional[Sequence[int]] = None) -> Dict[str, Tuple[str, bytes]]:
+    """
+    Construire les sections de la hiérarchie IS-A
+
+    Sections :
+        isa_parent_offsets    'I'  début des parents de chaque concept
+        isa_parents           'I'  rangs des parents directs
+        isa_ancestor_offsets  'I'  début des ancêtres de chaque concept
+        isa_ancestors         'I'  rangs triés de tous les ancêtres (fermeture transitive)
+        concept_categories    'B'  catégorie de chaque concept (rang dans CATEGORY_NAMES)
+
+    Args:
+        parents: Rangs des parents directs de chaque concept (par rang de concept)
+        top_level: {rang d'un concept de premier niveau: catégorie} (voir TOP_LEVEL_CATEGORIES)
+        tag_categories: Catégorie du tag sémantique du FSN de chaque concept
+    """
+    ancestors = compute_ancestors(parents)
+    parent_offsets, flat_parents = _pack_lists([sorted(items) for items in parents])
+    ancestor_offsets, flat_ancestors = _pack_lists(ancestors)
+    categories = compute_categories(ancestors, top_level or {}, tag_categories)
+    return {
+        "isa_parent_offsets": ('I', parent_offsets.tobytes()),
+        "isa_parents": ('I', flat_parents.tobytes()),
+        "isa_ancestor_offsets": ('I', ancestor_offsets.tobytes()),
+        "isa_ancestors": ('I', flat_ancestors.tobytes()),
+        "concept_categories": ('B', categories.tobytes()),
+    }
+
+
+class HierarchyIndex:
+    """Parents et ancêtres de chaque concept au-dessus des sections de l'index compilé"""
+
+    def __init__(self, sections: Dict[str, memoryview]):
+        self.parent_offsets = sections["isa_parent_offsets"]
+        self.parent_ordinals = sections["isa_parents"]
+        self.ancestor_offsets = sections["isa_ancestor_offsets"]
+        self.ancestor_ordinals = sections["isa_ancestors"]
+        self.categories = sections["concept_categories"]
+
+    def __bool__(self) -> bool:
+        return len(self.parent_ordinals) > 0
+
+    def parents(self, concept: int) -> memoryview:
+        return self.parent_ordinals[self.parent_offsets[concept]:self.parent_offsets[concept + 1]]
+
+    def ancestors(self, concept: int) -> memoryview:
+        return self.ancestor_ordinals[self.ancestor_offsets[concept]:self.ancestor_offsets[concept + 1]]
+
+    def category(self, concept: int) -> Optional[str]:
+        """Catégorie précalculée du concept (None si inconnue) : O(1)"""
+        return CATEGORY_NAMES[self.categories[concept]]
+
+    def is_descendant(self, concept: int, ancestor: int) -> bool:
+        """Vrai si ancestor est un ancêtre (strict) de concept : O(log n)"""
+        start, end = self.ancestor_offsets[concept], self.ancestor_offsets[concept + 1]
+        i = bisect.bisect_left(self.ancestor_ordinals, ancestor, start, end)
+        return i < end and self.ancestor_ordinals[i] == ancestor
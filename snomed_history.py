@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Redirection des concepts inactivés vers leur remplaçant actif
+
+Un concept inactivé garde son SCTID : Gemini peut encore le proposer. Les
+refsets d'association historique (der2_cRefset_AssociationSnapshot) relient
+chaque concept inactif à son ou ses remplaçants. Trois associations sont
+retenues, par ordre de confiance : REPLACED BY, SAME AS, POSSIBLY EQUIVALENT TO.
+
+Les redirections sont résolues à la compilation (chaînes de remplacements
+suivies jusqu'à un concept actif, cibles multiples écartées) et stockées dans
+trois tableaux triés de l'index compilé (voir snomed_index.py).
+"""
+
+import bisect
+from array import array
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from snomed_rf2 import RF2File
+
+# Refsets d'association historique retenus -> type de redirection (1 = le plus sûr)
+REPLACED_BY_REFSET_ID = "900000000000526001"
+SAME_AS_REFSET_ID = "900000000000527005"
+POSSIBLY_EQUIVALENT_TO_REFSET_ID = "900000000000523009"
+ASSOCIATION_KINDS = {
+    REPLACED_BY_REFSET_ID: 1,
+    SAME_AS_REFSET_ID: 2,
+    POSSIBLY_EQUIVALENT_TO_REFSET_ID: 3,
+}
+
+# Nom de chaque type de redirection (rang dans la section redirect_kinds)
+REDIRECT_KIND_NAMES = (None, "REPLACED BY", "SAME AS", "POSSIBLY EQUIVALENT TO")
+
+# Longueur maximale d'une chaîne de remplacements (protège des cycles)
+_MAX_REDIRECT_HOPS = 8
+
+
+def load_associations(file: RF2File) -> Dict[str, Dict[int, List[str]]]:
+    """
+    Associations historiques actives d'un fichier refset (Snapshot ou Delta)
+
+    Returns:
+        {SCTID inactif: {type de redirection: [SCTID cibles]}}
+    """
+    associations: Dict[str, Dict[int, List[str]]] = {}
+    with file.open_text() as f:
+        header = f.readline().rstrip('\r\n').split('\t')
+        columns = [header.index(name) for name in ('active', 'refsetId', 'referencedComponentId', 'targetComponentId')]
+        active_col, refset_col, source_col, target_col = columns
+        width = max(columns) + 1
+        for line in f:
+            fields = line.rstrip('\r\n').split('\t')
+            if len(fields) < width or fields[active_col] != '1':
+                continue
+            kind = ASSOCIATION_KINDS.get(fields[refset_col])
+            if kind is not None:
+                targets = associations.setdefault(fields[source_col], {}).setdefault(kind, [])
+                if fields[target_col] not in targets:
+                    targets.append(fields[target_col])
+    return associations
+
+
+def resolve_redirects(associations: Dict[str, Dict[int, List[str]]], active: Set[str],
+                      known: Optional[Dict[str, Tuple[str, int]]] = None) -> Dict[str, Tuple[str, int]]:
+    """
+    Remplaçant actif de chaque concept inactif
+
+    L'association la plus sûre l'emporte ; une cible elle-même inactive est
+    suivie (le type retenu est alors le moins sûr de la chaîne). Un concept dont
+    les cibles mènent à plusieurs concepts actifs distincts n'est pas redirigé.
+
+    Args:
+        associations: Associations actives (voir load_associations)
+        active: SCTID des concepts actifs
+        known: Redirections déjà résolues, suivies pour les cibles absentes de associations
+
+    Returns:
+        {SCTID inactif: (SCTID actif, type de redirection)}
+    """
+    known = known or {}
+    resolved: Dict[str, Optional[Tuple[str, int]]] = {}
+
+    def resolve(concept: str, hops: int) -> Tuple[Optional[Tuple[str, int]], bool]:
+        """(remplaçant ou None, chaîne tronquée par _MAX_REDIRECT_HOPS)"""
+        if concept in active:
+            return (concept, 0), False
+        if concept in resolved:
+            return resolved[concept], False
+        if hops >= _MAX_REDIRECT_HOPS:
+            return None, True
+        resolved[concept] = None  # Cycle : pas de redirection
+        result, truncated = None, False
+        kinds = associations.get(concept)
+        if kinds:
+            kind = min(kinds)
+            ends = []
+            for target in kinds[kind]:
+                end, target_truncated = resolve(target, hops + 1)
+                ends.append(end)
+                truncated = truncated or target_truncated
+            # Même concept actif atteint par plusieurs cibles : le type le moins sûr est retenu
+            if None not in ends and len({end for end, _ in ends}) == 1:
+                result = ends[0][0], max([kind] + [end_kind for _, end_kind in ends])
+        elif concept in known and known[concept][0] in active:
+            result = known[concept]
+        if truncated:
+            # Résultat dépendant de la profondeur d'arrivée : recalculé depuis un autre point de départ
+            del resolved[concept]
+        else:
+            resolved[concept] = result
+        return result, truncated
+
+    redirects = {}
+    for concept in associations:
+        if concept not in active:
+            result, _ = resolve(concept, 0)
+            if result is not None:
+                redirects[concept] = result
+    return redirects
+
+
+def pack_redirect_sections(redirects: Dict[str, Tuple[str, int]],
+                           ordinal: Dict[int, int]) -> Dict[str, Tuple[str, bytes]]:
+    """
+    Construire les sections des redirections
+
+    Sections :
+        redirect_sources  'q'  SCTID inactifs redirigés, triés
+        redirect_targets  'I'  rang (dans concept_ids) du concept actif de remplacement
+        redirect_kinds    'B'  type de redirection (rang dans REDIRECT_KIND_NAMES)
+
+    Args:
+        redirects: {SCTID inactif: (SCTID actif, type)} (voir resolve_redirects)
+        ordinal: {SCTID actif (entier): rang dans concept_ids}
+    """
+    items = sorted((int(source), ordinal[int(target)], kind) for source, (target, kind) in redirects.items()
+                   if int(target) in ordinal)
+    return {
+        "redirect_sources": ('q', array('q', (source for source, _, _ in items)).tobytes()),
+        "redirect_targets": ('I', array('I', (target for _, target, _ in items)).tobytes()),
+        "redirect_kinds": ('B', array('B', (kind for _, _, kind in items)).tobytes()),
+    }
+
+
+class RedirectIndex:
+    """Redirections des concepts inactifs au-dessus des sections de l'index compilé"""
+
+    def __init__(self, sections: Dict[str, memoryview]):
+        self.sources = sections["redirect_sources"]
+        self.targets = sections["redirect_targets"]
+        self.kinds = sections["redirect_kinds"]
+
+    def __len__(self) -> int:
+        return len(self.sources)
+
+    def lookup(self, value: int) -> Optional[Tuple[int, int]]:
+        """(rang du concept actif, type de redirection) d'un SCTID inactif, ou None : O(log n)"""
+        i = bisect.bisect_left(self.sources, value)
+        if i < len(self.sources) and self.sources[i] == value:
+            return self.targets[i], self.kinds[i]
+        return None
+
+    def __iter__(self) -> Iterator[Tuple[int, int, int]]:
+        return zip(self.sources, self.targets, self.kinds)
@@ -0,0 +1,1376 @@
+#!/usr/bin/env python3
+"""
+Index binaire compilé de la distribution SNOMED CT française
+
+Le parsing des fichiers RF2 (csv tabulé) prend plusieurs secondes à chaque
+instanciation de SNOMEDValidator. Ce module "compile" une fois pour toutes les
+tables du validateur dans un fichier binaire versionné placé à côté du Snapshot.
+
+Le fichier est organisé en sections alignées (tableaux d'entiers + blobs UTF-8)
+directement exploitables via mmap : tous les processus qui ouvrent le même
+index partagent les mêmes pages mémoire et les recherches se font sans
+reconstruire de dict/set Python.
+
+Le Snapshot peut être un dossier décompressé ou directement l'archive ZIP
+officielle de la release (voir snomed_rf2.py).
+
+Usage :
+    python snomed_index.py [chemin_snapshot_ou_zip] [--force]
+"""
+
+import argparse
+import bisect
+import csv
+import itertools
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from snomed_search import (DEFAULT_MIN_SIMILARITY, SYMSPELL_MAX_DISTANCE, Bm25Index, DeleteIndex,
+                           TrigramIndex, pack_bm25_sections, pack_symspell_sections, pack_trigram_sections)
+from snomed_rf2 import RF2File, find_rf2_file, is_release_archive
+from snomed_hierarchy import (FSN_TYPE_ID, IS_A_TYPE_ID, SEMANTIC_TAG_CATEGORIES, TOP_LEVEL_CATEGORIES,
+                              HierarchyIndex, pack_hierarchy_sections, semantic_tag)
+from snomed_history import (REDIRECT_KIND_NAMES, RedirectIndex, load_associations, pack_redirect_sections,
+                            resolve_redirects)
+
+# Nom du fichier d'index écrit dans le dossier Snapshot
+INDEX_FILENAME = "snomed_index.bin"
+
+# Format du fichier : en-tête fixe + métadonnées JSON + sections alignées sur 8 octets
+INDEX_MAGIC = b"SCTINDEX"
+INDEX_FORMAT_VERSION = 14
+_HEADER = struct.Struct("<8sII")  # magic, version du format, taille des métadonnées
+_ALIGNMENT = 8
+
+# Fichiers RF2 utilisés pour construire l'index
+RF2_PATTERNS = {
+    "concepts": "sct2_Concept_Snapshot_*.txt",
+    "descriptions": "sct2_Description_Snapshot-fr_*.txt",
+}
+
+# Fichiers RF2 facultatifs : sans relations, la hiérarchie IS-A de l'index est vide ;
+# sans refset de langue, le terme principal est la première description lue ;
+# sans associations historiques, les concepts inactifs ne sont pas redirigés
+RF2_OPTIONAL_PATTERNS = {
+    "relationships": "sct2_Relationship_Snapshot_*.txt",
+    "language": "der2_cRefset_LanguageSnapshot-fr_*.txt",
+    "associations": "der2_cRefset_Association*Snapshot*.txt",
+}
+
+# Acceptabilité d'une description dans le refset de langue : terme préféré
+PREFERRED_ACCEPTABILITY_ID = "900000000000548007"
+
+# Drapeaux des descriptions rattachées à une clé de recherche
+TERM_FLAG_PREFERRED = 1  # Terme principal du concept (celui retourné par get_french_term)
+TERM_FLAG_FSN = 2        # Fully specified name (suffixé par le tag sémantique)
+
+# Terme principal d'un concept, reconstitué depuis sa clé de recherche (chaîne stockée une seule fois)
+TERM_CASE_NONE = 0         # Pas de terme français
+TERM_CASE_KEY = 1          # Terme identique à la clé ("hépatite b")
+TERM_CASE_CAPITALIZED = 2  # Clé avec une majuscule initiale ("Varicelle"), cas le plus fréquent
+TERM_CASE_LITERAL = 3      # Autre casse ("Maladie de Crohn") : terme stocké tel quel dans term_blob
+
+# Concept sans description préférée (section concept_preferred)
+NO_DESCRIPTION = 0xFFFFFFFF
+
+# Sections de recherche, calculées uniquement à partir des clés triées (voir snomed_search.py)
+SEARCH_SECTION_PREFIXES = ("trigram_", "symspell_", "bm25_")
+# Clés repliées -> concepts : dépendent des clés, de leurs concepts et des rangs des concepts
+FOLDED_SECTION_PREFIXES = ("folded_",)
+# Hiérarchie IS-A et catégories : dépendent des concepts, des relations IS-A et des tags sémantiques
+HIERARCHY_SECTION_PREFIXES = ("isa_", "concept_categories")
+
+# Un SCTID tient sur 18 chiffres maximum (entier signé 64 bits)
+_MAX_SCTID_DIGITS = 18
+
+# Parsing parallèle du fichier des descriptions : taille minimale d'un bloc,
+# nombre de blocs par processus (répartition de la charge)
+_MIN_CHUNK_BYTES = 4 * 1024 * 1024
+_CHUNKS_PER_WORKER = 2
+
+# Autocomplétion : nombre maximum de clés examinées (dans l'ordre des octets) pour un préfixe
+_COMPLETION_SCAN = 200
+
+
+def find_rf2_files(snapshot_path: Path) -> Optional[Dict[str, RF2File]]:
+    """
+    Localiser les fichiers RF2 nécessaires dans le dossier Snapshot ou l'archive ZIP
+
+    Args:
+        snapshot_path: Dossier contenant les fichiers SNOMED CT Snapshot, ou archive
+                       ZIP de la release (les membres sont lus sans décompression sur disque)
+
+    Returns:
+        Dictionnaire {type: fichier RF2} ou None si un fichier manque
+    """
+    files = {}
+    for kind, pattern in RF2_PATTERNS.items():
+        found = find_rf2_file(snapshot_path, pattern)
+        if found is None:
+            print(f"❌ Fichier RF2 non trouvé : {pattern}")
+            return None
+        files[kind] = found
+    for kind, pattern in RF2_OPTIONAL_PATTERNS.items():
+        found = find_rf2_file(snapshot_path, pattern)
+        if found is not None:
+            files[kind] = found
+    return files
+
+
+def rf2_fingerprint(files: Dict[str, RF2File], with_hash: bool = True) -> Dict[str, Dict]:
+    """
+    Empreinte des fichiers RF2 (nom, taille, mtime et éventuellement empreinte du contenu)
+
+    Args:
+        files: Fichiers RF2 retournés par find_rf2_files
+        with_hash: Calculer aussi l'empreinte du contenu (SHA-256 coûteux, fait
+                   uniquement à la compilation ; CRC-32 lu dans l'archive ZIP)
+
+    Returns:
+        Dictionnaire {type: {name, size, mtime_ns[, sha256 | crc32]}}
+    """
+    fingerprint = {}
+    for kind, file in files.items():
+        entry = {"name": file.name, "size": file.size(), "mtime_ns": file.mtime_ns()}
+        if with_hash:
+            entry.update(file.digest())
+        fingerprint[kind] = entry
+    return fingerprint
+
+
+def index_path_for(snapshot_path: Path) -> Path:
+    """Chemin par défaut de l'index compilé : dans le dossier Snapshot, ou à côté de l'archive ZIP"""
+    snapshot_path = Path(snapshot_path)
+    if is_release_archive(snapshot_path):
+        return snapshot_path.with_name(f"{snapshot_path.stem}.{INDEX_FILENAME}")
+    return snapshot_path / INDEX_FILENAME
+
+
+def sctid_to_int(sctid: str) -> Optional[int]:
+    """Convertir un SCTID texte en entier (None si ce n'est pas un SCTID plausible)"""
+    if not sctid or len(sctid) > _MAX_SCTID_DIGITS or not sctid.isdigit() or sctid[0] == '0':
+        return None
+    return int(sctid)
+
+
+def normalize_term_key(term: str) -> str:
+    """Clé de recherche exacte d'un terme (insensible à la casse)"""
+    return term.lower().strip()
+
+
+# Repliement des termes : diacritiques supprimés (après décomposition NFKD), ligatures
+# développées, ponctuation, apostrophes et tirets remplacés par des espaces
+_FOLD_TABLE = {code: None for code in range(0x0300, 0x0370)}
+_FOLD_TABLE.update({ord(char): " " for char in "!\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~’‘´«»–—…·"})
+_FOLD_TABLE.update({ord("œ"): "oe", ord("æ"): "ae"})
+
+# Mots plus courts non dépluralisés ("os", "pus"...)
+_MIN_PLURAL_WORD_LENGTH = 4
+
+
+def fold_term(term: str, strip_plurals: bool = True) -> str:
+    """
+    Clé repliée d'un terme : "Éruptions-cutanées" et "eruption  cutanee" donnent la même clé
+
+    Args:
+        term: Terme brut
+        strip_plurals: Retirer le s/x final des mots d'au moins 4 lettres
+
+    Returns:
+        Clé sans accents, ponctuation ni espaces multiples
+    """
+    words = unicodedata.normalize('NFKD', term.lower()).translate(_FOLD_TABLE).split()
+    if strip_plurals:
+        words = [word[:-1] if len(word) >= _MIN_PLURAL_WORD_LENGTH and word[-1] in "sx" else word
+                 for word in words]
+    return " ".join(words)
+
+
+# ---------------------------------------------------------------------------
+# Format binaire
+# ---------------------------------------------------------------------------
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _pack_strings(strings: List[str]) -> Tuple[array, bytes]:
+    """Encoder une liste de chaînes en (tableau d'offsets n+1, blob UTF-8)"""
+    offsets = array('I', [0])
+    chunks = []
+    position = 0
+    for value in strings:
+        encoded = value.encode('utf-8')
+        chunks.append(encoded)
+        position += len(encoded)
+        offsets.append(position)
+    return offsets, b"".join(chunks)
+
+
+def _reused_sections(reuse_sections: Optional[Dict[str, Tuple[str, bytes]]],
+                     prefixes: Tuple[str, ...]) -> Optional[Dict[str, Tuple[str, bytes]]]:
+    """Sections d'un groupe (préfixes) fournies par reuse_sections, ou None si le groupe est à recalculer"""
+    reused = {name: section for name, section in (reuse_sections or {}).items() if name.startswith(prefixes)}
+    return reused or None
+
+
+def _pack_sections(tables: Dict, reuse_sections: Optional[Dict[str, Tuple[str, bytes]]] = None
+                   ) -> Dict[str, Tuple[str, bytes]]:
+    """
+    Convertir les tables Python en sections binaires
+
+    Les groupes de sections les plus coûteux ne dépendent que d'une partie des tables :
+    recherche (SEARCH_SECTION_PREFIXES, clés triées), clés repliées
+    (FOLDED_SECTION_PREFIXES) et hiérarchie (HIERARCHY_SECTION_PREFIXES).
+    reuse_sections permet de reprendre tels quels les groupes d'un index dont ces
+    tables sont identiques (voir SNOMEDIndex.copy_sections) plutôt que de les recalculer.
+
+    Sections :
+        concept_ids   'q'  SCTID actifs triés (recherche dichotomique)
+        term_refs     'I'  terme français de chaque concept : rang de sa clé dans key_offsets,
+                           ou rang dans term_offsets pour un terme stocké tel quel
+        term_cases    'B'  reconstitution du terme depuis sa clé (TERM_CASE_*)
+        term_offsets  'I'  offsets des termes stockés tels quels dans term_blob
+        term_blob     'B'  termes français UTF-8 dont la casse ne se déduit pas de la clé
+        key_offsets   'I'  offsets des clés de recherche triées dans key_blob
+        key_blob      'B'  clés normalisées UTF-8 triées par octets
+        key_concepts  'I'  rang (dans concept_ids) du concept principal de chaque clé
+        key_code_*    tous les concepts de chaque clé (offsets, rangs, drapeaux TERM_FLAG_*),
+                      terme principal d'abord, puis synonymes, FSN en dernier
+        folded_*      clés repliées (voir fold_term) triées -> rangs des concepts
+        trigram_*     index inversé des trigrammes des clés (voir snomed_search.py)
+        symspell_*    suppressions symétriques des préfixes des clés (voir snomed_search.py)
+        bm25_*        index inversé des mots des clés repliées (voir snomed_search.py)
+        isa_*         parents et ancêtres IS-A de chaque concept (voir snomed_hierarchy.py)
+        concept_categories  catégorie de chaque concept (voir snomed_hierarchy.py)
+        description_*  identifiants des descriptions indexées (triés) -> rang du concept,
+                       rang de la clé, drapeaux (pour appliquer une Delta, voir snomed_delta.py)
+        concept_preferred  'I'  rang (dans description_ids) de la description préférée de chaque
+                                concept selon le refset de langue, ou NO_DESCRIPTION
+        out_of_scope_ids  'q'  SCTID exclus d'un index allégé, triés (voir snomed_scope.filter_tables)
+        redirect_*    concepts inactifs -> remplaçant actif (voir snomed_history.py)
+    """
+    concept_ids = array('q', sorted(int(sctid) for sctid in tables["concepts"]))
+    ordinal = {sctid: i for i, sctid in enumerate(concept_ids)}
+
+    keys = sorted(tables["term_to_code"].items(), key=lambda item: item[0].encode('utf-8'))
+    sorted_keys = [key for key, _ in keys]
+    key_offsets, key_blob = _pack_strings(sorted_keys)
+    key_ordinal = {key: i for i, key in enumerate(sorted_keys)}
+
+    # Le terme principal n'est pas recopié : il pointe sur sa clé, seule la casse est notée
+    french_terms = tables["french_terms"]
+    term_refs = array('I')
+    term_cases = array('B')
+    literal_terms = []
+    for sctid in concept_ids:
+        term = french_terms.get(str(sctid))
+        key = normalize_term_key(term) if term else None
+        if not term:
+            term_refs.append(0)
+            term_cases.append(TERM_CASE_NONE)
+        elif key in key_ordinal and term == key:
+            term_refs.append(key_ordinal[key])
+            term_cases.append(TERM_CASE_KEY)
+        elif key in key_ordinal and term == key[:1].upper() + key[1:]:
+            term_refs.append(key_ordinal[key])
+            term_cases.append(TERM_CASE_CAPITALIZED)
+        else:
+            term_refs.append(len(literal_terms))
+            term_cases.append(TERM_CASE_LITERAL)
+            literal_terms.append(term)
+    term_offsets, term_blob = _pack_strings(literal_terms)
+    key_code_offsets = array('I', [0])
+    key_codes = array('I')
+    key_code_flags = array('B')
+    for _, codes in keys:
+        for code, flags in sorted(codes.items(), key=lambda item: (not item[1] & TERM_FLAG_PREFERRED,
+                                                                   bool(item[1] & TERM_FLAG_FSN), int(item[0]))):
+            key_codes.append(ordinal[int(code)])
+            key_code_flags.append(flags)
+        key_code_offsets.append(len(key_codes))
+    key_concepts = array('I', (key_codes[start] for start in key_code_offsets[:-1]))
+
+    descriptions = sorted(tables.get("descriptions", {}).items(), key=lambda item: int(item[0]))
+    description_ids = array('q', (int(description_id) for description_id, _ in descriptions))
+    description_concepts = array('I', (ordinal[int(code)] for _, (code, _, _) in descriptions))
+    description_keys = array('I', (key_ordinal[key] for _, (_, key, _) in descriptions))
+    description_flags = array('B', (flags for _, (_, _, flags) in descriptions))
+    description_ordinal = {description_id: i for i, (description_id, _) in enumerate(descriptions)}
+    preferred = tables.get("preferred_descriptions", {})
+    concept_preferred = array('I', (description_ordinal.get(preferred.get(str(sctid)), NO_DESCRIPTION)
+                                    for sctid in concept_ids))
+
+    sections = {
+        "concept_ids": ('q', concept_ids.tobytes()),
+        "term_refs": ('I', term_refs.tobytes()),
+        "term_cases": ('B', term_cases.tobytes()),
+        "term_offsets": ('I', term_offsets.tobytes()),
+        "term_blob": ('B', term_blob),
+        "key_offsets": ('I', key_offsets.tobytes()),
+        "key_blob": ('B', key_blob),
+        "key_concepts": ('I', key_concepts.tobytes()),
+        "key_code_offsets": ('I', key_code_offsets.tobytes()),
+        "key_codes": ('I', key_codes.tobytes()),
+        "key_code_flags": ('B', key_code_flags.tobytes()),
+        "description_ids": ('q', description_ids.tobytes()),
+        "description_concepts": ('I', description_concepts.tobytes()),
+        "description_keys": ('I', description_keys.tobytes()),
+        "description_flags": ('B', description_flags.tobytes()),
+        "concept_preferred": ('I', concept_preferred.tobytes()),
+        "out_of_scope_ids": ('q', array('q', sorted(int(sctid) for sctid in tables.get("out_of_scope", ()))).tobytes()),
+    }
+
+    reused = _reused_sections(reuse_sections, FOLDED_SECTION_PREFIXES)
+    if reused is not None:
+        sections.update(reused)
+    else:
+        folded: Dict[str, set] = {}
+        for key, codes in keys:
+            folded.setdefault(fold_term(key), set()).update(ordinal[int(code)] for code in codes)
+        folded_keys = sorted(folded, key=lambda key: key.encode('utf-8'))
+        folded_offsets, folded_blob = _pack_strings(folded_keys)
+        folded_code_offsets = array('I', [0])
+        folded_concepts = array('I')
+        for key in folded_keys:
+            folded_concepts.extend(sorted(folded[key]))
+            folded_code_offsets.append(len(folded_concepts))
+        sections.update({
+            "folded_offsets": ('I', folded_offsets.tobytes()),
+            "folded_blob": ('B', folded_blob),
+            "folded_code_offsets": ('I', folded_code_offsets.tobytes()),
+            "folded_concepts": ('I', folded_concepts.tobytes()),
+        })
+
+    reused = _reused_sections(reuse_sections, SEARCH_SECTION_PREFIXES)
+    if reused is not None:
+        sections.update(reused)
+    else:
+        sections.update(pack_trigram_sections(sorted_keys))
+        sections.update(pack_symspell_sections(sorted_keys))
+        sections.update(pack_bm25_sections([fold_term(key) for key in sorted_keys]))
+
+    reused = _reused_sections(reuse_sections, HIERARCHY_SECTION_PREFIXES)
+    if reused is not None:
+        sections.update(reused)
+    else:
+        parents: List[List[int]] = [[] for _ in concept_ids]
+        for child, parent_codes in tables.get("is_a", {}).items():
+            parents[ordinal[int(child)]] = [ordinal[int(code)] for code in parent_codes]
+        top_level = {ordinal[int(code)]: category for code, category in TOP_LEVEL_CATEGORIES.items()
+                     if int(code) in ordinal}
+        semantic_tags = tables.get("semantic_tags", {})
+        tag_categories = [SEMANTIC_TAG_CATEGORIES.get(semantic_tags.get(str(sctid)), 0) for sctid in concept_ids]
+        sections.update(pack_hierarchy_sections(parents, top_level, tag_categories))
+    sections.update(pack_redirect_sections(tables.get("redirects", {}), ordinal))
+    return sections
+
+
+def _serialize_index(meta: Dict, sections: Dict[str, Tuple[str, bytes]]) -> List[bytes]:
+    """Assembler l'en-tête, les métadonnées et les sections alignées"""
+    layout = {}
+    position = 0
+    for name, (typecode, data) in sections.items():
+        layout[name] = [position, len(data), typecode]
+        position = _align(position + len(data))
+    meta = dict(meta, sections=layout)
+    return _assemble(meta, [data for _, data in sections.values()])
+
+
+def _assemble(meta: Dict, payloads: List[bytes]) -> List[bytes]:
+    meta_bytes = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+    head = _HEADER.pack(INDEX_MAGIC, INDEX_FORMAT_VERSION, len(meta_bytes)) + meta_bytes
+    parts = [head, b"\0" * (_align(len(head)) - len(head))]
+    for data in payloads:
+        parts.append(data)
+        parts.append(b"\0" * (_align(len(data)) - len(data)))
+    return parts
+
+
+def _write_atomic(index_path: Path, parts: List[bytes]) -> None:
+    """
+    Écrire un fichier de manière atomique (fichier temporaire + renommage)
+
+    Les processus qui ont déjà mappé l'ancien index le conservent intact ;
+    aucun lecteur ne voit jamais un fichier partiel.
+    """
+    tmp_path = index_path.with_name(f"{index_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        for part in parts:
+            f.write(part)
+    os.replace(tmp_path, index_path)
+
+
+def _index_meta(tables: Dict, fingerprint: Dict, deltas: Optional[List[Dict]] = None,
+                scope: Optional[Dict] = None) -> Dict:
+    meta = {
+        "format_version": INDEX_FORMAT_VERSION,
+        "byteorder": sys.byteorder,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "fingerprint": fingerprint,
+        # Releases Delta appliquées depuis la compilation du Snapshot (voir snomed_delta.py)
+        "revision": len(deltas or []),
+        "deltas": deltas or [],
+        "counts": {
+            "concepts": len(tables["concepts"]),
+            "french_terms": len(tables["french_terms"]),
+            "term_to_code": len(tables["term_to_code"]),
+            "term_codes": sum(len(codes) for codes in tables["term_to_code"].values()),
+            "is_a": sum(len(parents) for parents in tables.get("is_a", {}).values()),
+            "redirects": len(tables.get("redirects", {})),
+            "descriptions": len(tables.get("descriptions", {})),
+            "preferred_descriptions": len(tables.get("preferred_descriptions", {})),
+            "out_of_scope": len(tables.get("out_of_scope", ())),
+        },
+    }
+    if scope is not None:
+        meta["scope"] = scope  # Index allégé : hiérarchies conservées et index complet d'origine
+    return meta
+
+
+def _parse_header(buffer) -> Optional[Tuple[Dict, int]]:
+    """Lire l'en-tête d'un index : (métadonnées, début des sections) ou None"""
+    if len(buffer) < _HEADER.size:
+        return None
+    magic, version, meta_len = _HEADER.unpack_from(buffer, 0)
+    if magic != INDEX_MAGIC or version != INDEX_FORMAT_VERSION:
+        return None
+    meta = json.loads(bytes(buffer[_HEADER.size:_HEADER.size + meta_len]).decode('utf-8'))
+    if meta.get("byteorder") != sys.byteorder:
+        return None
+    return meta, _align(_HEADER.size + meta_len)
+
+
+def read_index_metadata(index_path: Path) -> Optional[Dict]:
+    """Lire uniquement l'en-tête et les métadonnées d'un index (sans les tables)"""
+    try:
+        with open(index_path, 'rb') as f:
+            head = f.read(_HEADER.size)
+            if len(head) < _HEADER.size:
+                return None
+            _, _, meta_len = _HEADER.unpack(head)
+            parsed = _parse_header(head + f.read(meta_len))
+    except (OSError, ValueError, struct.error):
+        return None
+    return parsed[0] if parsed else None
+
+
+def index_revision(meta: Dict) -> Dict:
+    """Identité d'un index compilé (date de compilation et révision de Delta)"""
+    return {"built_at": meta.get("built_at"), "revision": meta.get("revision", 0)}
+
+
+class _StringTable:
+    """Table de chaînes (offsets + blob UTF-8) indexable sans décodage préalable"""
+
+    def __init__(self, offsets: memoryview, blob: memoryview):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> bytes:
+        # Retourne des bytes pour permettre la recherche dichotomique (bisect)
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]])
+
+    def get(self, i: int) -> str:
+        return self[i].decode('utf-8')
+
+
+class _TermTable:
+    """Terme français de chaque concept, reconstitué depuis la table des clés (voir TERM_CASE_*)"""
+
+    def __init__(self, refs: memoryview, cases: memoryview, keys: _StringTable, literals: _StringTable):
+        self.refs = refs
+        self.cases = cases
+        self.keys = keys
+        self.literals = literals
+
+    def __len__(self) -> int:
+        return len(self.refs)
+
+    def get(self, i: int) -> str:
+        case = self.cases[i]
+        if case == TERM_CASE_NONE:
+            return ""
+        if case == TERM_CASE_LITERAL:
+            return self.literals.get(self.refs[i])
+        key = self.keys.get(self.refs[i])
+        return key[:1].upper() + key[1:] if case == TERM_CASE_CAPITALIZED else key
+
+
+class SNOMEDIndex:
+    """
+    Tables SNOMED CT en lecture seule au-dessus d'un tampon binaire (mmap ou bytes)
+
+    Aucune structure Python n'est reconstruite à l'ouverture : les recherches
+    travaillent directement sur les sections du fichier.
+    """
+
+    def __init__(self, buffer, path: Optional[Path] = None):
+        parsed = _parse_header(buffer)
+        if parsed is None:
+            raise ValueError("Index SNOMED CT invalide ou format incompatible")
+        self.meta, data_start = parsed
+        self.path = path
+        self._buffer = buffer  # Garde le mmap ouvert tant que l'index est utilisé
+
+        view = memoryview(buffer)
+        sections = {}
+        for name, (offset, length, typecode) in self.meta["sections"].items():
+            start = data_start + offset
+            sections[name] = view[start:start + length].cast(typecode)
+        self._sections = sections
+
+        self.concept_ids = sections["concept_ids"]
+        self.keys = _StringTable(sections["key_offsets"], sections["key_blob"])
+        self.terms = _TermTable(sections["term_refs"], sections["term_cases"], self.keys,
+                                _StringTable(sections["term_offsets"], sections["term_blob"]))
+        self.key_concepts = sections["key_concepts"]
+        self.key_code_offsets = sections["key_code_offsets"]
+        self.key_codes = sections["key_codes"]
+        self.key_code_flags = sections["key_code_flags"]
+        self.description_ids = sections["description_ids"]
+        self.description_concepts = sections["description_concepts"]
+        self.description_keys = sections["description_keys"]
+        self.description_flags = sections["description_flags"]
+        self.concept_preferred = sections["concept_preferred"]
+        self.out_of_scope_ids = sections["out_of_scope_ids"]
+        self.folded_keys = _StringTable(sections["folded_offsets"], sections["folded_blob"])
+        self.folded_code_offsets = sections["folded_code_offsets"]
+        self.folded_concepts = sections["folded_concepts"]
+        self.trigrams = TrigramIndex(sections, self.keys)
+        self.deletes = DeleteIndex(sections, self.keys)
+        self.bm25 = Bm25Index(sections)
+        self.hierarchy = HierarchyIndex(sections)
+        self.redirects = RedirectIndex(sections)
+
+    @classmethod
+    def open(cls, index_path: Path) -> "SNOMEDIndex":
+        """Mapper un index compilé en mémoire (lecture seule, pages partagées)"""
+        with open(index_path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer, Path(index_path))
+
+    @classmethod
+    def load(cls, index_path: Path) -> "SNOMEDIndex":
+        """Charger un index compilé dans un tampon privé au processus (sans mmap)"""
+        with open(index_path, 'rb') as f:
+            return cls(f.read(), Path(index_path))
+
+    @classmethod
+    def from_tables(cls, tables: Dict, fingerprint: Optional[Dict] = None) -> "SNOMEDIndex":
+        """Construire un index en mémoire (sans fichier) à partir des tables Python"""
+        parts = _serialize_index(_index_meta(tables, fingerprint or {}), _pack_sections(tables))
+        return cls(b"".join(parts))
+
+    def __len__(self) -> int:
+        return len(self.concept_ids)
+
+    def copy_sections(self, prefixes: Tuple[str, ...]) -> Dict[str, Tuple[str, bytes]]:
+        """Copie des sections dont le nom commence par un des préfixes, réutilisables telles quelles"""
+        return {name: (self.meta["sections"][name][2], section.tobytes())
+                for name, section in self._sections.items() if name.startswith(prefixes)}
+
+    def search_sections(self) -> Dict[str, Tuple[str, bytes]]:
+        """Copie des sections de recherche (trigram_*, symspell_*, bm25_*), réutilisables telles quelles"""
+        return self.copy_sections(SEARCH_SECTION_PREFIXES)
+
+    def concept_ordinal(self, sctid: str) -> int:
+        """Rang du concept dans concept_ids, ou -1 si le concept n'est pas actif"""
+        value = sctid_to_int(sctid)
+        if value is None:
+            return -1
+        i = bisect.bisect_left(self.concept_ids, value)
+        if i < len(self.concept_ids) and self.concept_ids[i] == value:
+            return i
+        return -1
+
+    def has_concept(self, sctid: str) -> bool:
+        return self.concept_ordinal(sctid) >= 0
+
+    def is_out_of_scope(self, sctid: str) -> bool:
+        """Vrai si le concept est actif mais exclu de cet index allégé (voir snomed_scope.py)"""
+        value = sctid_to_int(sctid)
+        if value is None or not len(self.out_of_scope_ids):
+            return False
+        i = bisect.bisect_left(self.out_of_scope_ids, value)
+        return i < len(self.out_of_scope_ids) and self.out_of_scope_ids[i] == value
+
+    def redirect(self, sctid: str) -> Optional[Tuple[str, str]]:
+        """(SCTID actif de remplacement, type d'association) d'un concept inactif, ou None"""
+        value = sctid_to_int(sctid)
+        found = self.redirects.lookup(value) if value is not None else None
+        if found is None:
+            return None
+        target, kind = found
+        return str(self.concept_ids[target]), REDIRECT_KIND_NAMES[kind]
+
+    def french_term(self, sctid: str) -> Optional[str]:
+        i = self.concept_ordinal(sctid)
+        if i < 0:
+            return None
+        return self.terms.get(i) or None
+
+    def preferred_description_id(self, sctid: str) -> Optional[str]:
+        """Identifiant de la description préférée du concept (refset de langue), ou None"""
+        i = self.concept_ordinal(sctid)
+        if i < 0 or self.concept_preferred[i] == NO_DESCRIPTION:
+            return None
+        return str(self.description_ids[self.concept_preferred[i]])
+
+    def key_ordinal(self, key: str) -> int:
+        """Rang d'une clé normalisée dans keys, ou -1 si aucune description ne correspond"""
+        encoded = key.encode('utf-8')
+        i = bisect.bisect_left(self.keys, encoded)
+        if i < len(self.keys) and self.keys[i] == encoded:
+            return i
+        return -1
+
+    def code_for_key(self, key: str) -> Optional[str]:
+        """SCTID principal associé à une clé normalisée (voir normalize_term_key)"""
+        i = self.key_ordinal(key)
+        if i < 0:
+            return None
+        return str(self.concept_ids[self.key_concepts[i]])
+
+    def codes_for_key(self, key: str) -> List[Tuple[str, int]]:
+        """
+        Tous les concepts dont une description a la clé normalisée key
+
+        Returns:
+            Liste [(SCTID, drapeaux TERM_FLAG_*)], terme principal d'abord, FSN en dernier
+        """
+        i = self.key_ordinal(key)
+        if i < 0:
+            return []
+        return self._key_codes(i)
+
+    def _key_codes(self, i: int) -> List[Tuple[str, int]]:
+        start, end = self.key_code_offsets[i], self.key_code_offsets[i + 1]
+        return [(str(self.concept_ids[self.key_codes[j]]), self.key_code_flags[j]) for j in range(start, end)]
+
+    def codes_for_folded_key(self, folded_key: str) -> List[str]:
+        """SCTID de toutes les descriptions dont la clé repliée est folded_key (voir fold_term)"""
+        encoded = folded_key.encode('utf-8')
+        i = bisect.bisect_left(self.folded_keys, encoded)
+        if i < len(self.folded_keys) and self.folded_keys[i] == encoded:
+            start, end = self.folded_code_offsets[i], self.folded_code_offsets[i + 1]
+            return [str(self.concept_ids[c]) for c in self.folded_concepts[start:end]]
+        return []
+
+    def complete_keys(self, prefix: str, limit: int = 10) -> List[Tuple[str, str]]:
+        """
+        Autocomplétion : clés commençant par le préfixe (voir normalize_term_key)
+
+        Les clés étant triées par octets, les clés du préfixe forment une plage
+        contiguë trouvée par deux recherches dichotomiques ; au plus
+        _COMPLETION_SCAN clés en sont examinées. Les termes préférés puis les plus
+        courts passent en tête, les FSN en dernier. Si le préfixe exact ne suffit
+        pas, les clés repliées (sans accents ni ponctuation) complètent la liste.
+
+        Returns:
+            Liste de (clé, SCTID principal de la clé)
+        """
+        encoded = normalize_term_key(prefix).encode('utf-8')
+        if not encoded:
+            return []
+        start = bisect.bisect_left(self.keys, encoded)
+        end = min(bisect.bisect_left(self.keys, encoded + b"\xff", start), start + _COMPLETION_SCAN)
+
+        def rank(i: int) -> Tuple:
+            flags = self.key_code_flags[self.key_code_offsets[i]]
+            return not flags & TERM_FLAG_PREFERRED, bool(flags & TERM_FLAG_FSN), len(self.keys[i]), i
+
+        completions = [(self.keys.get(i), str(self.concept_ids[self.key_concepts[i]]))
+                       for i in sorted(range(start, end), key=rank)[:limit]]
+        if len(completions) < limit:
+            folded = fold_term(prefix, strip_plurals=False).encode('utf-8')
+            if folded:
+                seen = {code for _, code in completions}
+                start = bisect.bisect_left(self.folded_keys, folded)
+                end = min(bisect.bisect_left(self.folded_keys, folded + b"\xff", start), start + _COMPLETION_SCAN)
+                for i in sorted(range(start, end), key=lambda i: len(self.folded_keys[i])):
+                    key = self.folded_keys.get(i)
+                    for concept in self.folded_concepts[self.folded_code_offsets[i]:self.folded_code_offsets[i + 1]]:
+                        code = str(self.concept_ids[concept])
+                        if code not in seen:
+                            seen.add(code)
+                            completions.append((key, code))
+                    if len(completions) >= limit:
+                        break
+        return completions[:limit]
+
+    def parents(self, sctid: str) -> List[str]:
+        """SCTID des parents directs (IS-A) d'un concept actif"""
+        i = self.concept_ordinal(sctid)
+        if i < 0:
+            return []
+        return [str(self.concept_ids[p]) for p in self.hierarchy.parents(i)]
+
+    def ancestors(self, sctid: str) -> List[str]:
+        """SCTID de tous les ancêtres (IS-A, fermeture transitive) d'un concept actif"""
+        i = self.concept_ordinal(sctid)
+        if i < 0:
+            return []
+        return [str(self.concept_ids[a]) for a in self.hierarchy.ancestors(i)]
+
+    def is_descendant_of(self, sctid: str, ancestor_sctid: str) -> bool:
+        """Vrai si ancestor_sctid est un ancêtre strict de sctid (recherche dichotomique)"""
+        i = self.concept_ordinal(sctid)
+        j = self.concept_ordinal(ancestor_sctid)
+        return i >= 0 and j >= 0 and self.hierarchy.is_descendant(i, j)
+
+    def category(self, sctid: str) -> Optional[str]:
+        """Catégorie précalculée d'un concept actif ("Clinical finding", "Procedure"...)"""
+        i = self.concept_ordinal(sctid)
+        if i < 0:
+            return None
+        return self.hierarchy.category(i)
+
+    def similar_keys(self, key: str, limit: int = 5,
+                     min_similarity: float = DEFAULT_MIN_SIMILARITY) -> List[Tuple[str, str, float]]:
+        """
+        Clés les plus proches d'une clé normalisée (index de trigrammes)
+
+        Returns:
+            Liste [(clé, SCTID, score)] par score décroissant, une clé par concept
+        """
+        hits = self.trigrams.search(key, limit, min_similarity, groups=self.key_concepts)
+        return [(self.keys.get(i), str(self.concept_ids[self.key_concepts[i]]), score)
+                for i, score in hits]
+
+    def near_keys(self, key: str, max_distance: int = SYMSPELL_MAX_DISTANCE) -> List[Tuple[str, str, int]]:
+        """
+        Clés à une distance d'édition <= max_distance d'une clé normalisée (SymSpell)
+
+        Returns:
+            Liste [(clé, SCTID, distance)] par distance croissante, une clé par concept
+        """
+        results = []
+        seen = set()
+        for i, distance in self.deletes.lookup(key, max_distance):
+            concept = self.key_concepts[i]
+            if concept not in seen:
+                seen.add(concept)
+                results.append((self.keys.get(i), str(self.concept_ids[concept]), distance))
+        return results
+
+    def ranked_keys(self, key: str, limit: int = 5) -> List[Tuple[str, str, float, float]]:
+        """
+        Clés classées par score BM25 sur les mots d'un terme (repliés, mots outils exclus)
+
+        Returns:
+            Liste [(clé, SCTID, score, couverture)] par score décroissant, une clé par concept
+        """
+        return self.ranked_keys_many([key], limit)[0]
+
+    def ranked_keys_many(self, keys: List[str], limit: int = 5) -> List[List[Tuple[str, str, float, float]]]:
+        """Classement BM25 d'un lot de termes (voir ranked_keys), dans l'ordre des termes"""
+        batches = self.bm25.search_many([fold_term(key) for key in keys], limit, groups=self.key_concepts)
+        return [[(self.keys.get(i), str(self.concept_ids[self.key_concepts[i]]), score, coverage)
+                 for i, score, coverage in hits]
+                for hits in batches]
+
+    def iter_concepts(self) -> Iterator[str]:
+        for value in self.concept_ids:
+            yield str(value)
+
+    def iter_french_terms(self) -> Iterator[Tuple[str, str]]:
+        for i, value in enumerate(self.concept_ids):
+            term = self.terms.get(i)
+            if term:
+                yield str(value), term
+
+    def iter_term_keys(self) -> Iterator[Tuple[str, str]]:
+        for i in range(len(self.keys)):
+            yield self.keys.get(i), str(self.concept_ids[self.key_concepts[i]])
+
+    def iter_term_codes(self) -> Iterator[Tuple[str, List[Tuple[str, int]]]]:
+        for i in range(len(self.keys)):
+            yield self.keys.get(i), self._key_codes(i)
+
+    def iter_redirects(self) -> Iterator[Tuple[str, Tuple[str, int]]]:
+        """Redirections : (SCTID inactif, (SCTID actif, type de redirection))"""
+        for source, target, kind in self.redirects:
+            yield str(source), (str(self.concept_ids[target]), kind)
+
+    def iter_preferred_descriptions(self) -> Iterator[Tuple[str, str]]:
+        for i, value in enumerate(self.concept_ids):
+            if self.concept_preferred[i] != NO_DESCRIPTION:
+                yield str(value), str(self.description_ids[self.concept_preferred[i]])
+
+    def iter_descriptions(self) -> Iterator[Tuple[str, Tuple[str, str, int]]]:
+        """Descriptions indexées : (id, (SCTID du concept, clé normalisée, drapeaux))"""
+        keys = [self.keys.get(i) for i in range(len(self.keys))]
+        for description_id, concept, key, flags in zip(self.description_ids, self.description_concepts,
+                                                       self.description_keys, self.description_flags):
+            yield str(description_id), (str(self.concept_ids[concept]), keys[key], flags)
+
+
+# ---------------------------------------------------------------------------
+# Construction depuis les fichiers RF2
+# ---------------------------------------------------------------------------
+
+def is_index_stale(index_path: Path, files: Dict[str, RF2File]) -> Tuple[bool, str]:
+    """
+    Déterminer si l'index compilé doit être reconstruit
+
+    La comparaison se fait d'abord sur la taille et le mtime des fichiers RF2.
+    Si seul le mtime a changé (copie, checkout...), l'empreinte du contenu
+    (SHA-256, ou CRC-32 d'un membre d'archive) tranche.
+
+    Returns:
+        (périmé, raison)
+    """
+    meta = read_index_metadata(index_path)
+    if meta is None:
+        return True, "index absent ou format incompatible"
+
+    stored = meta.get("fingerprint", {})
+    if set(stored) != set(files):
+        return True, "jeu de fichiers RF2 différent"
+
+    touched = False
+    for kind, file in files.items():
+        entry = stored[kind]
+        if entry.get("name") != file.name or entry.get("size") != file.size():
+            return True, f"{file.name} a changé"
+        mtime_ns = file.mtime_ns()
+        if entry.get("mtime_ns") != mtime_ns:
+            digest = file.digest()
+            if any(entry.get(algorithm) != value for algorithm, value in digest.items()):
+                return True, f"{file.name} a changé ({'/'.join(digest).upper()})"
+            entry["mtime_ns"] = mtime_ns
+            touched = True
+
+    if touched:
+        # Contenu identique : mémoriser les nouveaux mtime pour ne pas re-hacher à chaque chargement
+        _rewrite_metadata(index_path, meta)
+    return False, "à jour"
+
+
+def _rewrite_metadata(index_path: Path, meta: Dict) -> None:
+    """Réécrire les métadonnées d'un index en conservant ses sections"""
+    try:
+        with open(index_path, 'rb') as f:
+            buffer = f.read()
+        parsed = _parse_header(buffer)
+        if parsed is None:
+            return
+        _, data_start = parsed
+        parts = _assemble(meta, [])
+        parts.append(buffer[data_start:])
+        _write_atomic(index_path, parts)
+    except OSError:
+        pass  # Dossier en lecture seule : le SHA-256 sera simplement recalculé
+
+
+# Concepts actifs et descriptions préférées transmis une fois à chaque processus du pool
+# (voir _init_description_worker)
+_WORKER_CONCEPTS: frozenset = frozenset()
+_WORKER_PREFERRED: frozenset = frozenset()
+
+
+def _init_description_worker(valid_concepts: frozenset, preferred_ids: frozenset = frozenset()) -> None:
+    global _WORKER_CONCEPTS, _WORKER_PREFERRED
+    _WORKER_CONCEPTS = valid_concepts
+    _WORKER_PREFERRED = preferred_ids
+
+
+def _split_line_ranges(path: Path, chunks: int) -> List[Tuple[int, int]]:
+    """Découper un fichier RF2 (en-tête exclu) en plages d'octets alignées sur les fins de ligne"""
+    size = path.stat().st_size
+    ranges = []
+    with open(path, 'rb') as f:
+        f.readline()  # En-tête
+        start = f.tell()
+        step = max(1, (size - start) // max(1, chunks))
+        while start < size:
+            f.seek(min(start + step, size))
+            f.readline()  # Aller jusqu'à la fin de la ligne en cours
+            end = f.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _iter_line_blocks(stream, block_bytes: int) -> Iterator[bytes]:
+    """Lire un flux RF2 (en-tête déjà consommé) par blocs d'octets complétés jusqu'à la fin de ligne"""
+    while True:
+        block = stream.read(block_bytes)
+        if not block:
+            return
+        yield block + stream.readline()
+
+
+def _parse_description_chunk(path: Path, start: int, end: int, columns: Tuple[int, ...],
+                             valid_concepts: Optional[frozenset] = None,
+                             preferred_ids: Optional[frozenset] = None) -> Tuple[Dict, ...]:
+    """Parser une plage d'octets du fichier des descriptions (voir _parse_description_block)"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        return _parse_description_block(f.read(end - start), columns, valid_concepts, preferred_ids)
+
+
+def _parse_description_block(block: bytes, columns: Tuple[int, ...],
+                             valid_concepts: Optional[frozenset] = None,
+                             preferred_ids: Optional[frozenset] = None) -> Tuple[Dict, ...]:
+    """
+    Parser un bloc de lignes du fichier des descriptions (découpage simple sur les tabulations)
+
+    Args:
+        block: Lignes complètes, encodées en UTF-8
+        columns: Rangs des colonnes id, active, conceptId, languageCode, typeId et term
+        valid_concepts: Concepts actifs (par défaut ceux transmis au processus du pool)
+        preferred_ids: Descriptions préférées selon le refset de langue (idem)
+
+    Returns:
+        Tables partielles (french_terms, preferred, term_to_code, semantic_tags, descriptions)
+        dans l'ordre du fichier ; preferred : {SCTID: (id de la description préférée, terme)}
+    """
+    valid_concepts = _WORKER_CONCEPTS if valid_concepts is None else valid_concepts
+    preferred_ids = _WORKER_PREFERRED if preferred_ids is None else preferred_ids
+    id_col, active_col, concept_col, language_col, type_col, term_col = columns
+    width = max(columns) + 1
+    data = block.decode('utf-8')
+
+    french_terms: Dict[str, str] = {}
+    preferred: Dict[str, Tuple[str, str]] = {}
+    term_to_code: Dict[str, Dict[str, int]] = {}
+    semantic_tags: Dict[str, str] = {}
+    descriptions: Dict[str, Tuple[str, str, int]] = {}
+    for line in data.split('\n'):
+        fields = line.rstrip('\r').split('\t')
+        if len(fields) < width or fields[active_col] != '1' or fields[language_col] != 'fr':
+            continue
+        concept_id = fields[concept_col]
+        # Ne charger que les termes avec codes ACTIFS
+        if concept_id not in valid_concepts:
+            continue
+        term = fields[term_col]
+        if concept_id not in french_terms:
+            french_terms[concept_id] = term  # Terme principal à défaut de description préférée
+        # Tous les termes sont indexés dans term_to_code, y compris les
+        # descriptions partagées par plusieurs concepts
+        flags = 0
+        if fields[type_col] == FSN_TYPE_ID:
+            flags = TERM_FLAG_FSN
+            tag = semantic_tag(term)
+            if tag:
+                semantic_tags[concept_id] = tag
+        elif fields[id_col] in preferred_ids and concept_id not in preferred:
+            preferred[concept_id] = (fields[id_col], term)  # Terme préféré pour get_french_term
+        key = normalize_term_key(term)
+        codes = term_to_code.setdefault(key, {})
+        codes[concept_id] = codes.get(concept_id, 0) | flags
+        descriptions[fields[id_col]] = (concept_id, key, flags)
+    return french_terms, preferred, term_to_code, semantic_tags, descriptions
+
+
+def _parse_description_parts(file: RF2File, columns: Tuple[int, ...], chunks: int, valid_concepts: frozenset,
+                             preferred_ids: frozenset, pool: Optional[ProcessPoolExecutor]) -> List[Tuple]:
+    """
+    Tables partielles de chaque bloc du fichier des descriptions, dans l'ordre du fichier
+
+    Un fichier texte est découpé en plages d'octets relues par chaque processus ;
+    un membre d'archive ZIP (non adressable) est décompressé en flux et ses blocs
+    de lignes sont transmis aux processus.
+    """
+    if not file.is_archived:
+        ranges = _split_line_ranges(file.path, chunks)
+        if pool is None:
+            return [_parse_description_chunk(file.path, start, end, columns, valid_concepts, preferred_ids)
+                    for start, end in ranges]
+        return list(pool.map(_parse_description_chunk, *zip(*[(file.path, start, end, columns)
+                                                             for start, end in ranges])))
+
+    block_bytes = max(_MIN_CHUNK_BYTES, file.size() // max(1, chunks))
+    with file.open() as stream:
+        stream.readline()  # En-tête
+        if pool is None:
+            return [_parse_description_block(block, columns, valid_concepts, preferred_ids)
+                    for block in _iter_line_blocks(stream, block_bytes)]
+        return list(pool.map(_parse_description_block, _iter_line_blocks(stream, block_bytes),
+                             itertools.repeat(columns)))
+
+
+def _load_description_tables(file: RF2File, valid_concepts: set, workers: Optional[int] = None,
+                             preferred_ids: frozenset = frozenset()) -> Tuple[Dict, ...]:
+    """
+    Parser le fichier des descriptions françaises, en parallèle s'il est assez gros
+
+    Le fichier est découpé en blocs de lignes parsés dans un pool de processus ;
+    les tables partielles sont fusionnées dans l'ordre du fichier. Le terme
+    principal de chaque concept est sa description préférée (refset de langue),
+    à défaut la première description lue.
+
+    Args:
+        workers: Nombre de processus (par défaut, le nombre de cœurs)
+        preferred_ids: Descriptions préférées (voir _load_preferred_description_ids)
+
+    Returns:
+        (french_terms, term_to_code, semantic_tags, descriptions, preferred_descriptions)
+    """
+    with file.open_text() as f:
+        header = f.readline().rstrip('\r\n').split('\t')
+    columns = tuple(header.index(name) for name in ('id', 'active', 'conceptId', 'languageCode', 'typeId', 'term'))
+
+    workers = max(1, workers or os.cpu_count() or 1)
+    chunks = max(1, min(workers * _CHUNKS_PER_WORKER, file.size() // _MIN_CHUNK_BYTES))
+    valid_concepts = frozenset(valid_concepts)
+
+    parts = None
+    if workers > 1 and chunks > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, chunks), initializer=_init_description_worker,
+                                     initargs=(valid_concepts, preferred_ids)) as pool:
+                parts = _parse_description_parts(file, columns, chunks, valid_concepts, preferred_ids, pool)
+        except (OSError, BrokenProcessPool) as e:
+            print(f"⚠️ Parsing parallèle impossible ({e}), parsing séquentiel")
+            parts = None
+    if parts is None:
+        workers = 1
+        parts = _parse_description_parts(file, columns, chunks, valid_concepts, preferred_ids, None)
+
+    french_terms: Dict[str, str] = {}
+    preferred: Dict[str, Tuple[str, str]] = {}
+    term_to_code: Dict[str, Dict[str, int]] = {}
+    semantic_tags: Dict[str, str] = {}
+    descriptions: Dict[str, Tuple[str, str, int]] = {}
+    for part_terms, part_preferred, part_codes, part_tags, part_descriptions in parts:
+        for concept_id, term in part_terms.items():
+            french_terms.setdefault(concept_id, term)
+        for concept_id, entry in part_preferred.items():
+            preferred.setdefault(concept_id, entry)
+        for key, codes in part_codes.items():
+            merged = term_to_code.get(key)
+            if merged is None:
+                term_to_code[key] = codes
+            else:
+                for concept_id, flags in codes.items():
+                    merged[concept_id] = merged.get(concept_id, 0) | flags
+        semantic_tags.update(part_tags)
+        descriptions.update(part_descriptions)
+    print(f"   {len(parts)} bloc(s) parsé(s) par {workers} processus")
+    french_terms.update((concept_id, term) for concept_id, (_, term) in preferred.items())
+    preferred_descriptions = {concept_id: description_id for concept_id, (description_id, _) in preferred.items()}
+    return french_terms, term_to_code, semantic_tags, descriptions, preferred_descriptions
+
+
+def _load_preferred_description_ids(file: RF2File) -> frozenset:
+    """
+    Descriptions marquées "préférée" dans le refset de langue français
+
+    Le FSN est aussi préféré dans le refset : il est écarté au parsing des
+    descriptions, seul le synonyme préféré devient le terme principal.
+    """
+    with file.open_text() as f:
+        header = f.readline().rstrip('\r\n').split('\t')
+        active_col, component_col, acceptability_col = (
+            header.index(name) for name in ('active', 'referencedComponentId', 'acceptabilityId')
+        )
+        width = max(active_col, component_col, acceptability_col) + 1
+        preferred = set()
+        for line in f:
+            fields = line.rstrip('\r\n').split('\t')
+            if len(fields) >= width and fields[active_col] == '1' and fields[acceptability_col] == PREFERRED_ACCEPTABILITY_ID:
+                preferred.add(fields[component_col])
+    return frozenset(preferred)
+
+
+def build_snomed_tables(files: Dict[str, RF2File], workers: Optional[int] = None) -> Dict:
+    """
+    Parser les fichiers RF2 et construire les tables du validateur
+
+    Args:
+        files: Fichiers RF2 retournés par find_rf2_files
+        workers: Processus utilisés pour parser les descriptions (par défaut, le nombre de cœurs)
+
+    Returns:
+        {"concepts": [SCTID actifs], "french_terms": {SCTID: terme},
+         "term_to_code": {terme_lower: {SCTID: drapeaux TERM_FLAG_*}}, "semantic_tags": {SCTID: tag du FSN},
+         "is_a": {SCTID: [SCTID parents]},
+         "descriptions": {id de description: (SCTID, clé normalisée, drapeaux)},
+         "preferred_descriptions": {SCTID: id de la description préférée},
+         "redirects": {SCTID inactif: (SCTID actif, type de redirection)}}
+    """
+    valid_concepts = set()
+
+    print(f"📄 Chargement des concepts depuis {files['concepts'].name}")
+    with files["concepts"].open_text() as f:
+        reader = csv.DictReader(f, delimiter='\t')
+        for row in reader:
+            if row['active'] == '1':  # Concepts actifs uniquement
+                valid_concepts.add(row['id'])
+    print(f"✅ {len(valid_concepts)} concepts actifs chargés")
+
+    preferred_ids = frozenset()
+    if "language" in files:
+        print(f"📄 Chargement des termes préférés depuis {files['language'].name}")
+        preferred_ids = _load_preferred_description_ids(files["language"])
+        print(f"✅ {len(preferred_ids)} descriptions préférées")
+    else:
+        print("⚠️ Pas de refset de langue : terme principal = première description lue")
+
+    print(f"📄 Chargement des descriptions françaises depuis {files['descriptions'].name}")
+    parse_start = time.time()
+    french_terms, term_to_code, semantic_tags, descriptions, preferred_descriptions = _load_description_tables(
+        files["descriptions"], valid_concepts, workers, preferred_ids
+    )
+    for concept_id, term in french_terms.items():
+        term_to_code[normalize_term_key(term)][concept_id] |= TERM_FLAG_PREFERRED
+    shared = sum(1 for codes in term_to_code.values() if len(codes) > 1)
+    print(f"✅ {len(french_terms)} termes français chargés ({shared} descriptions partagées par plusieurs concepts)"
+          f" en ⏱️ {time.time() - parse_start:.2f}s")
+
+    is_a: Dict[str, List[str]] = {}
+    if "relationships" in files:
+        print(f"📄 Chargement des relations IS-A depuis {files['relationships'].name}")
+        with files["relationships"].open_text() as f:
+            reader = csv.DictReader(f, delimiter='\t')
+            for row in reader:
+                if row['active'] == '1' and row['typeId'] == IS_A_TYPE_ID:
+                    child, parent = row['sourceId'], row['destinationId']
+                    # Relations entre concepts ACTIFS uniquement
+                    if child in valid_concepts and parent in valid_concepts:
+                        parents = is_a.setdefault(child, [])
+                        if parent not in parents:
+                            parents.append(parent)
+        print(f"✅ {sum(len(parents) for parents in is_a.values())} relations IS-A chargées")
+    else:
+        print("⚠️ Pas de fichier de relations : hiérarchie IS-A indisponible")
+
+    redirects: Dict[str, Tuple[str, int]] = {}
+    if "associations" in files:
+        print(f"📄 Chargement des associations historiques depuis {files['associations'].name}")
+        redirects = resolve_redirects(load_associations(files["associations"]), valid_concepts)
+        print(f"✅ {len(redirects)} concepts inactifs redirigés vers un concept actif")
+
+    return {
+        "concepts": sorted(valid_concepts),
+        "french_terms": french_terms,
+        "term_to_code": term_to_code,
+        "semantic_tags": semantic_tags,
+        "is_a": is_a,
+        "descriptions": descriptions,
+        "preferred_descriptions": preferred_descriptions,
+        "redirects": redirects,
+    }
+
+
+def tables_from_index(index: SNOMEDIndex) -> Dict:
+    """
+    Reconstituer les tables du validateur (voir build_snomed_tables) depuis un index compilé
+
+    Seules les clés normalisées des descriptions sont conservées dans l'index :
+    le terme principal de chaque concept garde sa casse, les autres sont en minuscules.
+    """
+    term_to_code = {key: dict(codes) for key, codes in index.iter_term_codes()}
+    semantic_tags: Dict[str, str] = {}
+    for key, codes in term_to_code.items():
+        for code, flags in codes.items():
+            if flags & TERM_FLAG_FSN:
+                tag = semantic_tag(key)
+                if tag:
+                    semantic_tags[code] = tag
+
+    is_a: Dict[str, List[str]] = {}
+    if index.hierarchy:
+        for i, value in enumerate(index.concept_ids):
+            parents = index.hierarchy.parents(i)
+            if len(parents):
+                is_a[str(value)] = [str(index.concept_ids[p]) for p in parents]
+
+    return {
+        "concepts": list(index.iter_concepts()),
+        "french_terms": dict(index.iter_french_terms()),
+        "term_to_code": term_to_code,
+        "semantic_tags": semantic_tags,
+        "is_a": is_a,
+        "descriptions": dict(index.iter_descriptions()),
+        "preferred_descriptions": dict(index.iter_preferred_descriptions()),
+        "redirects": dict(index.iter_redirects()),
+    }
+
+
+def write_snomed_index(index_path: Path, tables: Dict, fingerprint: Dict,
+                       deltas: Optional[List[Dict]] = None, scope: Optional[Dict] = None,
+                       reuse_sections: Optional[Dict[str, Tuple[str, bytes]]] = None) -> None:
+    """Écrire l'index compilé (sections binaires) de manière atomique (voir _pack_sections pour reuse_sections)"""
+    parts = _serialize_index(_index_meta(tables, fingerprint, deltas, scope),
+                             _pack_sections(tables, reuse_sections))
+    _write_atomic(index_path, parts)
+
+
+# Index déjà mappés dans ce processus, partagés entre toutes les instances du validateur
+_OPEN_INDEXES: Dict[str, Tuple[Tuple, SNOMEDIndex]] = {}
+_OPEN_INDEXES_LOCK = threading.Lock()
+
+
+def open_snomed_index(index_path: Path) -> Optional[SNOMEDIndex]:
+    """
+    Ouvrir (ou réutiliser) le mapping mémoire d'un index compilé
+
+    Le cache est indexé par chemin et vérifié par inode/mtime : un index remplacé
+    sur disque est re-mappé, les instances qui utilisent l'ancien restent valides.
+    """
+    try:
+        path = Path(index_path).resolve()
+        stat = path.stat()
+        version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with _OPEN_INDEXES_LOCK:
+            cached = _OPEN_INDEXES.get(str(path))
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            index = SNOMEDIndex.open(path)
+            _OPEN_INDEXES[str(path)] = (version, index)
+        return index
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ Index illisible ({e})")
+        return None
+
+
+def close_snomed_index(index_path: Path) -> None:
+    """Retirer un index du cache du processus (son mmap est libéré avec sa dernière instance)"""
+    with _OPEN_INDEXES_LOCK:
+        _OPEN_INDEXES.pop(str(Path(index_path).resolve()), None)
+
+
+def _rebuild_index(files: Dict[str, RF2File], index_path: Path, workers: Optional[int] = None) -> SNOMEDIndex:
+    """Reconstruire les tables depuis les fichiers RF2 et écrire l'index compilé"""
+    start_time = time.time()
+    tables = build_snomed_tables(files, workers)
+    fingerprint = rf2_fingerprint(files)
+
+    try:
+        write_snomed_index(index_path, tables, fingerprint)
+        print(f"💾 Index compilé écrit dans {index_path} en ⏱️ {time.time() - start_time:.2f}s")
+    except OSError as e:
+        # Dossier en lecture seule : l'index reste utilisable en mémoire
+        print(f"⚠️ Impossible d'écrire l'index compilé ({e}), utilisation d'un index en mémoire")
+        return SNOMEDIndex.from_tables(tables, fingerprint)
+
+    return open_snomed_index(index_path) or SNOMEDIndex.from_tables(tables, fingerprint)
+
+
+def compile_snomed_index(snapshot_path, index_path: Optional[Path] = None,
+                         force: bool = False, workers: Optional[int] = None) -> bool:
+    """
+    Compiler l'index SNOMED CT (étape unique par release)
+
+    Args:
+        snapshot_path: Dossier contenant les fichiers SNOMED CT Snapshot
+        index_path: Chemin de l'index (par défaut dans le dossier Snapshot)
+        force: Reconstruire même si l'index est à jour
+        workers: Processus utilisés pour parser les descriptions (par défaut, le nombre de cœurs)
+
+    Returns:
+        True si l'index est à jour ou a été compilé
+    """
+    snapshot_path = Path(snapshot_path)
+    index_path = Path(index_path) if index_path else index_path_for(snapshot_path)
+
+    files = find_rf2_files(snapshot_path)
+    if files is None:
+        return False
+
+    if not force:
+        stale, reason = is_index_stale(index_path, files)
+        if not stale:
+            print(f"✅ Index SNOMED CT à jour : {index_path}")
+            return True
+        print(f"🔄 Compilation de l'index SNOMED CT ({reason})...")
+
+    try:
+        _rebuild_index(files, index_path, workers)
+    except Exception as e:
+        print(f"❌ Erreur lors de la compilation de l'index : {e}")
+        return False
+    return True
+
+
+def _rebuild_index_for_mode(files: Dict[str, RF2File], index_path: Path, use_mmap: bool) -> SNOMEDIndex:
+    """Reconstruire l'index (voir _rebuild_index), rechargé dans un tampon privé si use_mmap est faux"""
+    index = _rebuild_index(files, index_path)
+    if not use_mmap and index.path is not None:
+        index = SNOMEDIndex.load(index.path)
+    return index
+
+
+def load_snomed_index(snapshot_path, index_path: Optional[Path] = None,
+                      auto_rebuild: bool = True, use_mmap: bool = True) -> Optional[SNOMEDIndex]:
+    """
+    Ouvrir l'index compilé du validateur
+
+    Si l'index est absent ou périmé (fichiers RF2 modifiés), il est reconstruit
+    automatiquement depuis les fichiers RF2.
+
+    Args:
+        use_mmap: Mapper le fichier (pages partagées entre processus) ; sinon
+                  charger les sections dans un tampon privé au processus
+
+    Returns:
+        L'index SNOMEDIndex ou None en cas d'erreur
+    """
+    snapshot_path = Path(snapshot_path)
+    index_path = Path(index_path) if index_path else index_path_for(snapshot_path)
+
+    files = find_rf2_files(snapshot_path)
+    if files is None:
+        return None
+
+    stale, reason = is_index_stale(index_path, files)
+    if stale:
+        if not auto_rebuild:
+            print(f"❌ Index SNOMED CT périmé : {reason}")
+            return None
+        print(f"🔄 Index SNOMED CT à reconstruire ({reason})")
+        return _rebuild_index_for_mode(files, index_path, use_mmap)
+
+    start_time = time.time()
+    if use_mmap:
+        index = open_snomed_index(index_path)
+    else:
+        try:
+            index = SNOMEDIndex.load(index_path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Index illisible ({e})")
+            index = None
+    if index is None:
+        print("⚠️ Index illisible, reconstruction depuis les fichiers RF2")
+        return _rebuild_index_for_mode(files, index_path, use_mmap)
+
+    mode = "mappé" if use_mmap else "chargé"
+    print(f"⚡ Index SNOMED CT {mode} depuis {index_path.name} en ⏱️ {(time.time() - start_time) * 1000:.1f}ms")
+    return index
+
+
+def main():
+    """Compiler l'index SNOMED CT en ligne de commande"""
+    parser = argparse.ArgumentParser(description="Compiler l'index binaire SNOMED CT")
+    parser.add_argument("snapshot_path", nargs="?", default="data/snomed_fr",
+                        help="Dossier contenant les fichiers RF2 Snapshot, ou archive ZIP de la release")
+    parser.add_argument("--force", action="store_true",
+                        help="Reconstruire même si l'index est à jour")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processus pour parser les descriptions (défaut : nombre de cœurs)")
+    args = parser.parse_args()
+
+    return 0 if compile_snomed_index(args.snapshot_path, force=args.force, workers=args.workers) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
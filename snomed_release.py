@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Release SNOMED CT active du service, remplaçable à chaud
+
+Le validateur de la release active est partagé par toutes les requêtes du
+processus. Pour changer d'édition (ou prendre en compte un index recompilé
+ou une Delta appliquée), le nouveau validateur est chargé en arrière-plan
+puis substitué d'un seul coup : chaque requête récupère le validateur actif
+à son début et le garde jusqu'à la fin, les requêtes en cours terminent donc
+sur l'ancienne release (son index mappé reste valide tant qu'il est utilisé).
+"""
+
+import threading
+from typing import List, Optional
+
+from snomed_index import index_path_for, index_revision, read_index_metadata
+from snomed_validator import STORE_MMAP, SNOMEDValidator
+
+
+class SNOMEDRelease:
+    """Validateur de la release SNOMED CT active, remplaçable sans redémarrer le service"""
+
+    def __init__(self, snomed_data_path: Optional[str] = None, store: str = STORE_MMAP,
+                 hierarchies: Optional[List[str]] = None):
+        """
+        Args:
+            snomed_data_path, store, hierarchies: Voir SNOMEDValidator ; le validateur
+                de la release initiale est chargé une seule fois, à sa première utilisation
+        """
+        self.store = store
+        self.hierarchies = hierarchies
+        self._validator = SNOMEDValidator(snomed_data_path, store=store, hierarchies=hierarchies)
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loading: Optional[threading.Thread] = None
+
+    @property
+    def validator(self) -> SNOMEDValidator:
+        """Validateur chargé de la release active (à récupérer une fois par requête)"""
+        validator = self._validator
+        if validator.index is None:
+            # Premières requêtes simultanées : un seul chargement de l'index
+            with self._load_lock:
+                if validator.index is None:
+                    validator.load_snomed_data()
+        return validator
+
+    @property
+    def version(self) -> Optional[str]:
+        """Version de la release active (voir SNOMEDValidator.release_version)"""
+        return self._validator.release_version
+
+    def swap(self, snomed_data_path: Optional[str] = None) -> bool:
+        """
+        Charger une release puis la substituer à la release active
+
+        Le chargement (et la compilation de l'index si besoin) se fait sans
+        bloquer les requêtes, qui continuent d'utiliser la release active.
+
+        Args:
+            snomed_data_path: Dossier Snapshot ou archive ZIP de la nouvelle release
+                              (par défaut, celle de la release active : index recompilé
+                              ou Delta appliquée)
+
+        Returns:
+            True si la nouvelle release est active
+        """
+        path = snomed_data_path or self._validator.snapshot_path
+        validator = SNOMEDValidator(str(path), store=self.store, hierarchies=self.hierarchies)
+        if not validator.load_snomed_data():
+            print(f"❌ Release SNOMED CT {path} non chargée : la release active est conservée")
+            return False
+        with self._lock:
+            previous, self._validator = self._validator, validator
+        print(f"🔁 Release SNOMED CT active : {previous.release_version or 'non chargée'} → {validator.release_version}")
+        return True
+
+    def swap_in_background(self, snomed_data_path: Optional[str] = None) -> Optional[threading.Thread]:
+        """
+        Lancer swap() dans un thread (un seul chargement à la fois)
+
+        Returns:
+            Le thread de chargement, ou None si un chargement est déjà en cours
+        """
+        with self._lock:
+            if self._loading is not None and self._loading.is_alive():
+                return None
+            self._loading = threading.Thread(target=self.swap, args=(snomed_data_path,), daemon=True,
+                                             name="snomed-release-swap")
+            self._loading.start()
+            return self._loading
+
+    def refresh(self) -> Optional[threading.Thread]:
+        """
+        Recharger en arrière-plan si l'index de la release active a changé sur disque
+
+        Coût : lecture de l'en-tête de l'index. À appeler au début d'une requête.
+
+        Returns:
+            Le thread de chargement lancé, ou None si l'index n'a pas changé
+        """
+        validator = self._validator
+        if validator.index is None:
+            return None
+        meta = read_index_metadata(index_path_for(validator.snapshot_path))
+        # Un index allégé est comparé à l'index complet dont il est dérivé
+        loaded = validator.index.meta.get("scope", {}).get("source") or index_revision(validator.index.meta)
+        if meta is None or index_revision(meta) == loaded:
+            return None
+        return self.swap_in_background(str(validator.snapshot_path))
+
+
+# Release partagée par toutes les requêtes du processus
+_RELEASE: Optional[SNOMEDRelease] = None
+_RELEASE_LOCK = threading.Lock()
+
+
+def get_snomed_release(snomed_data_path: Optional[str] = None, store: str = STORE_MMAP,
+                       hierarchies: Optional[List[str]] = None) -> SNOMEDRelease:
+    """
+    Release SNOMED CT du processus (créée au premier appel avec ces paramètres)
+
+    Returns:
+        L'instance SNOMEDRelease partagée
+    """
+    global _RELEASE
+    with _RELEASE_LOCK:
+        if _RELEASE is None:
+            _RELEASE = SNOMEDRelease(snomed_data_path, store=store, hierarchies=hierarchies)
+        return _RELEASE
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Accès aux fichiers RF2 d'une release SNOMED CT
+
+Les fichiers sont lus soit dans un dossier Snapshot décompressé, soit
+directement dans l'archive ZIP officielle de la release : les membres
+Concept, Description et Relationship sont décompressés à la volée, sans
+jamais écrire les fichiers texte sur disque.
+"""
+
+import fnmatch
+import hashlib
+import io
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Dict, List, Optional, TextIO
+
+
+def is_release_archive(path: Path) -> bool:
+    """Vrai si le chemin désigne une archive ZIP de release (et non un dossier Snapshot)"""
+    path = Path(path)
+    return path.is_file() and zipfile.is_zipfile(path)
+
+
+class RF2File:
+    """Fichier RF2 : fichier texte d'un dossier Snapshot ou membre de l'archive ZIP de la release"""
+
+    def __init__(self, path: Path, member: Optional[str] = None):
+        self.path = Path(path)
+        self.member = member
+        self._info: Optional[zipfile.ZipInfo] = None
+
+    def __repr__(self) -> str:
+        return f"RF2File({str(self.path)!r}, {self.member!r})" if self.member else f"RF2File({str(self.path)!r})"
+
+    @property
+    def name(self) -> str:
+        return PurePosixPath(self.member).name if self.member else self.path.name
+
+    @property
+    def is_archived(self) -> bool:
+        return self.member is not None
+
+    def _zip_info(self) -> zipfile.ZipInfo:
+        if self._info is None:
+            with zipfile.ZipFile(self.path) as archive:
+                self._info = archive.getinfo(self.member)
+        return self._info
+
+    def size(self) -> int:
+        """Taille du fichier texte (décompressé pour un membre d'archive)"""
+        return self._zip_info().file_size if self.member else self.path.stat().st_size
+
+    def mtime_ns(self) -> int:
+        """mtime du fichier, ou de l'archive qui contient le membre"""
+        return self.path.stat().st_mtime_ns
+
+    def digest(self) -> Dict[str, str]:
+        """
+        Empreinte du contenu : SHA-256 d'un fichier texte, CRC-32 d'un membre
+        d'archive (lu dans le répertoire central, sans décompression)
+        """
+        if self.member:
+            return {"crc32": f"{self._zip_info().CRC:08x}"}
+        digest = hashlib.sha256()
+        with open(self.path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return {"sha256": digest.hexdigest()}
+
+    def open(self) -> BinaryIO:
+        """Ouvrir le fichier en lecture binaire (flux décompressé pour un membre d'archive)"""
+        if not self.member:
+            return open(self.path, 'rb')
+        # Le flux du membre garde le fichier de l'archive ouvert jusqu'à sa propre fermeture
+        with zipfile.ZipFile(self.path) as archive:
+            return archive.open(self.member)
+
+    def open_text(self) -> TextIO:
+        """Ouvrir le fichier en lecture texte UTF-8 (fins de ligne conservées, pour le module csv)"""
+        return io.TextIOWrapper(self.open(), encoding='utf-8', newline='')
+
+
+def find_archive_members(archive_path: Path, pattern: str) -> List[str]:
+    """Membres de l'archive dont le nom de fichier correspond au motif (glob), triés"""
+    with zipfile.ZipFile(archive_path) as archive:
+        return sorted(name for name in archive.namelist()
+                      if not name.endswith('/') and fnmatch.fnmatchcase(PurePosixPath(name).name, pattern))
+
+
+def find_rf2_file(source: Path, pattern: str) -> Optional[RF2File]:
+    """
+    Premier fichier RF2 correspondant au motif dans un dossier Snapshot ou une archive ZIP
+
+    Args:
+        source: Dossier Snapshot ou archive ZIP de la release
+        pattern: Motif glob du nom de fichier (ex: "sct2_Concept_Snapshot_*.txt")
+    """
+    source = Path(source)
+    if is_release_archive(source):
+        members = find_archive_members(source, pattern)
+        return RF2File(source, members[0]) if members else None
+    matches = sorted(source.glob(pattern))
+    return RF2File(matches[0]) if matches else None
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Index SNOMED CT allégé, restreint à quelques hiérarchies de premier niveau
+
+L'extracteur ne cible que les constatations cliniques, procédures et structures
+corporelles : les autres hiérarchies (organismes, substances, valeurs de
+qualificatif...) occupent de la mémoire sans jamais servir. Un index allégé ne
+contient que les concepts de ces hiérarchies et leurs ancêtres (nécessaires à
+get_parents / is_descendant_of), plus la liste triée des SCTID exclus : un code
+exclu est signalé "hors périmètre" et non "invalide".
+
+L'index allégé est dérivé de l'index complet (voir snomed_index.py) et écrit à
+côté de lui ; il est régénéré dès que l'index complet change (recompilation ou
+Delta appliquée).
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from snomed_hierarchy import CATEGORY_NAMES, TOP_LEVEL_CATEGORIES
+from snomed_index import (SNOMEDIndex, close_snomed_index, compile_snomed_index, index_path_for, index_revision,
+                          load_snomed_index, open_snomed_index, read_index_metadata, tables_from_index,
+                          write_snomed_index)
+
+# Hiérarchies utiles à l'extraction (voir SNOMEDExtractor)
+DEFAULT_HIERARCHIES = ("Clinical finding", "Procedure", "Body structure")
+
+# Version de la dérivation : un index allégé d'une autre version est régénéré
+# (2 : concepts inactifs dont le remplaçant est exclu signalés hors périmètre)
+SCOPE_VERSION = 2
+
+_TOP_LEVEL_BY_CATEGORY = {CATEGORY_NAMES[category]: sctid for sctid, category in TOP_LEVEL_CATEGORIES.items()}
+
+
+def resolve_hierarchies(hierarchies: Sequence[str]) -> List[str]:
+    """
+    Normaliser une liste de hiérarchies (noms de catégorie ou SCTID de premier niveau)
+
+    Returns:
+        Noms de catégorie triés ("Body structure", "Clinical finding"...)
+
+    Raises:
+        ValueError: si une hiérarchie n'est pas une hiérarchie de premier niveau connue
+    """
+    categories = set()
+    for hierarchy in hierarchies:
+        hierarchy = hierarchy.strip()
+        if hierarchy in TOP_LEVEL_CATEGORIES:
+            categories.add(CATEGORY_NAMES[TOP_LEVEL_CATEGORIES[hierarchy]])
+        elif hierarchy in _TOP_LEVEL_BY_CATEGORY:
+            categories.add(hierarchy)
+        else:
+            raise ValueError(f"Hiérarchie SNOMED CT inconnue : {hierarchy}")
+    return sorted(categories)
+
+
+def scoped_index_path(index_path: Path, categories: Sequence[str]) -> Path:
+    """Chemin de l'index allégé : nommé d'après les SCTID des hiérarchies conservées"""
+    index_path = Path(index_path)
+    suffix = "-".join(sorted(_TOP_LEVEL_BY_CATEGORY[category] for category in categories))
+    return index_path.with_name(f"{index_path.stem}.{suffix}{index_path.suffix}")
+
+
+def filter_tables(tables: Dict, index: SNOMEDIndex, categories: Sequence[str]) -> Dict:
+    """
+    Restreindre les tables du validateur aux concepts des catégories données et à leurs ancêtres
+
+    Args:
+        tables: Tables reconstituées depuis l'index complet (voir tables_from_index)
+        index: L'index complet (catégories et fermeture IS-A précalculées)
+        categories: Noms des catégories conservées
+
+    Returns:
+        Nouvelles tables, avec "out_of_scope" : SCTID actifs exclus, et SCTID inactifs
+        dont le remplaçant est exclu (signalés hors périmètre et non invalides)
+    """
+    wanted = {i for i, name in enumerate(CATEGORY_NAMES) if name in categories}
+    kept_ordinals = {i for i, category in enumerate(index.hierarchy.categories) if category in wanted}
+    for i in list(kept_ordinals):
+        kept_ordinals.update(index.hierarchy.ancestors(i))
+    kept = {str(index.concept_ids[i]) for i in kept_ordinals}
+
+    redirects = {}
+    out_of_scope = [sctid for sctid in tables["concepts"] if sctid not in kept]
+    for sctid, redirect in tables.get("redirects", {}).items():
+        if redirect[0] in kept:
+            redirects[sctid] = redirect
+        else:
+            out_of_scope.append(sctid)
+
+    term_to_code = {}
+    for key, codes in tables["term_to_code"].items():
+        codes = {code: flags for code, flags in codes.items() if code in kept}
+        if codes:
+            term_to_code[key] = codes
+
+    return {
+        "concepts": [sctid for sctid in tables["concepts"] if sctid in kept],
+        "french_terms": {sctid: term for sctid, term in tables["french_terms"].items() if sctid in kept},
+        "term_to_code": term_to_code,
+        "semantic_tags": {sctid: tag for sctid, tag in tables["semantic_tags"].items() if sctid in kept},
+        "is_a": {child: [parent for parent in parents if parent in kept]
+                 for child, parents in tables["is_a"].items() if child in kept},
+        "descriptions": {description_id: entry for description_id, entry in tables["descriptions"].items()
+                         if entry[0] in kept},
+        "preferred_descriptions": {sctid: description_id
+                                   for sctid, description_id in tables.get("preferred_descriptions", {}).items()
+                                   if sctid in kept},
+        "redirects": redirects,
+        "out_of_scope": out_of_scope,
+    }
+
+
+def load_scoped_snomed_index(snapshot_path, hierarchies: Sequence[str] = DEFAULT_HIERARCHIES,
+                             use_mmap: bool = True) -> Optional[SNOMEDIndex]:
+    """
+    Ouvrir l'index allégé aux hiérarchies données, en le dérivant de l'index complet si besoin
+
+    L'index complet est compilé (ou recompilé) s'il est absent ou périmé, puis
+    relâché une fois l'index allégé écrit. Sans catégories précalculées (pas de
+    relations IS-A ni de tags sémantiques), l'index complet est utilisé.
+
+    Args:
+        snapshot_path: Dossier Snapshot ou archive ZIP de la release
+        hierarchies: Noms de catégorie ou SCTID des hiérarchies de premier niveau conservées
+        use_mmap: Mapper le fichier (voir load_snomed_index)
+
+    Returns:
+        L'index SNOMEDIndex allégé (ou complet à défaut) ou None en cas d'erreur
+    """
+    categories = resolve_hierarchies(hierarchies)
+    index_path = index_path_for(snapshot_path)
+    if not compile_snomed_index(snapshot_path):
+        return None
+    full_meta = read_index_metadata(index_path)
+    if full_meta is None:
+        return None
+    full_size = index_path.stat().st_size
+
+    path = scoped_index_path(index_path, categories)
+    meta = read_index_metadata(path)
+    scope = meta.get("scope", {}) if meta else {}
+    if scope.get("source") != index_revision(full_meta) or scope.get("version") != SCOPE_VERSION:
+        full = SNOMEDIndex.open(index_path)
+        if not any(full.hierarchy.categories):
+            print("⚠️ Catégories des concepts indisponibles : chargement de l'index complet")
+            return load_snomed_index(snapshot_path, use_mmap=use_mmap)
+        print(f"🔄 Dérivation de l'index allégé ({', '.join(categories)})...")
+        tables = filter_tables(tables_from_index(full), full, categories)
+        # Identité de l'index complet dont l'index allégé est dérivé (voir SNOMEDRelease.refresh)
+        scope = {"hierarchies": categories, "source": index_revision(full.meta), "full_size": full_size,
+                 "version": SCOPE_VERSION}
+        try:
+            write_snomed_index(path, tables, full.meta["fingerprint"], full.meta.get("deltas"), scope)
+        except OSError as e:
+            print(f"⚠️ Impossible d'écrire l'index allégé ({e}) : chargement de l'index complet")
+            return load_snomed_index(snapshot_path, use_mmap=use_mmap)
+        finally:
+            del full
+            close_snomed_index(index_path)
+
+    if use_mmap:
+        index = open_snomed_index(path)
+    else:
+        try:
+            index = SNOMEDIndex.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Index illisible ({e})")
+            index = None
+    if index is None:
+        return None
+
+    counts = index.meta["counts"]
+    size = path.stat().st_size
+    print(f"🪶 Index allégé ({', '.join(categories)}) : {counts['concepts']} concepts conservés, "
+          f"{counts['out_of_scope']} hors périmètre ; {size / 1e6:.1f} Mo au lieu de {full_size / 1e6:.1f} Mo "
+          f"({(full_size - size) / 1e6:.1f} Mo économisés)")
+    return index
@@ -0,0 +1,577 @@
+#!/usr/bin/env python3
+"""
+Structures de recherche approximative sur les termes français SNOMED CT
+
+Les structures sont construites une seule fois, à la compilation de l'index
+(voir snomed_index.py), et sérialisées comme les autres sections : des
+tableaux d'entiers interrogés directement dans le tampon mappé, sans
+reconstruire de dict Python au chargement.
+"""
+
+import bisect
+import hashlib
+from array import array
+from collections import Counter
+from math import ceil, log
+from operator import itemgetter
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+# Similarité minimale par défaut (coefficient de Jaccard sur les trigrammes, comme pg_trgm)
+DEFAULT_MIN_SIMILARITY = 0.3
+
+# Recherche par suppressions symétriques (SymSpell) : distance d'édition maximale
+# précalculée et longueur du préfixe des clés à partir duquel les suppressions sont générées
+SYMSPELL_MAX_DISTANCE = 2
+SYMSPELL_PREFIX_LENGTH = 7
+
+# Premier passage de la recherche : entrées de listes parcourues (doublées à chaque tranche)
+# et nombre de candidats vérifiés par résultat demandé
+_PROBE_BUDGET = 2000
+_FIRST_PASS_CANDIDATES = 8
+
+
+def _padded(key: str) -> str:
+    """Clé encadrée d'espaces, espaces internes fusionnés (début et fin de mot ont leurs trigrammes)"""
+    return f" {' '.join(key.split())} "
+
+
+def term_trigrams(key: str) -> Set[str]:
+    """Ensemble des trigrammes de caractères d'une clé normalisée"""
+    padded = _padded(key)
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _trigram_id(trigram: str) -> int:
+    # Trois points de code Unicode (21 bits chacun) dans un entier signé 64 bits
+    return (ord(trigram[0]) << 42) | (ord(trigram[1]) << 21) | ord(trigram[2])
+
+
+def pack_trigram_sections(keys: Sequence[str]) -> Dict[str, Tuple[str, bytes]]:
+    """
+    Construire l'index inversé trigramme -> clés
+
+    Les clés y sont renumérotées par nombre de trigrammes croissant : chaque liste
+    est ainsi triée par taille de clé, et le filtre de longueur de la recherche
+    se résume à une recherche dichotomique dans chaque liste.
+
+    Sections :
+        trigram_ids       'q'  identifiants des trigrammes, triés
+        trigram_offsets   'I'  début de la liste de chaque trigramme dans trigram_postings
+        trigram_postings  'I'  numéros (dans l'ordre des tailles) des clés contenant le trigramme
+        trigram_keys      'I'  rang dans la table des clés de chaque numéro
+        trigram_counts    'H'  nombre de trigrammes distincts de chaque numéro (croissant)
+
+    Args:
+        keys: Clés normalisées, dans l'ordre de la table des clés de l'index
+    """
+    # Les trigrammes sont recalculés au second passage plutôt que conservés (mémoire)
+    gram_counts = [len(term_trigrams(key)) for key in keys]
+    order = sorted(range(len(keys)), key=gram_counts.__getitem__)
+
+    postings: Dict[int, array] = {}
+    doc_counts = array('H')
+    for doc, ordinal in enumerate(order):
+        grams = term_trigrams(keys[ordinal])
+        doc_counts.append(min(len(grams), 0xFFFF))
+        for gram in grams:
+            ident = _trigram_id(gram)
+            bucket = postings.get(ident)
+            if bucket is None:
+                bucket = postings[ident] = array('I')
+            bucket.append(doc)
+
+    trigram_ids = array('q', sorted(postings))
+    offsets = array('I', [0])
+    flat = array('I')
+    for ident in trigram_ids:
+        flat.extend(postings[ident])
+        offsets.append(len(flat))
+
+    return {
+        "trigram_ids": ('q', trigram_ids.tobytes()),
+        "trigram_offsets": ('I', offsets.tobytes()),
+        "trigram_postings": ('I', flat.tobytes()),
+        "trigram_keys": ('I', array('I', order).tobytes()),
+        "trigram_counts": ('H', doc_counts.tobytes()),
+    }
+
+
+class TrigramIndex:
+    """Index inversé de trigrammes au-dessus des sections de l'index compilé"""
+
+    def __init__(self, sections: Dict[str, memoryview], keys):
+        self.ids = sections["trigram_ids"]
+        self.offsets = sections["trigram_offsets"]
+        self.postings = sections["trigram_postings"]
+        self.doc_keys = sections["trigram_keys"]
+        self.doc_counts = sections["trigram_counts"]
+        self.keys = keys  # Table des clés (décodée uniquement pour les candidats)
+
+    def _posting_range(self, gram: str) -> Tuple[int, int]:
+        ident = _trigram_id(gram)
+        i = bisect.bisect_left(self.ids, ident)
+        if i < len(self.ids) and self.ids[i] == ident:
+            return self.offsets[i], self.offsets[i + 1]
+        return 0, 0
+
+    def _doc_window(self, q: int, threshold: float) -> Tuple[int, int]:
+        """Numéros des clés dont la taille permet une similarité >= threshold"""
+        low = ceil(threshold * q - 1e-9)
+        high = int(q / threshold + 1e-9) if threshold > 0 else 0xFFFF
+        return (bisect.bisect_left(self.doc_counts, low),
+                bisect.bisect_right(self.doc_counts, high))
+
+    def _count(self, counts: Counter, posting_range: Tuple[int, int], window: Tuple[int, int]) -> int:
+        """Ajouter aux compteurs les clés d'une liste comprises dans la fenêtre de tailles"""
+        start, end = posting_range
+        if end <= start:
+            return 0
+        start = bisect.bisect_left(self.postings, window[0], start, end)
+        end = bisect.bisect_left(self.postings, window[1], start, end)
+        counts.update(self.postings[start:end])
+        return end - start
+
+    def _verify(self, candidates, rest: List[str], q: int, threshold: float,
+                groups: Optional[Sequence[int]], limit: int) -> Tuple[Dict[int, Tuple[float, int]], float]:
+        """
+        Calculer le score exact des candidats, par recouvrement décroissant
+
+        Args:
+            candidates: [(numéro de la clé, trigrammes communs parmi les listes parcourues)]
+            rest: Trigrammes de la requête dont les listes n'ont pas été parcourues
+
+        Returns:
+            ({groupe: (score, rang de la clé)}, score minimal pour entrer dans le top-k)
+        """
+        best: Dict[int, Tuple[float, int]] = {}
+        for doc, shared in candidates:
+            # Borne supérieure : tous les trigrammes non parcourus présents, clé de taille minimale
+            if (shared + len(rest)) / q < threshold:
+                break
+            key_count = self.doc_counts[doc]
+            upper = min(shared + len(rest), key_count)
+            if upper / (q + key_count - upper) < threshold:
+                continue  # Même avec tous les trigrammes restants, la clé ne peut pas entrer
+            ordinal = self.doc_keys[doc]
+            if rest:
+                padded = _padded(self.keys.get(ordinal))
+                shared += sum(1 for gram in rest if gram in padded)
+            score = shared / (q + key_count - shared)
+            if score < threshold:
+                continue
+            group = groups[ordinal] if groups is not None else ordinal
+            if group not in best or score > best[group][0]:
+                best[group] = (score, ordinal)
+                if len(best) >= limit:
+                    threshold = max(threshold, sorted(s for s, _ in best.values())[-limit])
+        return best, threshold
+
+    def search(self, key: str, limit: int = 5, min_similarity: float = DEFAULT_MIN_SIMILARITY,
+               groups: Optional[Sequence[int]] = None) -> List[Tuple[int, float]]:
+        """
+        Clés les plus proches d'une clé normalisée (similarité de Jaccard des trigrammes)
+
+        Une clé de similarité >= s avec une requête de q trigrammes :
+          - a entre s * q et q / s trigrammes (filtre de longueur, appliqué par
+            recherche dichotomique dans chaque liste) ;
+          - partage au moins m = ceil(s * q) trigrammes avec la requête, donc au
+            moins un des q - m + 1 plus rares : seules leurs listes sont parcourues,
+            les trigrammes fréquents restants sont vérifiés sur les candidats.
+        Un premier passage sur les listes les plus rares fixe un score plancher
+        (k-ième meilleur score exact) qui resserre ces deux filtres ; le résultat
+        reste exact.
+
+        Args:
+            key: Clé normalisée (voir normalize_term_key)
+            limit: Nombre maximum de résultats
+            min_similarity: Similarité minimale (0-1)
+            groups: Groupe de chaque clé (rang du concept) : un seul résultat par groupe
+
+        Returns:
+            Liste [(rang de la clé, score)] par score décroissant
+        """
+        grams = term_trigrams(key)
+        q = len(grams)
+        if not q or limit <= 0:
+            return []
+
+        ranked = sorted(((self._posting_range(gram), gram) for gram in grams),
+                        key=lambda item: item[0][1] - item[0][0])
+
+        def probe_size(threshold: float) -> int:
+            return q - max(1, ceil(threshold * q - 1e-9)) + 1
+
+        # Premier passage : listes les plus rares par tranches de budget, jusqu'à ce que
+        # la vérification des candidats de plus fort recouvrement remplisse le top-k
+        counts = Counter()
+        window = self._doc_window(q, min_similarity)
+        probed, budget = 0, _PROBE_BUDGET
+        while True:
+            spent = 0
+            while probed < q and spent < budget:
+                spent += self._count(counts, ranked[probed][0], window)
+                probed += 1
+            budget *= 2
+            best, threshold = self._verify(counts.most_common(_FIRST_PASS_CANDIDATES * limit),
+                                           [gram for _, gram in ranked[probed:]],
+                                           q, min_similarity, groups, limit)
+            if len(best) >= limit or probed >= probe_size(min_similarity):
+                break
+
+        # Second passage : fenêtre de tailles et listes exigées par le score plancher,
+        # puis vérification des seuls candidats ayant le recouvrement minimal nécessaire
+        window = self._doc_window(q, threshold)
+        target = max(probed, probe_size(threshold))
+        for posting_range, _ in ranked[probed:target]:
+            self._count(counts, posting_range, window)
+        rest = [gram for _, gram in ranked[target:]]
+        min_shared = max(1, ceil(threshold * q - 1e-9) - len(rest))
+        low, high = window
+        candidates = [item for item in counts.items() if item[1] >= min_shared and low <= item[0] < high]
+        candidates.sort(key=itemgetter(1), reverse=True)
+        best, _ = self._verify(candidates, rest, q, threshold, groups, limit)
+
+        results = sorted(best.values(), key=lambda item: (-item[0], item[1]))[:limit]
+        return [(ordinal, score) for score, ordinal in results]
+
+
+# ---------------------------------------------------------------------------
+# Suppressions symétriques (SymSpell)
+# ---------------------------------------------------------------------------
+
+def _deletes(word: str, max_distance: int) -> Set[str]:
+    """Le mot et toutes ses variantes obtenues par au plus max_distance suppressions"""
+    variants = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))} - variants
+        variants |= frontier
+    return variants
+
+
+def _delete_id(variant: str) -> int:
+    # Empreinte stable entre processus (hash() est randomisé) ; une collision ne fait
+    # qu'ajouter des candidats, écartés par le calcul de distance
+    return int.from_bytes(hashlib.blake2b(variant.encode('utf-8'), digest_size=8).digest(),
+                          'little', signed=True)
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Distance de Damerau-Levenshtein restreinte (transposition de deux caractères adjacents = 1)
+
+    Returns:
+        La distance, ou max_distance + 1 dès qu'elle dépasse max_distance
+    """
+    if a == b:
+        return 0
+    # Les préfixes et suffixes communs ne changent pas la distance
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end_a, end_b = len(a), len(b)
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if not a or not b:
+        return max(len(a), len(b))
+
+    # Programmation dynamique limitée à la bande |i - j| <= max_distance
+    too_far = max_distance + 1
+    previous2: List[int] = []
+    previous = [j if j <= max_distance else too_far for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [too_far] * (len(b) + 1)
+        if i <= max_distance:
+            current[0] = i
+        row_min = current[0]
+        char = a[i - 1]
+        for j in range(max(1, i - max_distance), min(len(b), i + max_distance) + 1):
+            value = previous[j - 1] if char == b[j - 1] else previous[j - 1] + 1
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if i > 1 and j > 1 and char == b[j - 2] and a[i - 2] == b[j - 1] and previous2[j - 2] + 1 < value:
+                value = previous2[j - 2] + 1
+            if value > too_far:
+                value = too_far
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return too_far
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def pack_symspell_sections(keys: Sequence[str]) -> Dict[str, Tuple[str, bytes]]:
+    """
+    Construire le dictionnaire de suppressions symétriques des clés
+
+    Les suppressions (jusqu'à SYMSPELL_MAX_DISTANCE) ne sont générées que pour le
+    préfixe de SYMSPELL_PREFIX_LENGTH caractères, une seule fois par préfixe
+    distinct ; chaque préfixe renvoie à ses clés, triées par longueur.
+
+    Sections :
+        symspell_delete_ids       'q'  empreintes des variantes par suppression, triées
+        symspell_delete_offsets   'I'  début des préfixes de chaque variante
+        symspell_delete_prefixes  'I'  numéros des préfixes produisant la variante
+        symspell_prefix_offsets   'I'  début des clés de chaque préfixe
+        symspell_prefix_keys      'I'  rangs des clés, triées par longueur dans chaque préfixe
+        symspell_prefix_lengths   'H'  longueur (en caractères) de ces clés
+
+    Args:
+        keys: Clés normalisées, dans l'ordre de la table des clés de l'index
+    """
+    by_prefix: Dict[str, List[Tuple[int, int]]] = {}
+    for ordinal, key in enumerate(keys):
+        by_prefix.setdefault(key[:SYMSPELL_PREFIX_LENGTH], []).append((len(key), ordinal))
+
+    deletes: Dict[int, array] = {}
+    prefix_offsets = array('I', [0])
+    prefix_keys = array('I')
+    prefix_lengths = array('H')
+    for prefix_id, prefix in enumerate(sorted(by_prefix)):
+        for length, ordinal in sorted(by_prefix[prefix]):
+            prefix_keys.append(ordinal)
+            prefix_lengths.append(min(length, 0xFFFF))
+        prefix_offsets.append(len(prefix_keys))
+        for variant in _deletes(prefix, SYMSPELL_MAX_DISTANCE):
+            ident = _delete_id(variant)
+            bucket = deletes.get(ident)
+            if bucket is None:
+                bucket = deletes[ident] = array('I')
+            bucket.append(prefix_id)
+
+    delete_ids = array('q', sorted(deletes))
+    delete_offsets = array('I', [0])
+    delete_prefixes = array('I')
+    for ident in delete_ids:
+        delete_prefixes.extend(deletes[ident])
+        delete_offsets.append(len(delete_prefixes))
+
+    return {
+        "symspell_delete_ids": ('q', delete_ids.tobytes()),
+        "symspell_delete_offsets": ('I', delete_offsets.tobytes()),
+        "symspell_delete_prefixes": ('I', delete_prefixes.tobytes()),
+        "symspell_prefix_offsets": ('I', prefix_offsets.tobytes()),
+        "symspell_prefix_keys": ('I', prefix_keys.tobytes()),
+        "symspell_prefix_lengths": ('H', prefix_lengths.tobytes()),
+    }
+
+
+class DeleteIndex:
+    """Dictionnaire de suppressions symétriques au-dessus des sections de l'index compilé"""
+
+    def __init__(self, sections: Dict[str, memoryview], keys):
+        self.delete_ids = sections["symspell_delete_ids"]
+        self.delete_offsets = sections["symspell_delete_offsets"]
+        self.delete_prefixes = sections["symspell_delete_prefixes"]
+        self.prefix_offsets = sections["symspell_prefix_offsets"]
+        self.prefix_keys = sections["symspell_prefix_keys"]
+        self.prefix_lengths = sections["symspell_prefix_lengths"]
+        self.keys = keys
+
+    def lookup(self, key: str, max_distance: int = SYMSPELL_MAX_DISTANCE) -> List[Tuple[int, int]]:
+        """
+        Clés à une distance d'édition <= max_distance d'une clé normalisée
+
+        Les variantes par suppression du préfixe de la requête désignent les
+        préfixes candidats ; seules leurs clés de longueur compatible
+        (± max_distance) sont comparées caractère par caractère.
+
+        Returns:
+            Liste [(rang de la clé, distance)] par distance croissante
+        """
+        max_distance = max(0, min(max_distance, SYMSPELL_MAX_DISTANCE))
+        prefix_ids = set()
+        for variant in _deletes(key[:SYMSPELL_PREFIX_LENGTH], max_distance):
+            ident = _delete_id(variant)
+            i = bisect.bisect_left(self.delete_ids, ident)
+            if i < len(self.delete_ids) and self.delete_ids[i] == ident:
+                prefix_ids.update(self.delete_prefixes[self.delete_offsets[i]:self.delete_offsets[i + 1]])
+
+        matches = []
+        for prefix_id in prefix_ids:
+            start, end = self.prefix_offsets[prefix_id], self.prefix_offsets[prefix_id + 1]
+            start = bisect.bisect_left(self.prefix_lengths, len(key) - max_distance, start, end)
+            end = bisect.bisect_right(self.prefix_lengths, len(key) + max_distance, start, end)
+            for ordinal in self.prefix_keys[start:end]:
+                distance = edit_distance(key, self.keys.get(ordinal), max_distance)
+                if distance <= max_distance:
+                    matches.append((distance, ordinal))
+        matches.sort()
+        return [(ordinal, distance) for distance, ordinal in matches]
+
+
+# ---------------------------------------------------------------------------
+# Index de mots (BM25)
+# ---------------------------------------------------------------------------
+
+# Paramètres BM25 usuels (saturation de la fréquence, normalisation par la longueur)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Mots outils ignorés, sous leur forme repliée (voir fold_term) : "d'" et "l'" donnent "d" et "l"
+BM25_STOPWORDS = frozenset({
+    "a", "au", "aux", "d", "de", "des", "du", "en", "et", "l", "la", "le", "les",
+    "ou", "par", "pour", "sur", "un", "une",
+})
+
+
+def term_tokens(folded_key: str) -> List[str]:
+    """Mots significatifs d'une clé repliée (voir fold_term), mots outils exclus"""
+    return [token for token in folded_key.split() if token not in BM25_STOPWORDS]
+
+
+def _token_id(token: str) -> int:
+    # Même empreinte stable que les suppressions SymSpell
+    return _delete_id(token)
+
+
+def pack_bm25_sections(folded_keys: Sequence[str]) -> Dict[str, Tuple[str, bytes]]:
+    """
+    Construire l'index inversé mot -> clés pour le classement BM25
+
+    Sections :
+        bm25_token_ids     'q'  empreintes des mots, triées
+        bm25_offsets       'I'  début de la liste de chaque mot dans bm25_postings
+        bm25_postings      'I'  rangs (croissants) des clés contenant le mot
+        bm25_frequencies   'B'  nombre d'occurrences du mot dans chaque clé
+        bm25_lengths       'H'  nombre de mots significatifs de chaque clé
+        bm25_stats         'd'  [longueur moyenne des clés]
+
+    Args:
+        folded_keys: Clés repliées, dans l'ordre de la table des clés de l'index
+    """
+    postings: Dict[int, array] = {}
+    frequencies: Dict[int, array] = {}
+    lengths = array('H')
+    for ordinal, folded in enumerate(folded_keys):
+        tokens = term_tokens(folded)
+        lengths.append(min(len(tokens), 0xFFFF))
+        for token, count in Counter(tokens).items():
+            ident = _token_id(token)
+            bucket = postings.get(ident)
+            if bucket is None:
+                bucket = postings[ident] = array('I')
+                frequencies[ident] = array('B')
+            bucket.append(ordinal)
+            frequencies[ident].append(min(count, 0xFF))
+
+    token_ids = array('q', sorted(postings))
+    offsets = array('I', [0])
+    flat = array('I')
+    flat_frequencies = array('B')
+    for ident in token_ids:
+        flat.extend(postings[ident])
+        flat_frequencies.extend(frequencies[ident])
+        offsets.append(len(flat))
+
+    average_length = sum(lengths) / len(lengths) if lengths else 0.0
+    return {
+        "bm25_token_ids": ('q', token_ids.tobytes()),
+        "bm25_offsets": ('I', offsets.tobytes()),
+        "bm25_postings": ('I', flat.tobytes()),
+        "bm25_frequencies": ('B', flat_frequencies.tobytes()),
+        "bm25_lengths": ('H', lengths.tobytes()),
+        "bm25_stats": ('d', array('d', [average_length]).tobytes()),
+    }
+
+
+class Bm25Index:
+    """Index inversé de mots (BM25) au-dessus des sections de l'index compilé"""
+
+    def __init__(self, sections: Dict[str, memoryview]):
+        self.token_ids = sections["bm25_token_ids"]
+        self.offsets = sections["bm25_offsets"]
+        self.postings = sections["bm25_postings"]
+        self.frequencies = sections["bm25_frequencies"]
+        self.lengths = sections["bm25_lengths"]
+        self.average_length = sections["bm25_stats"][0] or 1.0
+
+    def _token_weights(self, token: str) -> Tuple[float, List[Tuple[int, float]]]:
+        """IDF du mot et contribution BM25 de chaque clé qui le contient"""
+        ident = _token_id(token)
+        i = bisect.bisect_left(self.token_ids, ident)
+        start = end = 0
+        if i < len(self.token_ids) and self.token_ids[i] == ident:
+            start, end = self.offsets[i], self.offsets[i + 1]
+        count = len(self.lengths)
+        idf = log(1 + (count - (end - start) + 0.5) / (end - start + 0.5))
+
+        weights = []
+        norm = BM25_K1 / self.average_length
+        for doc, frequency in zip(self.postings[start:end], self.frequencies[start:end]):
+            saturation = frequency + BM25_K1 * (1 - BM25_B) + norm * BM25_B * self.lengths[doc]
+            weights.append((doc, idf * frequency * (BM25_K1 + 1) / saturation))
+        return idf, weights
+
+    def search(self, folded_key: str, limit: int = 5, groups: Optional[Sequence[int]] = None,
+               cache: Optional[Dict[str, Tuple[float, List[Tuple[int, float]]]]] = None
+               ) -> List[Tuple[int, float, float]]:
+        """
+        Clés classées par score BM25 pour une requête repliée (voir fold_term)
+
+        Chaque mot de la requête apporte idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * |clé| / moyenne)).
+        La couverture est la part de l'IDF total de la requête portée par les mots
+        présents dans la clé : 1.0 quand tous les mots significatifs y figurent.
+
+        Args:
+            folded_key: Requête repliée
+            limit: Nombre maximum de résultats
+            groups: Groupe de chaque clé (rang du concept) : un seul résultat par groupe
+            cache: Poids par mot partagés entre les requêtes d'un même lot (voir search_many)
+
+        Returns:
+            Liste [(rang de la clé, score, couverture)] par score décroissant
+        """
+        tokens = list(dict.fromkeys(term_tokens(folded_key)))
+        if not tokens or limit <= 0:
+            return []
+
+        scores: Dict[int, float] = {}
+        matched: Dict[int, float] = {}
+        total_idf = 0.0
+        for token in tokens:
+            if cache is not None and token in cache:
+                idf, weights = cache[token]
+            else:
+                idf, weights = self._token_weights(token)
+                if cache is not None:
+                    cache[token] = (idf, weights)
+            total_idf += idf
+            for doc, weight in weights:
+                scores[doc] = scores.get(doc, 0.0) + weight
+                matched[doc] = matched.get(doc, 0.0) + idf
+
+        best: Dict[int, Tuple[float, int]] = {}
+        for doc, score in scores.items():
+            group = groups[doc] if groups is not None else doc
+            if group not in best or (score, -doc) > (best[group][0], -best[group][1]):
+                best[group] = (score, doc)
+
+        results = sorted(best.values(), key=lambda item: (-item[0], item[1]))[:limit]
+        return [(doc, score, matched[doc] / total_idf) for score, doc in results]
+
+    def search_many(self, folded_keys: Sequence[str], limit: int = 5,
+                    groups: Optional[Sequence[int]] = None) -> List[List[Tuple[int, float, float]]]:
+        """
+        Classer plusieurs requêtes en un lot (termes d'une même extraction)
+
+        Les listes et poids des mots communs à plusieurs requêtes ne sont calculés
+        qu'une fois ; les requêtes identiques ne sont évaluées qu'une fois.
+
+        Returns:
+            Une liste de résultats (voir search) par requête, dans l'ordre des requêtes
+        """
+        cache: Dict[str, Tuple[float, List[Tuple[int, float]]]] = {}
+        results: Dict[str, List[Tuple[int, float, float]]] = {}
+        for folded in folded_keys:
+            if folded not in results:
+                results[folded] = self.search(folded, limit, groups, cache)
+        return [results[folded] for folded in folded_keys]
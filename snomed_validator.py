@@ -4,32 +4,65 @@ Validateur SNOMED CT utilisant la distribution officielle française
 Distribution: terminologie-snomed-ct-fr-Juin 2024 v1.0 (1)
 """
 
-import csv
-import os
-from typing import Dict, Set, Optional, Tuple
+from typing import Dict, List, Set, Optional, Sequence, Tuple
 from pathlib import Path
 
+from snomed_index import (TERM_FLAG_FSN, TERM_FLAG_PREFERRED, SNOMEDIndex, fold_term, load_snomed_index,
+                          normalize_term_key)
+from snomed_delta import apply_rf2_delta
+from snomed_scope import load_scoped_snomed_index, resolve_hierarchies
+from snomed_history import REDIRECT_KIND_NAMES
+from snomed_search import DEFAULT_MIN_SIMILARITY, SYMSPELL_MAX_DISTANCE
+
+# Modes de stockage des tables du validateur
+STORE_MMAP = "mmap"      # Recherches directement sur l'index mappé (pages partagées entre processus)
+STORE_PACKED = "packed"  # Mêmes tableaux compacts (SCTID int64 triés + blob de termes), en mémoire privée
+STORE_DICT = "dict"      # Tables recopiées dans des dict/set Python (mémoire privée par processus)
+STORES = (STORE_MMAP, STORE_PACKED, STORE_DICT)
+
+# Statuts d'un code SNOMED CT (voir code_status)
+CODE_VALID = "VALID"
+CODE_INVALID = "INVALID"
+CODE_OUT_OF_SCOPE = "OUT_OF_SCOPE"  # Concept (ou remplaçant d'un concept inactif) hors des hiérarchies d'un index allégé
+
 class SNOMEDValidator:
     """Validateur de codes SNOMED CT basé sur la distribution officielle française"""
     
-    def __init__(self, snomed_data_path: Optional[str] = None):
+    def __init__(self, snomed_data_path: Optional[str] = None, store: str = STORE_MMAP,
+                 hierarchies: Optional[List[str]] = None):
         """
         Initialiser le validateur
         
         Args:
-            snomed_data_path: Chemin vers le dossier contenant les fichiers SNOMED CT Snapshot.
+            snomed_data_path: Chemin vers le dossier contenant les fichiers SNOMED CT Snapshot,
+                              ou vers l'archive ZIP officielle de la release (lue sans décompression).
                               Si None, utilise le chemin par défaut 'data/snomed_fr' dans le projet.
+            store: "mmap" (défaut) pour interroger directement l'index mappé en mémoire,
+                   partagé entre tous les workers d'une même machine ; "packed" pour les
+                   mêmes tableaux compacts chargés en mémoire privée ; "dict" pour recopier
+                   les tables dans des dict/set Python (voir benchmark_snomed_store.py).
+            hierarchies: Hiérarchies de premier niveau à conserver (ex: ["Clinical finding",
+                         "Procedure"]) pour charger un index allégé (voir snomed_scope.py) ;
+                         les autres codes sont signalés hors périmètre. Si None, index complet.
         """
+        if store not in STORES:
+            raise ValueError(f"Mode de stockage inconnu : {store}")
+        self.store = store
+        self.hierarchies = resolve_hierarchies(hierarchies) if hierarchies else None
+
         if snomed_data_path is None:
             # Chemin par défaut vers le dossier de données SNOMED CT dans le projet
             self.snapshot_path = Path("data/snomed_fr") 
         else:
             self.snapshot_path = Path(snomed_data_path)
         
-        # Dictionnaires pour stocker les données chargées
+        # Index compilé (mmap ou tampon privé) et, en mode "dict" uniquement, ses tables recopiées
+        self.index: Optional[SNOMEDIndex] = None
         self.valid_concepts: Set[str] = set()  # SCTID valides
+        self.out_of_scope: Set[str] = set()  # SCTID exclus de l'index allégé (voir filter_tables)
+        self.redirects: Dict[str, Tuple[str, str]] = {}  # SCTID inactif -> (SCTID actif, association)
         self.french_terms: Dict[str, str] = {}  # SCTID -> terme français préféré
-        self.term_to_code: Dict[str, str] = {}  # terme_lower -> SCTID
+        self.term_to_code: Dict[str, List[Tuple[str, int]]] = {}  # terme_lower -> [(SCTID, drapeaux)]
         
         # Flag pour savoir si les données sont chargées
         self._loaded = False
@@ -45,7 +78,12 @@ class SNOMEDValidator:
         return None
     
     def load_snomed_data(self) -> bool:
-        """Charger les données SNOMED CT depuis les fichiers officiels"""
+        """
+        Charger les données SNOMED CT depuis l'index compilé
+
+        L'index binaire (voir snomed_index.py) est reconstruit automatiquement
+        depuis les fichiers RF2 officiels s'il est absent ou périmé.
+        """
         if self._loaded:
             return True
         
@@ -55,80 +93,64 @@ class SNOMEDValidator:
         
         print(f"🔍 Chargement des données SNOMED CT depuis {self.snapshot_path}...")
         
-        # Charger les concepts valides
-        concepts_loaded = self._load_concepts()
-        if not concepts_loaded:
+        try:
+            if self.hierarchies:
+                index = load_scoped_snomed_index(self.snapshot_path, self.hierarchies,
+                                                 use_mmap=(self.store == STORE_MMAP))
+            else:
+                index = load_snomed_index(self.snapshot_path, use_mmap=(self.store == STORE_MMAP))
+        except Exception as e:
+            print(f"❌ Erreur lors du chargement de l'index SNOMED CT : {e}")
             return False
-        
-        # Charger les descriptions françaises
-        descriptions_loaded = self._load_french_descriptions()
-        if not descriptions_loaded:
+        if index is None:
             return False
         
+        self.index = index
+        if self.store == STORE_DICT:
+            self.valid_concepts = set(index.iter_concepts())
+            self.french_terms = dict(index.iter_french_terms())
+            self.term_to_code = dict(index.iter_term_codes())
+            self.out_of_scope = {str(sctid) for sctid in index.out_of_scope_ids}
+            self.redirects = {source: (target, REDIRECT_KIND_NAMES[kind])
+                              for source, (target, kind) in index.iter_redirects()}
+        
         self._loaded = True
-        print(f"✅ Données SNOMED CT chargées : {len(self.valid_concepts)} concepts, {len(self.french_terms)} termes français")
+        counts = index.meta["counts"]
+        print(f"✅ Données SNOMED CT chargées ({self.store}) : {counts['concepts']} concepts, {counts['french_terms']} termes français")
         return True
     
-    def _load_concepts(self) -> bool:
-        """Charger la liste des concepts valides (actifs)"""
-        try:
-            # Trouver le fichier de concepts
-            concept_files = list(self.snapshot_path.glob("sct2_Concept_Snapshot_*.txt"))
-            if not concept_files:
-                print("❌ Fichier de concepts non trouvé")
-                return False
-            
-            concept_file = concept_files[0]
-            print(f"📄 Chargement des concepts depuis {concept_file.name}")
-            
-            with open(concept_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f, delimiter='\t')
-                for row in reader:
-                    if row['active'] == '1':  # Concepts actifs uniquement
-                        self.valid_concepts.add(row['id'])
-            
-            print(f"✅ {len(self.valid_concepts)} concepts actifs chargés")
-            return True
-            
-        except Exception as e:
-            print(f"❌ Erreur lors du chargement des concepts : {e}")
-            return False
-    
-    def _load_french_descriptions(self) -> bool:
-        """Charger les descriptions françaises UNIQUEMENT pour les concepts actifs"""
-        try:
-            # Trouver le fichier de descriptions françaises
-            desc_files = list(self.snapshot_path.glob("sct2_Description_Snapshot-fr_*.txt"))
-            if not desc_files:
-                print("❌ Fichier de descriptions françaises non trouvé")
-                return False
-            
-            desc_file = desc_files[0]
-            print(f"📄 Chargement des descriptions françaises depuis {desc_file.name}")
-            
-            with open(desc_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f, delimiter='\t')
-                for row in reader:
-                    if row['active'] == '1' and row['languageCode'] == 'fr':
-                        concept_id = row['conceptId']
-                        term = row['term']
-                        
-                        # CORRECTION : Ne charger que les termes avec codes ACTIFS
-                        if concept_id in self.valid_concepts:
-                            # Stocker TOUS les termes pour chaque concept actif (pas seulement le premier)
-                            if concept_id not in self.french_terms:
-                                self.french_terms[concept_id] = term  # Terme principal pour get_french_term
-                            
-                            # IMPORTANT : Charger TOUS les termes dans term_to_code
-                            self.term_to_code[term.lower().strip()] = concept_id
-            
-            print(f"✅ {len(self.french_terms)} termes français chargés")
-            return True
-            
-        except Exception as e:
-            print(f"❌ Erreur lors du chargement des descriptions françaises : {e}")
+    def apply_delta(self, delta_path: str) -> bool:
+        """
+        Appliquer un paquet Delta RF2 (nouvelle édition) à l'index compilé puis le recharger
+
+        Args:
+            delta_path: Dossier ou archive ZIP contenant les fichiers sct2_*_Delta*
+
+        Returns:
+            True si la nouvelle révision de l'index est chargée
+        """
+        if not apply_rf2_delta(self.snapshot_path, delta_path):
             return False
-    
+        self.index = None
+        self._loaded = False
+        return self.load_snomed_data()
+
+    @property
+    def release_version(self) -> Optional[str]:
+        """
+        Version de la release chargée (None avant chargement) : édition et date du
+        fichier des descriptions, suivies de la révision de l'index si une Delta a été appliquée
+
+        Exemple : "fr_FR1000315_20240621" ou "fr_FR1000315_20240621 r2"
+        """
+        if self.index is None:
+            return None
+        meta = self.index.meta
+        name = meta.get("fingerprint", {}).get("descriptions", {}).get("name", "")
+        version = Path(name).stem.replace("sct2_Description_Snapshot-", "") or "inconnue"
+        revision = meta.get("revision", 0)
+        return f"{version} r{revision}" if revision else version
+
     def validate_code(self, sctid: str) -> bool:
         """
         Valider qu'un code SCTID existe et est actif
@@ -143,7 +165,105 @@ class SNOMEDValidator:
             if not self.load_snomed_data():
                 return False
         
-        return sctid in self.valid_concepts
+        return self._has_concept(sctid)
+
+    def validate_codes(self, sctids: Sequence[str]) -> List[bool]:
+        """
+        Valider tous les codes d'une extraction en un seul appel (codes répétés vérifiés une fois)
+
+        Args:
+            sctids: Les codes SNOMED CT à valider
+
+        Returns:
+            Liste alignée sur sctids : True si le code est valide et actif
+        """
+        if not self._loaded:
+            if not self.load_snomed_data():
+                return [False] * len(sctids)
+
+        valid = {sctid: self._has_concept(sctid) for sctid in dict.fromkeys(sctids)}
+        return [valid[sctid] for sctid in sctids]
+
+    def resolve_active(self, sctid: str) -> Optional[str]:
+        """
+        Code actif correspondant à un code : lui-même s'il est actif, sinon son
+        remplaçant selon les associations historiques (REPLACED BY, SAME AS,
+        POSSIBLY EQUIVALENT TO), sans nouvel appel au LLM
+
+        Args:
+            sctid: Le code SNOMED CT (éventuellement inactivé)
+
+        Returns:
+            Le code SCTID actif ou None si le code est inconnu ou sans remplaçant
+        """
+        if not self._loaded:
+            if not self.load_snomed_data():
+                return None
+
+        return self._resolve_active(sctid)
+
+    def resolve_active_codes(self, sctids: Sequence[str]) -> List[Optional[str]]:
+        """
+        Codes actifs (voir resolve_active) de tous les codes d'une extraction en un seul appel
+
+        Returns:
+            Liste alignée sur sctids
+        """
+        if not self._loaded:
+            if not self.load_snomed_data():
+                return [None] * len(sctids)
+
+        active = {sctid: self._resolve_active(sctid) for sctid in dict.fromkeys(sctids)}
+        return [active[sctid] for sctid in sctids]
+
+    def get_redirect(self, sctid: str) -> Optional[Dict]:
+        """
+        Redirection d'un concept inactif
+
+        Returns:
+            {"code": SCTID actif, "association": "REPLACED BY" | "SAME AS" |
+            "POSSIBLY EQUIVALENT TO"} ou None si le code n'est pas redirigé
+        """
+        if not self._loaded:
+            if not self.load_snomed_data():
+                return None
+
+        redirect = self._redirect(sctid)
+        if redirect is None:
+            return None
+        return {"code": redirect[0], "association": redirect[1]}
+
+    def code_status(self, sctid: str) -> str:
+        """
+        Statut d'un code : "VALID", "INVALID", ou "OUT_OF_SCOPE" si le concept (ou le
+        remplaçant d'un concept inactif) est exclu de l'index allégé (il n'est alors ni
+        validé ni rejeté)
+
+        Args:
+            sctid: Le code SNOMED CT à vérifier
+
+        Returns:
+            CODE_VALID, CODE_INVALID ou CODE_OUT_OF_SCOPE
+        """
+        if not self._loaded:
+            if not self.load_snomed_data():
+                return CODE_INVALID
+
+        return self._code_status(sctid)
+
+    def code_statuses(self, sctids: Sequence[str]) -> List[str]:
+        """
+        Statut (voir code_status) de tous les codes d'une extraction en un seul appel
+
+        Returns:
+            Liste alignée sur sctids
+        """
+        if not self._loaded:
+            if not self.load_snomed_data():
+                return [CODE_INVALID] * len(sctids)
+
+        statuses = {sctid: self._code_status(sctid) for sctid in dict.fromkeys(sctids)}
+        return [statuses[sctid] for sctid in sctids]
     
     def get_french_term(self, sctid: str) -> Optional[str]:
         """
@@ -159,14 +279,107 @@ class SNOMEDValidator:
             if not self.load_snomed_data():
                 return None
         
-        return self.french_terms.get(sctid)
+        return self._french_term(sctid)
+
+    def get_french_terms(self, sctids: Sequence[str]) -> List[Optional[str]]:
+        """
+        Termes français officiels de tous les codes d'une extraction en un seul appel
+
+        Args:
+            sctids: Les codes SNOMED CT
+
+        Returns:
+            Liste alignée sur sctids (None pour un code inconnu)
+        """
+        if not self._loaded:
+            if not self.load_snomed_data():
+                return [None] * len(sctids)
+
+        terms = {sctid: self._french_term(sctid) for sctid in dict.fromkeys(sctids)}
+        return [terms[sctid] for sctid in sctids]
     
-    def find_code_by_term(self, term: str) -> Optional[str]:
+    def is_descendant_of(self, sctid: str, ancestor_sctid: str, include_self: bool = False) -> bool:
+        """
+        Vérifier qu'un concept appartient à la hiérarchie d'un autre (relations IS-A)
+
+        Utilise la fermeture transitive précalculée dans l'index compilé :
+        une recherche dichotomique dans la liste triée des ancêtres du concept.
+
+        Args:
+            sctid: Le code SNOMED CT à tester
+            ancestor_sctid: Le code de l'ancêtre supposé (ex: 404684003 Constatation clinique)
+            include_self: Considérer un concept comme descendant de lui-même
+
+        Returns:
+            True si ancestor_sctid est un ancêtre de sctid
+        """
+        if not self._loaded:
+            if not self.load_snomed_data():
+                return False
+
+        if include_self and sctid == ancestor_sctid and self.validate_code(sctid):
+            return True
+        return self.index.is_descendant_of(sctid, ancestor_sctid)
+
+    def get_parents(self, sctid: str) -> List[str]:
+        """
+        Obtenir les parents directs (IS-A) d'un concept actif
+
+        Args:
+            sctid: Le code SNOMED CT
+
+        Returns:
+            Liste des codes SCTID parents (vide si inconnu ou sans relation)
+        """
+        if not self._loaded:
+            if not self.load_snomed_data():
+                return []
+
+        return self.index.parents(sctid)
+
+    def get_ancestors(self, sctid: str) -> List[str]:
+        """
+        Obtenir tous les ancêtres (IS-A, fermeture transitive) d'un concept actif
+
+        Args:
+            sctid: Le code SNOMED CT
+
+        Returns:
+            Liste des codes SCTID ancêtres, la racine SNOMED CT comprise
+        """
+        if not self._loaded:
+            if not self.load_snomed_data():
+                return []
+
+        return self.index.ancestors(sctid)
+
+    def get_category(self, sctid: str) -> Optional[str]:
+        """
+        Obtenir la catégorie précalculée d'un concept actif
+
+        La catégorie vient de la hiérarchie de premier niveau du concept (à défaut,
+        du tag sémantique de son FSN) et se lit dans un tableau d'un octet par concept.
+
+        Args:
+            sctid: Le code SNOMED CT
+
+        Returns:
+            "Clinical finding", "Procedure", "Body structure"... ou None si inconnue
+        """
+        if not self._loaded:
+            if not self.load_snomed_data():
+                return None
+
+        return self.index.category(sctid)
+
+    def find_code_by_term(self, term: str, category: Optional[str] = None) -> Optional[str]:
         """
         Trouver un code SCTID à partir d'un terme français
         
         Args:
             term: Le terme français à rechercher
+            category: Catégorie attendue (voir get_category) pour départager les
+                      concepts qui partagent la même description
             
         Returns:
             Le code SCTID correspondant ou None si non trouvé
@@ -175,15 +388,22 @@ class SNOMEDValidator:
             if not self.load_snomed_data():
                 return None
         
-        return self.term_to_code.get(term.lower().strip())
+        return self._lookup_term(term, category)
     
-    def find_exact_term_code(self, term: str) -> Optional[str]:
+    def find_exact_term_code(self, term: str, category: Optional[str] = None) -> Optional[str]:
         """
         Recherche EXACTE d'un terme dans la base SNOMED CT (priorité maximale)
         Ne retourne que des codes ACTIFS
         
+        La clé exacte (casse ignorée) est essayée d'abord, puis la clé repliée
+        (accents, ponctuation, espaces, pluriels : voir fold_term) si elle ne
+        désigne qu'un seul concept.
+        
         Args:
             term: Le terme exact à rechercher
+            category: Catégorie attendue ("Clinical finding", "Procedure"...) : si
+                      plusieurs concepts partagent la description, celui de cette
+                      catégorie est retenu
             
         Returns:
             Le code SCTID du premier match exact trouvé ET ACTIF ou None
@@ -192,24 +412,298 @@ class SNOMEDValidator:
             if not self.load_snomed_data():
                 return None
         
-        # Recherche exacte (case-insensitive) dans notre dictionnaire
-        # term_to_code ne contient désormais que des codes actifs
-        normalized_term = term.lower().strip()
-        return self.term_to_code.get(normalized_term)
+        # Recherche exacte (case-insensitive) : l'index ne contient que des codes actifs
+        return self._lookup_term(term, category)
+
+    def find_exact_term_codes(self, terms: Sequence[str],
+                              categories: Optional[Sequence[Optional[str]]] = None) -> List[Optional[str]]:
+        """
+        Recherche exacte (voir find_exact_term_code) de tous les termes d'une extraction en un seul appel
+
+        Un terme répété avec la même catégorie n'est cherché qu'une fois.
+
+        Args:
+            terms: Les termes à rechercher
+            categories: Catégorie attendue de chaque terme (alignée sur terms), ou None
+
+        Returns:
+            Liste alignée sur terms : code SCTID actif ou None
+        """
+        if categories is None:
+            categories = [None] * len(terms)
+        if not self._loaded:
+            if not self.load_snomed_data():
+                return [None] * len(terms)
+
+        pairs = list(zip(terms, categories))
+        codes = {pair: self._lookup_term(*pair) for pair in dict.fromkeys(pairs)}
+        return [codes[pair] for pair in pairs]
+    
+    def find_exact_term_candidates(self, term: str, category: Optional[str] = None) -> List[Dict]:
+        """
+        Tous les concepts dont une description est exactement le terme (casse ignorée)
+        
+        Une même description française peut désigner plusieurs concepts actifs
+        (ex: un trouble et la constatation correspondante).
+        
+        Args:
+            term: Le terme exact à rechercher
+            category: Catégorie attendue : les concepts de cette catégorie passent en tête
+            
+        Returns:
+            Liste de {"code", "term", "preferred", "fsn", "category"}, terme principal
+            d'abord, FSN en dernier
+        """
+        if not self._loaded:
+            if not self.load_snomed_data():
+                return []
+        
+        codes = self._lookup_term_codes(normalize_term_key(term))
+        candidates = [
+            {
+                "code": code,
+                "term": self.get_french_term(code),
+                "preferred": bool(flags & TERM_FLAG_PREFERRED),
+                "fsn": bool(flags & TERM_FLAG_FSN),
+                "category": self.index.category(code)
+            }
+            for code, flags in codes
+        ]
+        if category:
+            candidates.sort(key=lambda candidate: candidate["category"] != category)
+        return candidates
+    
+    def find_folded_term_codes(self, term: str) -> List[str]:
+        """
+        Codes de toutes les descriptions égales au terme une fois replié
+        
+        "eruption cutanee", "éruption  cutanée" et "Éruptions-cutanées" ont la même
+        clé repliée que la description officielle "Éruption cutanée".
+        
+        Args:
+            term: Le terme à rechercher
+            
+        Returns:
+            Liste des codes SCTID (vide si aucune description ne correspond)
+        """
+        if not self._loaded:
+            if not self.load_snomed_data():
+                return []
+        
+        return self.index.codes_for_folded_key(fold_term(term))
+    
+    def _has_concept(self, sctid: str) -> bool:
+        if self.store == STORE_DICT:
+            return sctid in self.valid_concepts
+        return self.index.has_concept(sctid)
+
+    def _french_term(self, sctid: str) -> Optional[str]:
+        if self.store == STORE_DICT:
+            return self.french_terms.get(sctid)
+        return self.index.french_term(sctid)
+
+    def _redirect(self, sctid: str) -> Optional[Tuple[str, str]]:
+        if self.store == STORE_DICT:
+            return self.redirects.get(sctid)
+        return self.index.redirect(sctid)
+
+    def _resolve_active(self, sctid: str) -> Optional[str]:
+        if self._has_concept(sctid):
+            return sctid
+        redirect = self._redirect(sctid)
+        return redirect[0] if redirect else None
+
+    def _code_status(self, sctid: str) -> str:
+        if self._has_concept(sctid):
+            return CODE_VALID
+        if self.store == STORE_DICT:
+            out_of_scope = sctid in self.out_of_scope
+        else:
+            out_of_scope = self.index.is_out_of_scope(sctid)
+        return CODE_OUT_OF_SCOPE if out_of_scope else CODE_INVALID
+
+    def _lookup_term(self, term: str, category: Optional[str] = None) -> Optional[str]:
+        """Clé exacte puis clé repliée (uniquement si elle ne désigne qu'un concept de la catégorie)"""
+        codes = self._rank_by_category([code for code, _ in self._lookup_term_codes(normalize_term_key(term))],
+                                       category)
+        if codes:
+            return codes[0]
+        codes = self.index.codes_for_folded_key(fold_term(term))
+        if category and len(codes) > 1:
+            codes = [code for code in codes if self.index.category(code) == category] or codes
+        return codes[0] if len(codes) == 1 else None
+    
+    def _lookup_term_codes(self, key: str) -> List[Tuple[str, int]]:
+        """Recherche d'une clé normalisée dans la table terme -> [(SCTID, drapeaux)]"""
+        if self.store == STORE_DICT:
+            return self.term_to_code.get(key, [])
+        return self.index.codes_for_key(key)
+    
+    def _rank_by_category(self, codes: List[str], category: Optional[str]) -> List[str]:
+        """Concepts de la catégorie attendue en tête (ordre conservé sinon)"""
+        if not category or len(codes) < 2:
+            return codes
+        return sorted(codes, key=lambda code: self.index.category(code) != category)
+    
+    def find_near_exact_terms(self, term: str, max_distance: int = SYMSPELL_MAX_DISTANCE,
+                              limit: int = 5) -> List[Dict]:
+        """
+        Recherche tolérante aux fautes de frappe (distance d'édition 1 à 2)
+        
+        Utilise le dictionnaire de suppressions symétriques (SymSpell) compilé avec
+        les autres tables : accents, pluriels, traits d'union ou lettres inversées
+        qui séparent le terme d'une description officielle.
+        
+        Args:
+            term: Le terme à rechercher
+            max_distance: Distance d'édition maximale (0 à 2)
+            limit: Nombre maximum de concepts retournés
+            
+        Returns:
+            Liste de {"code", "term", "matched_term", "distance"} par distance croissante
+        """
+        if not self._loaded:
+            if not self.load_snomed_data():
+                return []
+        
+        return [
+            {
+                "code": code,
+                "term": self.get_french_term(code),
+                "matched_term": key,
+                "distance": distance
+            }
+            for key, code, distance in self.index.near_keys(normalize_term_key(term), max_distance)[:limit]
+        ]
     
-    def find_closest_code(self, term: str) -> Optional[str]:
+    def find_similar_terms(self, term: str, limit: int = 5,
+                           min_similarity: float = DEFAULT_MIN_SIMILARITY) -> List[Dict]:
+        """
+        Recherche approximative des concepts dont une description française est proche du terme
+        
+        Utilise l'index de trigrammes compilé avec les autres tables (voir snomed_search.py) :
+        tolère les variantes orthographiques, coquilles et mots manquants.
+        
+        Args:
+            term: Le terme à rechercher
+            limit: Nombre maximum de concepts retournés
+            min_similarity: Similarité minimale (0-1) pour retenir un candidat
+            
+        Returns:
+            Liste de {"code", "term", "matched_term", "score"} par score décroissant
+        """
+        if not self._loaded:
+            if not self.load_snomed_data():
+                return []
+        
+        return [
+            {
+                "code": code,
+                "term": self.get_french_term(code),
+                "matched_term": key,
+                "score": score
+            }
+            for key, code, score in self.index.similar_keys(normalize_term_key(term), limit, min_similarity)
+        ]
+    
+    def find_ranked_terms(self, term: str, limit: int = 5) -> List[Dict]:
+        """
+        Concepts classés par score BM25 sur les mots du terme
+
+        Adapté aux termes de plusieurs mots ("antihistaminique par voie orale") que ni
+        la recherche exacte ni la similarité de caractères ne retrouvent : les mots
+        rares pèsent plus que les mots fréquents ("structure", "maladie").
+
+        Args:
+            term: Le terme à rechercher
+            limit: Nombre maximum de concepts retournés
+
+        Returns:
+            Liste de {"code", "term", "matched_term", "score", "coverage"} par score décroissant
+            (coverage : part 0-1 du poids des mots du terme présente dans la description)
+        """
+        return self.find_ranked_terms_batch([term], limit).get(term, [])
+
+    def find_ranked_terms_batch(self, terms: List[str], limit: int = 5) -> Dict[str, List[Dict]]:
+        """
+        Classement BM25 de tous les termes d'une extraction en un seul lot
+
+        Les mots communs à plusieurs termes ne sont évalués qu'une fois.
+
+        Args:
+            terms: Les termes à rechercher
+            limit: Nombre maximum de concepts retournés par terme
+
+        Returns:
+            Dictionnaire {terme: liste de candidats (voir find_ranked_terms)}
+        """
+        if not self._loaded:
+            if not self.load_snomed_data():
+                return {}
+
+        terms = list(dict.fromkeys(terms))
+        batches = self.index.ranked_keys_many([normalize_term_key(term) for term in terms], limit)
+        return {
+            term: [
+                {
+                    "code": code,
+                    "term": self.get_french_term(code),
+                    "matched_term": key,
+                    "score": score,
+                    "coverage": coverage
+                }
+                for key, code, score, coverage in hits
+            ]
+            for term, hits in zip(terms, batches)
+        }
+
+    def autocomplete(self, prefix: str, limit: int = 10) -> List[Dict]:
+        """
+        Complétions d'un début de terme français, pour une recherche interactive
+
+        Recherche par préfixe sur les descriptions normalisées de l'index (deux
+        recherches dichotomiques) : quelques dizaines de µs par frappe.
+
+        Args:
+            prefix: Début du terme saisi (casse, accents et ponctuation ignorés)
+            limit: Nombre maximum de concepts retournés
+
+        Returns:
+            Liste de {"code", "term", "matched_term"} (un concept par entrée),
+            termes préférés et courts d'abord
+        """
+        if not self._loaded:
+            if not self.load_snomed_data():
+                return []
+
+        results = []
+        seen = set()
+        for key, code in self.index.complete_keys(prefix, limit * 2):
+            if code in seen:
+                continue
+            seen.add(code)
+            results.append({"code": code, "term": self._french_term(code), "matched_term": key})
+            if len(results) == limit:
+                break
+        return results
+
+    def find_closest_code(self, term: str, min_similarity: float = DEFAULT_MIN_SIMILARITY) -> Optional[str]:
         """
         Méthode de fallback pour recherche approximative si exact match échoue
         
         Args:
             term: Le terme à rechercher
+            min_similarity: Similarité minimale (0-1) de la recherche approximative
             
         Returns:
             Le code SCTID le plus proche ou None
         """
-        # Pour l'instant, utilise la même logique que find_code_by_term
-        # Peut être amélioré avec fuzzy matching si nécessaire
-        return self.find_code_by_term(term)
+        exact_code = self.find_code_by_term(term)
+        if exact_code:
+            return exact_code
+        
+        matches = self.find_similar_terms(term, limit=1, min_similarity=min_similarity)
+        return matches[0]["code"] if matches else None
     
     def validate_extraction_result(self, extraction_result) -> Dict:
         """
@@ -230,6 +724,7 @@ class SNOMEDValidator:
             "valid_codes": 0,
             "invalid_codes": 0,
             "unknown_codes": 0,
+            "out_of_scope_codes": 0,
             "validation_details": []
         }
         
@@ -240,28 +735,31 @@ class SNOMEDValidator:
             extraction_result.body_structures
         )
         
-        for item in all_items:
-            if hasattr(item, 'snomed_code') and item.snomed_code:
-                stats["total_codes"] += 1
-                
-                if item.snomed_code == "UNKNOWN":
-                    stats["unknown_codes"] += 1
-                    status = "UNKNOWN"
-                elif self.validate_code(item.snomed_code):
-                    stats["valid_codes"] += 1
-                    status = "VALID"
-                    official_term = self.get_french_term(item.snomed_code)
-                else:
-                    stats["invalid_codes"] += 1
-                    status = "INVALID"
-                    official_term = None
-                
-                stats["validation_details"].append({
-                    "term": item.term,
-                    "gemini_code": item.snomed_code,
-                    "status": status,
-                    "official_term": official_term if status == "VALID" else None
-                })
+        items = [item for item in all_items if getattr(item, 'snomed_code', None)]
+        codes = [item.snomed_code for item in items]
+        # Un seul passage sur l'index pour toute l'extraction
+        statuses = self.code_statuses(codes)
+        official_terms = self.get_french_terms(codes)
+        
+        for item, status, official_term in zip(items, statuses, official_terms):
+            stats["total_codes"] += 1
+            
+            if item.snomed_code == "UNKNOWN":
+                stats["unknown_codes"] += 1
+                status = "UNKNOWN"
+            elif status == CODE_VALID:
+                stats["valid_codes"] += 1
+            elif status == CODE_OUT_OF_SCOPE:
+                stats["out_of_scope_codes"] += 1
+            else:
+                stats["invalid_codes"] += 1
+            
+            stats["validation_details"].append({
+                "term": item.term,
+                "gemini_code": item.snomed_code,
+                "status": status,
+                "official_term": official_term if status == CODE_VALID else None
+            })
         
         return stats
 
@@ -18,7 +18,8 @@ st.set_page_config(
 # Imports spécifiques au projet - en tête pour éviter les problèmes Streamlit
 try:
     from snomed_extractor import SNOMEDExtractor
-    from snomed_validator import SNOMEDValidator
+    from snomed_release import get_snomed_release
+    from config import Config
     from models import MedicalNote
     IMPORTS_OK = True
 except ImportError as e:
@@ -102,6 +103,44 @@ def get_demo_results():
         }
     ]
 
+def get_active_validator():
+    """Validateur de la release SNOMED CT active, partagé par toutes les sessions"""
+    release = get_snomed_release(hierarchies=Config.SNOMED_HIERARCHIES)
+    release.refresh()
+    return release.validator
+
+@st.cache_resource(ttl=60)
+def get_search_validator():
+    """Validateur partagé par toutes les sessions pour la recherche (release active relue chaque minute)"""
+    return get_active_validator()
+
+# Longueur minimale du début de terme avant d'interroger l'index
+SEARCH_MIN_CHARS = 3
+
+def render_terminology_search():
+    """Recherche interactive d'un concept SNOMED CT par début de terme français"""
+    with st.expander("🔎 Rechercher un concept SNOMED CT"):
+        prefix = st.text_input(
+            "Début du terme français :",
+            key="snomed_search_prefix",
+            placeholder="ex : douleur thor, appendic, fracture du f..."
+        )
+        if 0 < len(prefix.strip()) < SEARCH_MIN_CHARS:
+            st.caption(f"Saisissez au moins {SEARCH_MIN_CHARS} caractères")
+        elif prefix.strip():
+            completions = get_search_validator().autocomplete(prefix, limit=10)
+            if completions:
+                st.dataframe(
+                    pd.DataFrame([
+                        {"Code SNOMED": c["code"], "Terme officiel": c["term"], "Description trouvée": c["matched_term"]}
+                        for c in completions
+                    ]),
+                    hide_index=True,
+                    use_container_width=True
+                )
+            else:
+                st.info("Aucun concept ne commence par ce terme")
+
 def main():
     # CSS personnalisé pour un design plus moderne
     st.markdown("""
@@ -551,6 +590,8 @@ def main():
         """)
         return
     
+    render_terminology_search()
+    
     # Test API Key
     try:
         api_key = st.secrets.get("GEMINI_API_KEY")
@@ -794,7 +835,9 @@ Traitement symptomatique en attente des résultats.""",
                                 original_note=medical_note,
                                 clinical_findings=findings,
                                 procedures=procedures,
-                                body_structures=body_structures
+                                body_structures=body_structures,
+                                snomed_release=result_v2.get('snomed_release'),
+                                gemini_cache=result_v2.get('statistics', {}).get('gemini_cache')
                             )
                         elif fusion_mode:
                             # Mode ULTIME V1 : fusion de 3 extractions + validation SNOMED
@@ -817,8 +860,13 @@ Traitement symptomatique en attente des résultats.""",
                             return
                         
                         if result and (result.clinical_findings or result.procedures or result.body_structures):
-                            # Validation complète avec SNOMEDValidator
-                            validator = SNOMEDValidator()
+                            # Validation complète avec le validateur de la release active
+                            validator = get_active_validator()
+                            if result.snomed_release:
+                                st.caption(f"📚 Release SNOMED CT : {result.snomed_release}")
+                            if result.gemini_cache and result.gemini_cache.get("hits"):
+                                st.caption(f"💾 {result.gemini_cache['hits']} réponse(s) Gemini relue(s) dans le cache, "
+                                           f"{result.gemini_cache.get('misses', 0)} appel(s) envoyé(s)")
                             validation_stats = validator.validate_extraction_result(result)
                             
                             # Métriques globales - Seulement en mode développement
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Script de test de la boucle partagée des appels Gemini (gemini_async.py)
+
+Les appels au SDK sont simulés par des coroutines qui notent la boucle sur
+laquelle elles tournent et le nombre d'appels simultanés.
+"""
+
+import asyncio
+import tempfile
+import threading
+from pathlib import Path
+
+import gemini_async
+from api_security import APISecurityManager
+from gemini_async import gemini_call, gemini_loop, run_sync
+
+
+class _FakeCalls:
+    """Appels simulés : boucles utilisées, appels en cours et pic de concurrence"""
+
+    def __init__(self):
+        self.loops = set()
+        self.inflight = 0
+        self.peak = 0
+        self.cancelled = 0
+
+    async def call(self, value, delay=0.02):
+        self.loops.add(asyncio.get_running_loop())
+        self.inflight += 1
+        self.peak = max(self.peak, self.inflight)
+        try:
+            await asyncio.sleep(delay)
+            return value
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.inflight -= 1
+
+
+def test_bounded_concurrency():
+    """Des appels venus de plusieurs boucles tournent sur la boucle Gemini, sous MAX_CONCURRENCY"""
+    calls = _FakeCalls()
+    count = gemini_async.MAX_CONCURRENCY * 3
+    results = []
+
+    async def caller(offset):
+        return await asyncio.gather(*(gemini_call(calls.call(offset + i)) for i in range(count)))
+
+    threads = [threading.Thread(target=lambda offset=offset: results.extend(asyncio.run(caller(offset))))
+               for offset in (0, 1000)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == sorted(list(range(count)) + list(range(1000, 1000 + count)))
+    assert calls.loops == {gemini_loop()}
+    assert 1 < calls.peak <= gemini_async.MAX_CONCURRENCY
+
+
+def test_cancellation():
+    """Annuler l'appelant annule l'appel en cours sur la boucle Gemini"""
+    calls = _FakeCalls()
+
+    async def caller():
+        try:
+            await asyncio.wait_for(gemini_call(calls.call("trop tard", delay=5)), timeout=0.05)
+        except asyncio.TimeoutError:
+            return "annulé"
+
+    assert asyncio.run(caller()) == "annulé"
+    run_sync(asyncio.sleep(0.05))  # Laisser la boucle Gemini traiter l'annulation
+    assert calls.cancelled == 1 and calls.inflight == 0
+
+
+def test_run_sync():
+    """run_sync attend le résultat depuis du code synchrone, et refuse la boucle Gemini elle-même"""
+    calls = _FakeCalls()
+    assert run_sync(gemini_call(calls.call(42))) == 42
+
+    async def nested():
+        coroutine = asyncio.sleep(0)
+        try:
+            run_sync(coroutine)
+        except RuntimeError:
+            return True
+        finally:
+            coroutine.close()
+        return False
+
+    assert run_sync(nested())
+
+
+def test_budget_reservation():
+    """Des appels simultanés ne dépassent pas ensemble la limite ; un appel en échec rend sa réservation"""
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = APISecurityManager(daily_limit=100, hourly_limit=3)
+        manager.usage_file = Path(tmp) / "usage_tracking.json"
+        manager.usage_data = {}
+        calls = _FakeCalls()
+
+        async def guarded_call(value):
+            reservation, _ = manager.reserve_api_call(estimated_cost=0.02)
+            if reservation is None:
+                return None
+            return await gemini_call(calls.call(value))
+
+        async def caller():
+            return await asyncio.gather(*(guarded_call(i) for i in range(10)))
+
+        results = asyncio.run(caller())
+        assert sum(result is not None for result in results) == 3
+        assert manager.get_hourly_usage() == 3
+
+        manager.hourly_limit = 4
+        reservation, _ = manager.reserve_api_call(estimated_cost=0.02)
+        assert reservation is not None and manager.get_hourly_usage() == 4
+        manager.release_api_call(reservation)
+        assert manager.get_hourly_usage() == 3
+        assert abs(manager.get_usage_stats()["daily_cost"] - 0.06) < 1e-9
+
+
+if __name__ == "__main__":
+    tests = [test_bounded_concurrency, test_cancellation, test_run_sync, test_budget_reservation]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__} : {e}")
+    print(f"\n{'🎉 Tous les tests passent' if not failures else f'❌ {failures} test(s) en échec'}")
+    exit(1 if failures else 0)
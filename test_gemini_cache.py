@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Script de test du cache persistant des réponses Gemini (gemini_cache.py)
+"""
+
+import tempfile
+import time
+from pathlib import Path
+
+from gemini_cache import GeminiResponseCache
+
+
+def test_key():
+    """La clé dépend du modèle, de la configuration de génération, du prompt et du tirage"""
+    key = GeminiResponseCache.make_key("gemini", "prompt", {"temperature": 0.3})
+    assert key == GeminiResponseCache.make_key("gemini", "prompt", {"temperature": 0.3})
+    assert key != GeminiResponseCache.make_key("gemini", "prompt", {"temperature": 0.9})
+    assert key != GeminiResponseCache.make_key("gemini", "prompt", {"temperature": 0.3}, sample=1)
+    assert key != GeminiResponseCache.make_key("autre", "prompt", {"temperature": 0.3})
+    assert GeminiResponseCache.make_key("gemini", "prompt") == GeminiResponseCache.make_key("gemini", "prompt", {})
+
+
+def test_lru_eviction():
+    """Au-delà de max_bytes, la réponse la moins récemment lue est supprimée"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = GeminiResponseCache(str(Path(tmp) / "cache.sqlite3"), max_bytes=30)
+        for key in ("a", "b", "c"):
+            cache.put(key, "gemini", key * 10)
+            time.sleep(0.01)
+        assert cache.get("a") == "a" * 10  # "a" redevient la plus récente
+        time.sleep(0.01)
+        cache.put("d", "gemini", "d" * 10)
+
+        assert cache.get("b") is None
+        assert [cache.get(key) for key in ("a", "c", "d")] == ["a" * 10, "c" * 10, "d" * 10]
+        assert cache.get_stats() == {"entries": 3, "bytes": 30, "max_bytes": 30}
+
+        cache.put("e", "gemini", "e" * 31)  # Plus grande que le cache : ignorée
+        assert cache.get("e") is None and cache.get_stats()["entries"] == 3
+
+
+def test_ttl():
+    """Une réponse plus ancienne que ttl_seconds n'est plus servie"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = GeminiResponseCache(str(Path(tmp) / "cache.sqlite3"), max_bytes=1024, ttl_seconds=0.05)
+        cache.put("a", "gemini", "réponse")
+        assert cache.get("a") == "réponse"
+        time.sleep(0.1)
+        assert cache.get("a") is None
+        assert cache.get_stats()["entries"] == 0
+
+
+def test_disabled():
+    """Sans chemin, le cache ne conserve rien"""
+    cache = GeminiResponseCache(None, max_bytes=1024)
+    cache.put("a", "gemini", "réponse")
+    assert not cache.enabled and cache.get("a") is None
+
+
+if __name__ == "__main__":
+    tests = [test_key, test_lru_eviction, test_ttl, test_disabled]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__} : {e}")
+    print(f"\n{'🎉 Tous les tests passent' if not failures else f'❌ {failures} test(s) en échec'}")
+    exit(1 if failures else 0)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Script de test de l'application d'une Delta RF2 (snomed_delta.py)
+
+Le Snapshot synthétique de test_snomed_index.py est compilé puis mis à jour
+par de petits paquets Delta écrits dans des dossiers temporaires.
+"""
+
+import tempfile
+from pathlib import Path
+
+from snomed_delta import apply_rf2_delta
+from snomed_index import (FOLDED_SECTION_PREFIXES, HIERARCHY_SECTION_PREFIXES, SEARCH_SECTION_PREFIXES, SNOMEDIndex,
+                          _pack_sections, compile_snomed_index, index_path_for, tables_from_index)
+from test_snomed_index import SYNONYM, write_snapshot
+
+
+def write_delta(directory: Path, descriptions=(), relationships=(), concepts=()) -> Path:
+    """Écrire un paquet Delta RF2 (seuls les fichiers ayant des lignes sont créés)"""
+    directory.mkdir()
+    files = [
+        ("sct2_Concept_Delta_FR1000315_20250601.txt",
+         ["id", "effectiveTime", "active", "moduleId", "definitionStatusId"], concepts),
+        ("sct2_Description_Delta-fr_FR1000315_20250601.txt",
+         ["id", "effectiveTime", "active", "moduleId", "conceptId", "languageCode", "typeId", "term",
+          "caseSignificanceId"], descriptions),
+        ("sct2_Relationship_Delta_FR1000315_20250601.txt",
+         ["id", "effectiveTime", "active", "moduleId", "sourceId", "destinationId", "relationshipGroup",
+          "typeId", "characteristicTypeId", "modifierId"], relationships),
+    ]
+    for name, header, rows in files:
+        if rows:
+            with open(directory / name, "w", encoding="utf-8") as f:
+                f.write("\t".join(header) + "\n")
+                for row in rows:
+                    f.write("\t".join(row) + "\n")
+    return directory
+
+
+def test_apply_and_reapply():
+    """Une Delta est appliquée une fois ; la réappliquer ne réécrit pas l'index"""
+    with tempfile.TemporaryDirectory() as tmp:
+        (Path(tmp) / "snapshot").mkdir()
+        snapshot = write_snapshot(Path(tmp) / "snapshot")
+        delta = write_delta(Path(tmp) / "delta", descriptions=[
+            ("9", "20250601", "1", "m", "80146002", "fr", SYNONYM, "Exérèse de l'appendice", "c"),
+            ("8", "20250601", "0", "m", "80146002", "fr", SYNONYM, "Ablation de l'appendice", "c"),
+        ], concepts=[("71388002", "20250601", "0", "m", "d")])
+        assert compile_snomed_index(snapshot)
+        index_path = index_path_for(snapshot)
+
+        assert apply_rf2_delta(snapshot, delta)
+        index = SNOMEDIndex.load(index_path)
+        assert index.meta["revision"] == 1
+        changes = index.meta["deltas"][-1]["changes"]
+        assert changes["descriptions_added"] == 1 and changes["concepts_inactivated"] == 1
+        assert index.code_for_key("exérèse de l'appendice") == "80146002"
+        assert index.code_for_key("ablation de l'appendice") is None
+        assert not index.has_concept("71388002")
+        assert index.parents("80146002") == []  # Parent inactivé
+        assert index.french_term("80146002") == "Appendicectomie"
+
+        before = index_path.read_bytes()
+        assert apply_rf2_delta(snapshot, delta)
+        assert index_path.read_bytes() == before
+
+
+def _check_reused(index_path: Path, before: SNOMEDIndex, groups):
+    """Groupes repris par la dernière Delta : identiques à l'ancien index, et toutes les sections à une recompilation"""
+    index = SNOMEDIndex.load(index_path)
+    assert index.meta["deltas"][-1]["reused_sections"] == groups
+    repacked = _pack_sections(tables_from_index(index))
+    assert list(index.meta["sections"]) == list(repacked)
+    for name in repacked:
+        assert index._sections[name].tobytes() == repacked[name][1], name
+    prefixes = {"recherche": SEARCH_SECTION_PREFIXES, "clés repliées": FOLDED_SECTION_PREFIXES,
+                "hiérarchie": HIERARCHY_SECTION_PREFIXES}
+    for group in groups:
+        reused = index.copy_sections(prefixes[group])
+        assert reused and reused == before.copy_sections(prefixes[group]), group
+    return index
+
+
+def test_sections_reused():
+    """Seuls les groupes de sections touchés par une Delta sont recalculés, les autres sont repris"""
+    with tempfile.TemporaryDirectory() as tmp:
+        (Path(tmp) / "snapshot").mkdir()
+        snapshot = write_snapshot(Path(tmp) / "snapshot")
+        assert compile_snomed_index(snapshot)
+        index_path = index_path_for(snapshot)
+
+        # Relation IS-A retirée : mêmes clés et descriptions, hiérarchie recalculée
+        before = SNOMEDIndex.load(index_path)
+        assert apply_rf2_delta(snapshot, write_delta(Path(tmp) / "isa", relationships=[
+            ("3", "20250601", "0", "m", "80146002", "71388002", "0", "116680003", "c", "m"),
+        ]))
+        index = _check_reused(index_path, before, ["recherche", "clés repliées"])
+        assert index.parents("80146002") == []
+
+        # Synonyme ajouté : nouvelle clé, hiérarchie et catégories reprises
+        before = index
+        assert apply_rf2_delta(snapshot, write_delta(Path(tmp) / "synonyme", descriptions=[
+            ("9", "20250601", "1", "m", "38907003", "fr", SYNONYM, "Zona primaire", "c"),
+        ]))
+        index = _check_reused(index_path, before, ["hiérarchie"])
+        assert index.code_for_key("zona primaire") == "38907003"
+
+
+if __name__ == "__main__":
+    tests = [test_apply_and_reapply, test_sections_reused]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__} : {e}")
+    print(f"\n{'🎉 Tous les tests passent' if not failures else f'❌ {failures} test(s) en échec'}")
+    exit(1 if failures else 0)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Script de test du consensus et des prompts groupés de l'extracteur (snomed_extractor.py)
+
+Aucun appel à Gemini : les extractions sont simulées par des coroutines,
+l'extracteur est créé sans passer par __init__ (ni clé API ni modèle).
+"""
+
+import asyncio
+import json
+
+from config import Config
+from models import MedicalNote
+from snomed_extractor import SNOMEDExtractor
+
+
+def _extractor() -> SNOMEDExtractor:
+    return SNOMEDExtractor.__new__(SNOMEDExtractor)
+
+
+def _consensus(samples, min_samples=2, max_samples=3, delays=None):
+    """Lancer _sample_until_consensus sur des extractions simulées (codes de chaque rang)"""
+    started, cancelled = [], []
+    delays = delays or {}
+
+    async def run_sample(rank):
+        started.append(rank)
+        try:
+            await asyncio.sleep(delays.get(rank, 0.01 * rank))
+        except asyncio.CancelledError:
+            cancelled.append(rank)
+            raise
+        return samples[rank]
+
+    saved = (Config.CONSENSUS_MIN_SAMPLES, Config.CONSENSUS_MAX_SAMPLES)
+    Config.CONSENSUS_MIN_SAMPLES, Config.CONSENSUS_MAX_SAMPLES = min_samples, max_samples
+    try:
+        results, consensus = asyncio.run(_extractor()._sample_until_consensus(run_sample, set))
+    finally:
+        Config.CONSENSUS_MIN_SAMPLES, Config.CONSENSUS_MAX_SAMPLES = saved
+    return results, consensus, started, cancelled
+
+
+def test_consensus_early_stop():
+    """Deux extractions concordantes suffisent : la troisième n'est pas lancée"""
+    results, consensus, started, _ = _consensus([{"a", "b"}, {"a", "b"}, {"c"}])
+    assert started == [0, 1]
+    assert results == [{"a", "b"}, {"a", "b"}]
+    assert consensus == {"samples": 2, "max_samples": 3, "calls_saved": 1, "agreement": 1.0}
+
+
+def test_consensus_disagreement():
+    """Des extractions discordantes vont jusqu'à CONSENSUS_MAX_SAMPLES"""
+    results, consensus, started, _ = _consensus([{"a"}, {"b"}, {"c"}])
+    assert started == [0, 1, 2] and len(results) == 3
+    assert consensus["calls_saved"] == 0 and consensus["agreement"] == 0.0
+
+
+def test_consensus_empty_samples():
+    """Des extractions sans code validé ne comptent pas comme un accord"""
+    _, consensus, started, _ = _consensus([set(), set(), set()])
+    assert started == [0, 1, 2]
+    assert consensus["samples"] == 3 and consensus["agreement"] is None
+
+
+def test_consensus_cancels_pending():
+    """L'accord atteint, l'extraction encore en cours est annulée"""
+    results, consensus, started, cancelled = _consensus([{"a"}, {"a"}, {"a"}], min_samples=3,
+                                                        delays={0: 0.01, 1: 0.02, 2: 5})
+    assert started == [0, 1, 2] and cancelled == [2]
+    assert results == [{"a"}, {"a"}] and consensus["calls_saved"] == 1
+
+
+def test_parse_batch_response():
+    """Les cas mal formés sont écartés, les concepts nettoyés"""
+    response = "Voici le résultat :\n" + json.dumps({"cas": {
+        "N1": {"concepts_medicaux": [
+            {"concept": "varicelle", "categorie": "clinical_finding", "code_classification": 38907003},
+            {"concept": None}, "texte", {"concept": "prurit", "negation": None},
+        ]},
+        "N2": {"concepts_medicaux": "aucun"},
+        "N3": "illisible",
+        "N4": {"concepts_medicaux": []},
+    }})
+    cases = _extractor()._parse_batch_response(response)
+    assert cases == {
+        "N1": [{"concept": "varicelle", "categorie": "clinical_finding", "code_classification": "38907003"},
+               {"concept": "prurit"}],
+        "N4": [],
+    }
+    assert _extractor()._parse_batch_response("pas de JSON") == {}
+    assert _extractor()._parse_batch_response('{"cas": ["N1"]}') == {}
+    assert _extractor()._parse_batch_response("{invalide}") == {}
+
+
+def test_packed_fallback():
+    """Cas absent ou illisible : la note est extraite seule, les résultats restent dans l'ordre des notes
+    et portent tous la release de la requête"""
+    notes = [MedicalNote(patient_id=str(i), patient_name="", date="", doctor="", content=f"Note {i}", specialty="")
+             for i in range(4)]
+    extractor = _extractor()
+    singles = []
+
+    async def generate_text(prompt, **kwargs):
+        return json.dumps({"cas": {"N1": {"concepts_medicaux": []}, "N3": {"concepts_medicaux": []},
+                                   "N4": {"concepts_medicaux": [{"concept": "erreur"}]}}})
+
+    def build_extraction(note, concepts, cache_stats, snomed_release):
+        if concepts:
+            raise ValueError("cas illisible")
+        return ("groupé", note.patient_id, snomed_release)
+
+    async def extract_single(note, sample, snomed_release):
+        singles.append(note.patient_id)
+        return ("seul", note.patient_id, snomed_release)
+
+    extractor._generate_text_async = generate_text
+    extractor._build_extraction = build_extraction
+    extractor._extract_note_async = extract_single
+    extractor.create_batch_extraction_prompt = lambda cases: "\n".join(cases.values())
+
+    results = asyncio.run(extractor._extract_packed_notes(notes, "fr_FR1000315_20250101"))
+    assert results == [("groupé", "0", "fr_FR1000315_20250101"), ("seul", "1", "fr_FR1000315_20250101"),
+                       ("groupé", "2", "fr_FR1000315_20250101"), ("seul", "3", "fr_FR1000315_20250101")]
+    assert sorted(singles) == ["1", "3"]
+
+
+def test_pack_notes():
+    """Les lots respectent BATCH_MAX_NOTES et BATCH_MAX_PROMPT_TOKENS, dans l'ordre des notes"""
+    notes = [MedicalNote(patient_id=str(i), patient_name="", date="", doctor="",
+                         content="x" * (Config.BATCH_MAX_PROMPT_TOKENS * 4 if i == 7 else 40), specialty="")
+             for i in range(12)]
+    batches = _extractor()._pack_notes(notes)
+    assert [note for batch in batches for note in batch] == notes
+    assert all(len(batch) <= Config.BATCH_MAX_NOTES for batch in batches)
+    assert [notes[7]] in batches  # Note trop longue : seule dans son lot
+
+
+def test_blocked_semantic_validation():
+    """Un appel de validation bloqué signale les paires ambiguës comme bloquées, non rejetées"""
+    extractor = _extractor()
+    costs = []
+
+    async def blocked_call(prompt, sample=0, estimated_cost=None, cache_stats=None):
+        costs.append(estimated_cost)
+        return ""
+
+    extractor._generate_text_async = blocked_call
+    pairs = [("gêne thoracique", "thorax"), ("varicelle", "varicelle")]
+    results = asyncio.run(extractor._validate_semantic_coherence_batch(pairs))
+    assert costs and None not in costs
+    assert results[0]["blocked"] and not results[0]["valid"]
+    assert results[1]["valid"] and not results[1].get("blocked")
+
+
+if __name__ == "__main__":
+    tests = [test_consensus_early_stop, test_consensus_disagreement, test_consensus_empty_samples,
+             test_consensus_cancels_pending, test_parse_batch_response, test_packed_fallback, test_pack_notes,
+             test_blocked_semantic_validation]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__} : {e}")
+    print(f"\n{'🎉 Tous les tests passent' if not failures else f'❌ {failures} test(s) en échec'}")
+    exit(1 if failures else 0)
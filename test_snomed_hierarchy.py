@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Script de test de la hiérarchie IS-A compilée (snomed_hierarchy.py)
+"""
+
+from snomed_hierarchy import (CATEGORY_NAMES, HierarchyIndex, compute_ancestors, pack_hierarchy_sections,
+                              semantic_tag)
+
+# Rangs : 0 racine, 1 et 2 premiers niveaux, 3 enfant des deux (losange), 4 petit-enfant, 5 isolé
+PARENTS = [[], [0], [0], [1, 2], [3], []]
+
+
+def _hierarchy(top_level=None, tag_categories=None) -> HierarchyIndex:
+    sections = pack_hierarchy_sections(PARENTS, top_level, tag_categories)
+    return HierarchyIndex({name: memoryview(data).cast(typecode) for name, (typecode, data) in sections.items()})
+
+
+def test_ancestors():
+    """Fermeture transitive, losange compris, sans doublon"""
+    ancestors = [list(items) for items in compute_ancestors(PARENTS)]
+    assert ancestors == [[], [0], [0], [0, 1, 2], [0, 1, 2, 3], []]
+
+
+def test_cycle():
+    """Des concepts pris dans un cycle ne gardent que leurs parents directs"""
+    ancestors = [list(items) for items in compute_ancestors([[], [0, 2], [1]])]
+    assert ancestors == [[], [0, 2], [1]]
+
+
+def test_hierarchy_index():
+    """Parents, ancêtres et test de descendance sur les sections compilées"""
+    hierarchy = _hierarchy()
+    assert list(hierarchy.parents(3)) == [1, 2]
+    assert list(hierarchy.ancestors(4)) == [0, 1, 2, 3]
+    assert hierarchy.is_descendant(4, 0) and hierarchy.is_descendant(4, 2)
+    assert not hierarchy.is_descendant(1, 2) and not hierarchy.is_descendant(3, 3)
+    assert not hierarchy.is_descendant(5, 0)
+
+
+def test_categories():
+    """Le premier niveau l'emporte sur le tag sémantique ; à défaut, le tag sémantique"""
+    finding, procedure = CATEGORY_NAMES.index("Clinical finding"), CATEGORY_NAMES.index("Procedure")
+    hierarchy = _hierarchy({1: finding}, tag_categories=[0, 0, 0, procedure, 0, procedure])
+    assert [hierarchy.category(i) for i in range(6)] == [
+        None, "Clinical finding", None, "Clinical finding", "Clinical finding", "Procedure"]
+
+
+def test_semantic_tag():
+    """Tag sémantique entre les dernières parenthèses du FSN"""
+    assert semantic_tag("Varicelle (trouble)") == "trouble"
+    assert semantic_tag("Appendicectomie (intervention) ") == "intervention"
+    assert semantic_tag("Varicelle") is None
+
+
+if __name__ == "__main__":
+    tests = [test_ancestors, test_cycle, test_hierarchy_index, test_categories, test_semantic_tag]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__} : {e}")
+    print(f"\n{'🎉 Tous les tests passent' if not failures else f'❌ {failures} test(s) en échec'}")
+    exit(1 if failures else 0)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Script de test de la résolution des redirections historiques (snomed_history.py)
+"""
+
+from snomed_history import _MAX_REDIRECT_HOPS, resolve_redirects
+
+REPLACED_BY, SAME_AS, POSSIBLY_EQUIVALENT_TO = 1, 2, 3
+
+
+def test_chain():
+    """Une chaîne de remplacements mène au concept actif, avec le type le moins sûr de la chaîne"""
+    associations = {"a": {REPLACED_BY: ["b"]}, "b": {SAME_AS: ["c"]}}
+    assert resolve_redirects(associations, {"c"}) == {"a": ("c", SAME_AS), "b": ("c", SAME_AS)}
+
+
+def test_safest_association_wins():
+    """REPLACED BY l'emporte sur POSSIBLY EQUIVALENT TO"""
+    associations = {"a": {POSSIBLY_EQUIVALENT_TO: ["c"], REPLACED_BY: ["d"]}}
+    assert resolve_redirects(associations, {"c", "d"}) == {"a": ("d", REPLACED_BY)}
+
+
+def test_ambiguous_targets():
+    """Des cibles menant à des concepts actifs distincts ne donnent pas de redirection"""
+    associations = {"a": {SAME_AS: ["c", "d"]}, "b": {SAME_AS: ["c", "e"]}, "e": {REPLACED_BY: ["c"]}}
+    assert resolve_redirects(associations, {"c", "d"}) == {"b": ("c", SAME_AS), "e": ("c", REPLACED_BY)}
+
+
+def test_cycle():
+    """Un cycle de concepts inactifs n'est pas redirigé"""
+    associations = {"a": {REPLACED_BY: ["b"]}, "b": {REPLACED_BY: ["a"]}}
+    assert resolve_redirects(associations, {"c"}) == {}
+
+
+def test_known_redirects():
+    """Une cible absente des associations suit les redirections déjà résolues"""
+    associations = {"a": {REPLACED_BY: ["b"]}}
+    assert resolve_redirects(associations, {"c"}, known={"b": ("c", SAME_AS)}) == {"a": ("c", SAME_AS)}
+
+
+def test_hop_limit():
+    """Au-delà de _MAX_REDIRECT_HOPS la chaîne est abandonnée, sans empêcher les maillons plus proches"""
+    length = _MAX_REDIRECT_HOPS + 3
+    associations = {f"c{i}": {REPLACED_BY: [f"c{i + 1}"]} for i in range(length)}
+    redirects = resolve_redirects(associations, {f"c{length}"})
+    expected = {f"c{i}" for i in range(length - _MAX_REDIRECT_HOPS, length)}
+    assert set(redirects) == expected, sorted(redirects)
+    assert all(target == (f"c{length}", REPLACED_BY) for target in redirects.values())
+
+
+if __name__ == "__main__":
+    tests = [test_chain, test_safest_association_wins, test_ambiguous_targets, test_cycle,
+             test_known_redirects, test_hop_limit]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__} : {e}")
+    print(f"\n{'🎉 Tous les tests passent' if not failures else f'❌ {failures} test(s) en échec'}")
+    exit(1 if failures else 0)
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Script de test de l'index SNOMED CT compilé (snomed_index.py)
+
+Un Snapshot RF2 synthétique est écrit dans un dossier temporaire, compilé,
+puis interrogé dans les trois modes de stockage du validateur : les réponses
+doivent être identiques en mmap, packed et dict.
+"""
+
+import tempfile
+from pathlib import Path
+
+from snomed_index import SNOMEDIndex, compile_snomed_index, index_path_for, load_snomed_index, tables_from_index
+from snomed_validator import STORES, SNOMEDValidator
+
+SYNONYM = "900000000000013009"
+FSN = "900000000000003001"
+PREFERRED = "900000000000548007"
+ACCEPTABLE = "900000000000549004"
+REPLACED_BY = "900000000000526001"
+
+CONCEPTS = [("138875005", "1"), ("404684003", "1"), ("71388002", "1"), ("38907003", "1"),
+            ("80146002", "1"), ("12345006", "0")]
+DESCRIPTIONS = [
+    ("1", "404684003", FSN, "Constatation clinique (constatation)"),
+    ("2", "404684003", SYNONYM, "Constatation clinique"),
+    ("3", "71388002", SYNONYM, "Intervention"),
+    ("4", "38907003", FSN, "Varicelle (trouble)"),
+    ("5", "38907003", SYNONYM, "Varicelle zona"),
+    ("6", "38907003", SYNONYM, "Infection par le VZV"),
+    ("7", "80146002", SYNONYM, "Appendicectomie"),
+    ("8", "80146002", SYNONYM, "Ablation de l'appendice"),
+]
+IS_A = [("404684003", "138875005"), ("71388002", "138875005"), ("38907003", "404684003"),
+        ("80146002", "71388002")]
+LANGUAGE = [("6", PREFERRED), ("5", ACCEPTABLE), ("7", PREFERRED), ("1", PREFERRED)]
+ASSOCIATIONS = [("12345006", "38907003")]
+
+
+def write_snapshot(directory: Path) -> Path:
+    """Écrire un Snapshot RF2 minimal (concepts, descriptions, IS-A, langue, associations)"""
+    def write(name, header, rows):
+        with open(directory / name, "w", encoding="utf-8") as f:
+            f.write("\t".join(header) + "\n")
+            for row in rows:
+                f.write("\t".join(row) + "\n")
+
+    write("sct2_Concept_Snapshot_FR1000315_20250101.txt",
+          ["id", "effectiveTime", "active", "moduleId", "definitionStatusId"],
+          [(sctid, "20250101", active, "m", "d") for sctid, active in CONCEPTS])
+    write("sct2_Description_Snapshot-fr_FR1000315_20250101.txt",
+          ["id", "effectiveTime", "active", "moduleId", "conceptId", "languageCode", "typeId", "term",
+           "caseSignificanceId"],
+          [(i, "20250101", "1", "m", sctid, "fr", type_id, term, "c") for i, sctid, type_id, term in DESCRIPTIONS])
+    write("sct2_Relationship_Snapshot_FR1000315_20250101.txt",
+          ["id", "effectiveTime", "active", "moduleId", "sourceId", "destinationId", "relationshipGroup",
+           "typeId", "characteristicTypeId", "modifierId"],
+          [(str(i), "20250101", "1", "m", child, parent, "0", "116680003", "c", "m")
+           for i, (child, parent) in enumerate(IS_A)])
+    write("der2_cRefset_LanguageSnapshot-fr_FR1000315_20250101.txt",
+          ["id", "effectiveTime", "active", "moduleId", "refsetId", "referencedComponentId", "acceptabilityId"],
+          [(f"l{i}", "20250101", "1", "m", "r", description_id, acceptability)
+           for i, (description_id, acceptability) in enumerate(LANGUAGE)])
+    write("der2_cRefset_AssociationSnapshot_FR1000315_20250101.txt",
+          ["id", "effectiveTime", "active", "moduleId", "refsetId", "referencedComponentId", "targetComponentId"],
+          [(f"a{i}", "20250101", "1", "m", REPLACED_BY, source, target)
+           for i, (source, target) in enumerate(ASSOCIATIONS)])
+    return directory
+
+
+def _answers(validator: SNOMEDValidator) -> dict:
+    """Réponses du validateur aux requêtes couvertes par l'index"""
+    codes = ["38907003", "80146002", "404684003", "12345006", "999999999", "abc"]
+    terms = ["Varicelle zona", "infection par le vzv", "Appendicectomie", "Varicele", "inconnu"]
+    return {
+        "valid": validator.validate_codes(codes),
+        "active": validator.resolve_active_codes(codes),
+        "statuses": validator.code_statuses(codes),
+        "french_terms": validator.get_french_terms(codes),
+        "parents": [validator.get_parents(code) for code in codes],
+        "categories": [validator.get_category(code) for code in codes],
+        "exact": [validator.find_exact_term_code(term) for term in terms],
+        "by_term": [validator.find_code_by_term(term) for term in terms],
+        "near": [validator.find_near_exact_terms(term) for term in terms],
+        "similar": [validator.find_similar_terms(term) for term in terms],
+        "autocomplete": validator.autocomplete("app"),
+    }
+
+
+def test_store_parity():
+    """Les modes mmap, packed et dict donnent les mêmes réponses"""
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = write_snapshot(Path(tmp))
+        answers = {}
+        for store in STORES:
+            validator = SNOMEDValidator(str(snapshot), store=store)
+            assert validator.load_snomed_data(), f"chargement {store} impossible"
+            answers[store] = _answers(validator)
+
+        reference = answers[STORES[0]]
+        for store, result in answers.items():
+            for name, value in result.items():
+                assert value == reference[name], f"{store}.{name} : {value} != {reference[name]}"
+
+        assert reference["valid"] == [True, True, True, False, False, False]
+        assert reference["active"][3] == "38907003"  # Concept inactif redirigé
+        assert reference["parents"][0] == ["404684003"]
+        assert reference["exact"][:3] == ["38907003", "38907003", "80146002"]
+        assert reference["exact"][4] is None
+
+
+def test_preferred_term():
+    """Le terme principal est le synonyme préféré du refset de langue, pas le FSN ni la première description"""
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = write_snapshot(Path(tmp))
+        validator = SNOMEDValidator(str(snapshot))
+        assert validator.load_snomed_data()
+        assert validator.get_french_term("38907003") == "Infection par le VZV"
+        assert validator.get_french_term("80146002") == "Appendicectomie"
+        assert validator.index.preferred_description_id("38907003") == "6"
+
+
+def test_tables_round_trip():
+    """Un index reconstruit depuis ses propres tables est identique section par section"""
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = write_snapshot(Path(tmp))
+        assert compile_snomed_index(snapshot)
+        index = SNOMEDIndex.load(index_path_for(snapshot))
+        rebuilt = SNOMEDIndex.from_tables(tables_from_index(index))
+        for name in index.meta["sections"]:
+            assert index._sections[name].tobytes() == rebuilt._sections[name].tobytes(), name
+
+
+def test_unreadable_index_without_mmap():
+    """Un index illisible est reconstruit, et rechargé sans mmap si use_mmap est faux"""
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = write_snapshot(Path(tmp))
+        assert compile_snomed_index(snapshot)
+        load, calls = SNOMEDIndex.load, []
+
+        def failing_load(index_path):
+            calls.append(index_path)
+            if len(calls) == 1:
+                raise ValueError("Index SNOMED CT invalide ou format incompatible")
+            return load(index_path)
+
+        SNOMEDIndex.load = failing_load
+        try:
+            index = load_snomed_index(snapshot, use_mmap=False)
+        finally:
+            SNOMEDIndex.load = load
+        assert len(calls) == 2
+        assert isinstance(index._buffer, bytes)
+        assert index.code_for_key("varicelle zona") == "38907003"
+
+
+if __name__ == "__main__":
+    tests = [test_store_parity, test_preferred_term, test_tables_round_trip, test_unreadable_index_without_mmap]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__} : {e}")
+    print(f"\n{'🎉 Tous les tests passent' if not failures else f'❌ {failures} test(s) en échec'}")
+    exit(1 if failures else 0)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Script de test du remplacement à chaud de la release SNOMED CT (snomed_release.py)
+"""
+
+import tempfile
+import threading
+from pathlib import Path
+
+from snomed_delta import apply_rf2_delta
+from snomed_release import SNOMEDRelease
+from test_snomed_delta import write_delta
+from test_snomed_index import SYNONYM, write_snapshot
+
+
+def test_initial_load_once():
+    """Des premières requêtes simultanées ne chargent l'index qu'une fois"""
+    with tempfile.TemporaryDirectory() as tmp:
+        release = SNOMEDRelease(str(write_snapshot(Path(tmp))))
+        validator = release._validator
+        load, loads = validator.load_snomed_data, []
+        validator.load_snomed_data = lambda: loads.append(1) or load()
+
+        seen = []
+        threads = [threading.Thread(target=lambda: seen.append(release.validator)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(loads) == 1
+        assert all(v is validator for v in seen) and validator.validate_code("38907003")
+
+
+def test_refresh_after_delta():
+    """Une Delta appliquée sur disque est prise en compte sans couper les requêtes en cours"""
+    with tempfile.TemporaryDirectory() as tmp:
+        (Path(tmp) / "snapshot").mkdir()
+        snapshot = write_snapshot(Path(tmp) / "snapshot")
+        release = SNOMEDRelease(str(snapshot))
+        before = release.validator
+        assert release.refresh() is None  # Index inchangé
+
+        delta = write_delta(Path(tmp) / "delta", descriptions=[
+            ("9", "20250601", "1", "m", "38907003", "fr", SYNONYM, "Zona primaire", "c"),
+        ])
+        assert apply_rf2_delta(snapshot, delta)
+        thread = release.refresh()
+        assert thread is not None
+        thread.join()
+
+        after = release.validator
+        assert after is not before
+        assert after.find_exact_term_code("Zona primaire") == "38907003"
+        assert before.find_exact_term_code("Zona primaire") is None  # Requête en cours : ancienne release
+        assert release.refresh() is None
+
+
+def test_failed_swap_keeps_release():
+    """Une release illisible ne remplace pas la release active"""
+    with tempfile.TemporaryDirectory() as tmp:
+        release = SNOMEDRelease(str(write_snapshot(Path(tmp))))
+        active = release.validator
+        assert not release.swap(str(Path(tmp) / "absente"))
+        assert release.validator is active
+
+
+if __name__ == "__main__":
+    tests = [test_initial_load_once, test_refresh_after_delta, test_failed_swap_keeps_release]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__} : {e}")
+    print(f"\n{'🎉 Tous les tests passent' if not failures else f'❌ {failures} test(s) en échec'}")
+    exit(1 if failures else 0)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Script de test de la lecture des fichiers RF2 dans une archive ZIP (snomed_rf2.py)
+
+Le Snapshot synthétique de test_snomed_index.py est écrit dans un dossier,
+puis recopié dans une archive ZIP à l'arborescence d'une release officielle.
+"""
+
+import tempfile
+import zipfile
+from pathlib import Path
+
+from snomed_index import SNOMEDIndex, compile_snomed_index, index_path_for
+from snomed_rf2 import find_rf2_file, is_release_archive
+from test_snomed_index import write_snapshot
+
+CONCEPT_PATTERN = "sct2_Concept_Snapshot_*.txt"
+
+
+def _release(tmp: Path):
+    """(dossier Snapshot, archive ZIP contenant les mêmes fichiers)"""
+    snapshot = tmp / "snapshot"
+    snapshot.mkdir()
+    write_snapshot(snapshot)
+    archive = tmp / "SnomedCT_FR_20250101.zip"
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as release:
+        for path in snapshot.iterdir():
+            release.write(path, f"SnomedCT_FR_20250101/Snapshot/Terminology/{path.name}")
+    return snapshot, archive
+
+
+def test_archive_member():
+    """Un membre d'archive se lit comme le fichier texte d'origine"""
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot, archive = _release(Path(tmp))
+        assert is_release_archive(archive) and not is_release_archive(snapshot)
+
+        plain = find_rf2_file(snapshot, CONCEPT_PATTERN)
+        member = find_rf2_file(archive, CONCEPT_PATTERN)
+        assert member.is_archived and not plain.is_archived
+        assert member.name == plain.name
+        assert member.size() == plain.size()
+        with member.open_text() as a, plain.open_text() as b:
+            assert a.read() == b.read()
+        assert set(member.digest()) == {"crc32"} and set(plain.digest()) == {"sha256"}
+        assert find_rf2_file(archive, "sct2_Absent_*.txt") is None
+
+
+def test_index_from_archive():
+    """L'index compilé depuis l'archive est identique à celui du dossier (hors métadonnées)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot, archive = _release(Path(tmp))
+        assert compile_snomed_index(snapshot) and compile_snomed_index(archive)
+        assert index_path_for(archive).parent == archive.parent
+        from_folder = SNOMEDIndex.load(index_path_for(snapshot))
+        from_archive = SNOMEDIndex.load(index_path_for(archive))
+        assert from_folder.meta["sections"] == from_archive.meta["sections"]
+        for name in from_folder.meta["sections"]:
+            assert from_folder._sections[name].tobytes() == from_archive._sections[name].tobytes(), name
+
+
+if __name__ == "__main__":
+    tests = [test_archive_member, test_index_from_archive]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__} : {e}")
+    print(f"\n{'🎉 Tous les tests passent' if not failures else f'❌ {failures} test(s) en échec'}")
+    exit(1 if failures else 0)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Script de test de l'index allégé par hiérarchies (snomed_scope.py)
+"""
+
+import tempfile
+from pathlib import Path
+
+from snomed_delta import apply_rf2_delta
+from snomed_index import index_path_for
+from snomed_scope import resolve_hierarchies, scoped_index_path
+from snomed_validator import CODE_INVALID, CODE_OUT_OF_SCOPE, CODE_VALID, SNOMEDValidator
+from test_snomed_delta import write_delta
+from test_snomed_index import SYNONYM, write_snapshot
+
+
+def test_resolve_hierarchies():
+    """Noms de catégorie et SCTID de premier niveau acceptés, le reste refusé"""
+    assert resolve_hierarchies(["Procedure", " 404684003 "]) == ["Clinical finding", "Procedure"]
+    try:
+        resolve_hierarchies(["Médicaments"])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("hiérarchie inconnue acceptée")
+
+
+def test_scoped_validator():
+    """Les concepts hors des hiérarchies conservées sont signalés hors périmètre"""
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = write_snapshot(Path(tmp))
+        validator = SNOMEDValidator(str(snapshot), hierarchies=["Clinical finding"])
+        assert validator.load_snomed_data()
+        assert scoped_index_path(index_path_for(snapshot), ["Clinical finding"]).exists()
+        assert validator.code_status("38907003") == CODE_VALID
+        assert validator.code_status("138875005") == CODE_VALID  # Ancêtre conservé
+        assert validator.code_status("80146002") == CODE_OUT_OF_SCOPE
+        assert validator.find_exact_term_code("Appendicectomie") is None
+        assert validator.resolve_active("12345006") == "38907003"
+
+
+def test_redirect_out_of_scope():
+    """Un concept inactif dont le remplaçant est exclu est hors périmètre, pas invalide"""
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = write_snapshot(Path(tmp))
+        full = SNOMEDValidator(str(snapshot))
+        assert full.resolve_active("12345006") == "38907003"
+        validator = SNOMEDValidator(str(snapshot), hierarchies=["Procedure"])
+        assert validator.load_snomed_data()
+        assert validator.code_status("38907003") == CODE_OUT_OF_SCOPE
+        assert validator.code_status("12345006") == CODE_OUT_OF_SCOPE
+        assert validator.resolve_active("12345006") is None
+        assert validator.code_status("99999999") == CODE_INVALID
+
+
+def test_scope_follows_delta():
+    """Une Delta appliquée à l'index complet est reportée dans l'index allégé"""
+    with tempfile.TemporaryDirectory() as tmp:
+        (Path(tmp) / "snapshot").mkdir()
+        snapshot = write_snapshot(Path(tmp) / "snapshot")
+        assert SNOMEDValidator(str(snapshot), hierarchies=["Clinical finding"]).load_snomed_data()
+        delta = write_delta(Path(tmp) / "delta", descriptions=[
+            ("9", "20250601", "1", "m", "38907003", "fr", SYNONYM, "Zona primaire", "c"),
+        ])
+        assert apply_rf2_delta(snapshot, delta)
+
+        validator = SNOMEDValidator(str(snapshot), hierarchies=["Clinical finding"])
+        assert validator.load_snomed_data()
+        assert validator.index.meta["revision"] == 1
+        assert validator.find_exact_term_code("Zona primaire") == "38907003"
+
+
+if __name__ == "__main__":
+    tests = [test_resolve_hierarchies, test_scoped_validator, test_redirect_out_of_scope, test_scope_follows_delta]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__} : {e}")
+    print(f"\n{'🎉 Tous les tests passent' if not failures else f'❌ {failures} test(s) en échec'}")
+    exit(1 if failures else 0)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Script de test des recherches approximatives sur les termes (snomed_search.py)
+
+Les sections de recherche sont compilées en mémoire depuis quelques termes
+(SNOMEDIndex.from_tables), sans fichier RF2.
+"""
+
+from snomed_index import SNOMEDIndex
+from snomed_search import edit_distance
+
+TERMS = {
+    "38907003": ["varicelle", "infection par le virus varicelle zona"],
+    "80146002": ["appendicectomie", "ablation de l'appendice"],
+    "271807003": ["éruption cutanée"],
+    "418290006": ["prurit"],
+    "4147007": ["masse"],
+}
+
+
+def _index() -> SNOMEDIndex:
+    return SNOMEDIndex.from_tables({
+        "concepts": list(TERMS),
+        "french_terms": {code: keys[0].capitalize() for code, keys in TERMS.items()},
+        "term_to_code": {key: {code: 1 if i == 0 else 0}
+                         for code, keys in TERMS.items() for i, key in enumerate(keys)},
+    })
+
+
+def test_edit_distance():
+    """Damerau-Levenshtein restreinte, plafonnée à max_distance + 1"""
+    assert edit_distance("prurit", "prurit", 2) == 0
+    assert edit_distance("prurit", "pruirt", 2) == 1  # Transposition
+    assert edit_distance("varicelle", "varicele", 2) == 1
+    assert edit_distance("chat", "chien", 2) == 3
+    assert edit_distance("abc", "xyzabcdef", 2) == 3
+
+
+def test_trigrams():
+    """Recherche par trigrammes : terme mal orthographié"""
+    assert _index().similar_keys("varicele")[0][:2] == ("varicelle", "38907003")
+    assert _index().similar_keys("zzzz") == []
+
+
+def test_symspell():
+    """Suppressions symétriques : fautes dans et après le préfixe indexé"""
+    index = _index()
+    assert index.near_keys("apendicectomie") == [("appendicectomie", "80146002", 1)]
+    assert index.near_keys("appendicectomei") == [("appendicectomie", "80146002", 1)]
+    assert index.near_keys("prurtt") == [("prurit", "418290006", 1)]
+    assert index.near_keys("masses", max_distance=0) == []
+
+
+def test_bm25():
+    """BM25 sur les mots repliés : accents et pluriels ignorés, mots outils exclus"""
+    index = _index()
+    key, code, _, coverage = index.ranked_keys("ablation appendice")[0]
+    assert (key, code, coverage) == ("ablation de l'appendice", "80146002", 1.0)
+    assert index.ranked_keys("eruptions cutanees")[0][:2] == ("éruption cutanée", "271807003")
+    assert [hits[0][1] for hits in index.ranked_keys_many(["virus zona", "prurit"])] == ["38907003", "418290006"]
+
+
+if __name__ == "__main__":
+    tests = [test_edit_distance, test_trigrams, test_symspell, test_bm25]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__} : {e}")
+    print(f"\n{'🎉 Tous les tests passent' if not failures else f'❌ {failures} test(s) en échec'}")
+    exit(1 if failures else 0)